@@ -7,9 +7,17 @@
 - Latency P50/P95/P99: 响应时间分位数
 - 成功率: 请求成功比例
 - 吞吐量: 单位时间处理的总请求数
+
+--mock 模式：在本地以 LLM_PROVIDER=mock 启动服务（模拟 LLM 与 Embedding，无需 API Key
+和网络），可离线压测 API、LangGraph 工作流、缓存与熔断器：
+    python scripts/benchmark.py --mock --mock-latency-ms 300 --mock-failure-rate 0.05
 """
 
 import json
+import os
+import socket
+import subprocess
+import sys
 import time
 import asyncio
 import statistics
@@ -200,6 +208,44 @@ def save_results(metrics: dict, output_path: Path):
     print(f"\n💾 结果已保存至: {output_path}")
 
 
+def start_mock_server(args) -> tuple[subprocess.Popen, str]:
+    """以 mock 提供商在本地启动 API 服务，就绪后返回进程与地址"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "mock",
+        "MOCK_LATENCY_MS": str(args.mock_latency_ms),
+        "MOCK_LATENCY_SIGMA": str(args.mock_latency_sigma),
+        "MOCK_TOKENS_PER_SECOND": str(args.mock_tokens_per_second),
+        "MOCK_FAILURE_RATE": str(args.mock_failure_rate),
+        "MOCK_SEED": str(args.mock_seed),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    # 等待服务就绪
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("mock 服务启动失败")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                print(f"🧪 Mock 服务已启动: {base_url}")
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("mock 服务启动超时")
+
+
 def main():
     import argparse
     
@@ -208,24 +254,50 @@ def main():
     parser.add_argument("--requests", "-n", type=int, default=50, help="总请求数")
     parser.add_argument("--concurrency", "-c", type=int, default=5, help="并发数")
     parser.add_argument("--timeout", "-t", type=float, default=30.0, help="超时时间")
+    parser.add_argument("--mock", action="store_true", help="在本地以 mock LLM 提供商启动服务并压测")
+    parser.add_argument("--mock-latency-ms", type=float, default=300.0, help="mock 首 token 延迟中位数（毫秒）")
+    parser.add_argument("--mock-latency-sigma", type=float, default=0.3, help="mock 延迟的对数正态离散度")
+    parser.add_argument("--mock-tokens-per-second", type=float, default=50.0, help="mock 输出速度（字符/秒）")
+    parser.add_argument("--mock-failure-rate", type=float, default=0.0, help="mock 失败率")
+    parser.add_argument("--mock-seed", type=int, default=0, help="mock 随机种子")
     args = parser.parse_args()
     
+    process = None
+    base_url = args.url
+    if args.mock:
+        process, base_url = start_mock_server(args)
+    
     config = BenchmarkConfig(
-        base_url=args.url,
+        base_url=base_url,
         total_requests=args.requests,
         concurrency=args.concurrency,
         timeout=args.timeout,
     )
     
     # 执行压测
-    metrics = asyncio.run(run_benchmark(config))
+    try:
+        metrics = asyncio.run(run_benchmark(config))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+    
+    if args.mock:
+        metrics["config"]["mock"] = {
+            "latency_ms": args.mock_latency_ms,
+            "latency_sigma": args.mock_latency_sigma,
+            "tokens_per_second": args.mock_tokens_per_second,
+            "failure_rate": args.mock_failure_rate,
+            "seed": args.mock_seed,
+        }
     
     # 打印结果
     print_results(metrics)
     
     # 保存结果
     project_root = Path(__file__).parent.parent
-    output_path = project_root / "data" / "eval" / "benchmark_results.json"
+    filename = "benchmark_mock_results.json" if args.mock else "benchmark_results.json"
+    output_path = project_root / "data" / "eval" / filename
     save_results(metrics, output_path)
 
 
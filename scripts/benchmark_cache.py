@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+响应缓存语义索引压测脚本
+
+在合成的大规模缓存上对比精确检索与 IVF 近似检索：
+- Recall@1: 近似检索的最佳匹配与精确检索一致的比例
+- Latency P50/P99: 单次查询延迟
+- Build: 写入全部条目的耗时（含 IVF 训练）
+- Snapshot: 全量缓存（含向量）的快照保存 / 冷启动加载耗时
+
+合成数据模拟真实客服问题的分布：大量问题聚集在少数话题附近、话题之间相互重叠。
+查询向量是从同一话题分布中新采样的留出样本（不是已缓存向量加微小噪声），
+最近邻可能落在相邻的 IVF 聚类里，nprobe 过小时召回率会明显下降，
+结果中的召回曲线（nprobe -> Recall@1 / 加速比）用来选取 CACHE_IVF_NPROBE。
+"""
+
+import json
+import sys
+import tempfile
+import time
+import statistics
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+
+# 添加项目根目录
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.response_cache import ResponseCache
+from src.core.semantic_index import create_semantic_index
+
+
+def make_dataset(size: int, dim: int, topics: int, queries: int, spread: float = 1.0, seed: int = 42):
+    """
+    生成聚类分布的缓存向量与留出查询向量
+
+    Args:
+        spread: 话题内离散程度（噪声与话题中心的尺度比），越大话题间重叠越多
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=size)
+    vectors = centers[labels] + spread * rng.normal(size=(size, dim)).astype(np.float32)
+
+    # 查询从同一话题分布中独立采样，不与任何已缓存向量重合
+    query_labels = rng.integers(0, topics, size=queries)
+    query_vectors = centers[query_labels] + spread * rng.normal(size=(queries, dim)).astype(np.float32)
+    return vectors, query_vectors
+
+
+def run_index(kind: str, vectors: np.ndarray, queries: np.ndarray, **options) -> dict:
+    """构建索引并逐条查询，返回结果与延迟"""
+    index = create_semantic_index(kind, initial_capacity=vectors.shape[0], **options)
+
+    start = time.perf_counter()
+    for vector in vectors:
+        index.add(vector)
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    results = []
+    for query in queries:
+        t0 = time.perf_counter()
+        match = index.search(query, k=1)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append(match[0][0] if match else -1)
+
+    latencies.sort()
+    return {
+        "results": results,
+        "build_time": round(build_time, 2),
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 3),
+            "p99": round(latencies[int(len(latencies) * 0.99)], 3),
+            "avg": round(statistics.mean(latencies), 3),
+        },
+    }
+
+
+def run_snapshot(vectors: np.ndarray) -> dict:
+    """写满缓存后保存快照，再测冷启动加载耗时"""
+    size = vectors.shape[0]
+    cache = ResponseCache(max_size=size, enable_semantic=True)
+    for i, vector in enumerate(vectors):
+        cache.set(f"question-{i}", f"answer-{i}", embedding=vector)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache"
+        start = time.perf_counter()
+        written = cache.save_snapshot(path)
+        save_time = time.perf_counter() - start
+        file_mb = sum(p.stat().st_size for p in Path(tmp).iterdir()) / 1024 / 1024
+
+        warm = ResponseCache(max_size=size, enable_semantic=True)
+        start = time.perf_counter()
+        loaded = warm.load_snapshot(path)
+        load_time = time.perf_counter() - start
+
+    return {
+        "written": written,
+        "loaded": loaded,
+        "save_time": round(save_time, 2),
+        "load_time": round(load_time, 2),
+        "file_mb": round(file_mb, 1),
+    }
+
+
+def run_benchmark(
+    size: int,
+    dim: int,
+    topics: int,
+    queries: int,
+    nlist: int,
+    nprobes: list[int],
+    spread: float = 1.0,
+) -> dict:
+    """执行对比压测"""
+    print(f"\n🚀 生成合成数据: {size} 条 × {dim} 维, {topics} 个话题 (spread={spread}), {queries} 次留出查询")
+    vectors, query_vectors = make_dataset(size, dim, topics, queries, spread)
+
+    print("⏳ 精确检索...")
+    exact = run_index("exact", vectors, query_vectors)
+
+    metrics = {
+        "config": {
+            "size": size,
+            "dim": dim,
+            "topics": topics,
+            "spread": spread,
+            "queries": queries,
+            "nlist": nlist,
+        },
+        "exact": {"build_time": exact["build_time"], "latency_ms": exact["latency_ms"]},
+        "ivf": {},
+        "recall_curve": [],
+    }
+
+    for nprobe in nprobes:
+        print(f"⏳ IVF 近似检索 (nlist={nlist}, nprobe={nprobe})...")
+        ivf = run_index("ivf", vectors, query_vectors, nlist=nlist, nprobe=nprobe)
+        hits = sum(1 for a, b in zip(exact["results"], ivf["results"]) if a == b)
+        metrics["ivf"][f"nprobe={nprobe}"] = {
+            "recall@1": round(hits / queries, 4),
+            "build_time": ivf["build_time"],
+            "latency_ms": ivf["latency_ms"],
+            "speedup_p50": round(exact["latency_ms"]["p50"] / max(ivf["latency_ms"]["p50"], 1e-6), 1),
+        }
+        metrics["recall_curve"].append({
+            "nprobe": nprobe,
+            "recall@1": metrics["ivf"][f"nprobe={nprobe}"]["recall@1"],
+            "speedup_p50": metrics["ivf"][f"nprobe={nprobe}"]["speedup_p50"],
+        })
+
+    print("⏳ 快照保存 / 加载...")
+    metrics["snapshot"] = run_snapshot(vectors)
+
+    return metrics
+
+
+def print_results(metrics: dict):
+    """打印压测结果"""
+    print("\n" + "=" * 60)
+    print("📊 语义缓存索引压测结果")
+    print("=" * 60)
+
+    exact = metrics["exact"]
+    print(f"\n精确检索: 构建 {exact['build_time']}s | "
+          f"P50 {exact['latency_ms']['p50']}ms | P99 {exact['latency_ms']['p99']}ms")
+
+    for name, stats in metrics["ivf"].items():
+        print(f"IVF {name}: Recall@1 {stats['recall@1']:.1%} | 构建 {stats['build_time']}s | "
+              f"P50 {stats['latency_ms']['p50']}ms | P99 {stats['latency_ms']['p99']}ms | "
+              f"加速 {stats['speedup_p50']}x")
+
+    curve = metrics.get("recall_curve")
+    if curve:
+        print(f"\n召回曲线（精确检索 Recall@1 = 100%，nlist={metrics['config']['nlist']}）:")
+        for point in curve:
+            bar = "█" * round(point["recall@1"] * 40)
+            print(f"  nprobe={point['nprobe']:<4} {point['recall@1']:>7.1%} {bar} ({point['speedup_p50']}x)")
+
+    snapshot = metrics.get("snapshot")
+    if snapshot:
+        print(f"快照: 保存 {snapshot['written']} 条 {snapshot['save_time']}s ({snapshot['file_mb']}MB) | "
+              f"加载 {snapshot['loaded']} 条 {snapshot['load_time']}s")
+
+    print("\n" + "=" * 60)
+
+
+def save_results(metrics: dict, output_path: Path):
+    """保存压测结果"""
+    metrics["timestamp"] = datetime.now().isoformat()
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+    print(f"\n💾 结果已保存至: {output_path}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="语义缓存索引压测脚本")
+    parser.add_argument("--size", "-n", type=int, default=100_000, help="缓存条目数")
+    parser.add_argument("--dim", "-d", type=int, default=256, help="向量维度")
+    parser.add_argument("--topics", type=int, default=2000, help="话题（聚类）数量")
+    parser.add_argument("--queries", "-q", type=int, default=1000, help="查询次数")
+    parser.add_argument("--spread", type=float, default=1.0, help="话题内离散程度，越大话题间重叠越多")
+    parser.add_argument("--nlist", type=int, default=256, help="IVF 聚类数")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="IVF 探测聚类数（召回曲线的采样点）")
+    args = parser.parse_args()
+
+    metrics = run_benchmark(
+        args.size, args.dim, args.topics, args.queries, args.nlist, args.nprobe, args.spread
+    )
+    print_results(metrics)
+
+    output_path = project_root / "data" / "eval" / "cache_benchmark_results.json"
+    save_results(metrics, output_path)
+
+
+if __name__ == "__main__":
+    main()
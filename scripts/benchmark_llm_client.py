@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+LLM 客户端复用压测脚本
+
+在本地启动一个 OpenAI 兼容的 mock 服务（/v1/chat/completions），对比：
+- per_call: 每次调用都新建 ChatOpenAI（旧行为：新 HTTP 客户端 + 新连接）
+- reused: LLMRouter 注册表中长期复用的客户端（共享长连接池）
+
+mock 服务固定延迟返回，差值即为客户端构造与建连开销。
+本地为明文 HTTP，线上 HTTPS 还要叠加 TLS 握手，实际差距更大。
+"""
+
+import json
+import sys
+import threading
+import time
+import statistics
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from src.core.llm_router import LLMRouter, ModelConfig
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """最小的 OpenAI 兼容 chat completions 接口（支持 keep-alive）"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.delay:
+            time.sleep(self.delay)
+
+        body = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "mock",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "您好，有什么可以帮您？"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(delay: float) -> ThreadingHTTPServer:
+    """在后台线程启动 mock 服务"""
+    MockOpenAIHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(get_llm, requests: int) -> dict:
+    """依次调用并统计延迟"""
+    messages = [HumanMessage(content="你好")]
+    latencies = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        get_llm().invoke(messages)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    latencies.sort()
+    return {
+        "p50": round(statistics.median(latencies), 2),
+        "p99": round(latencies[int(len(latencies) * 0.99)], 2),
+        "avg": round(statistics.mean(latencies), 2),
+    }
+
+
+def run_benchmark(requests: int, delay: float) -> dict:
+    """执行对比压测"""
+    server = start_mock_server(delay)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"\n🚀 Mock 服务: {base_url}（延迟 {delay * 1000:.0f}ms），每组 {requests} 次调用")
+
+    router = LLMRouter()
+    router.models["openai"] = ModelConfig(
+        provider="openai", model="mock", api_key="sk-mock", base_url=base_url,
+    )
+
+    try:
+        print("⏳ 每次新建客户端...")
+        per_call = measure(lambda: ChatOpenAI(model="mock", api_key="sk-mock", base_url=base_url), requests)
+
+        print("⏳ 复用客户端...")
+        router.get_llm("openai").invoke([HumanMessage(content="预热")])
+        reused = measure(lambda: router.get_llm("openai"), requests)
+    finally:
+        router.close()
+        server.shutdown()
+
+    return {
+        "config": {"requests": requests, "server_delay_ms": delay * 1000},
+        "per_call_ms": per_call,
+        "reused_ms": reused,
+        "p50_saved_ms": round(per_call["p50"] - reused["p50"], 2),
+    }
+
+
+def print_results(metrics: dict):
+    """打印压测结果"""
+    print("\n" + "=" * 60)
+    print("📊 LLM 客户端复用压测结果")
+    print("=" * 60)
+
+    for name, label in (("per_call_ms", "每次新建"), ("reused_ms", "复用客户端")):
+        stats = metrics[name]
+        print(f"{label}: P50 {stats['p50']}ms | P99 {stats['p99']}ms | 平均 {stats['avg']}ms")
+    print(f"\nP50 节省: {metrics['p50_saved_ms']}ms / 请求")
+    print("\n" + "=" * 60)
+
+
+def save_results(metrics: dict, output_path: Path):
+    """保存压测结果"""
+    metrics["timestamp"] = datetime.now().isoformat()
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+    print(f"\n💾 结果已保存至: {output_path}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LLM 客户端复用压测脚本")
+    parser.add_argument("--requests", "-n", type=int, default=200, help="每组调用次数")
+    parser.add_argument("--delay", type=float, default=0.005, help="mock 服务响应延迟（秒）")
+    args = parser.parse_args()
+
+    metrics = run_benchmark(args.requests, args.delay)
+    print_results(metrics)
+
+    output_path = project_root / "data" / "eval" / "llm_client_benchmark_results.json"
+    save_results(metrics, output_path)
+
+
+if __name__ == "__main__":
+    main()
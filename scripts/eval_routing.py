@@ -6,10 +6,16 @@ Agent 路由准确率评测脚本
 - 路由准确率 (Routing Accuracy): Agent 分配是否正确
 - 各 Agent 准确率: 按 Agent 维度的准确率
 - 各类别准确率: 按意图类别的准确率
+- 路由来源: 快速路由（关键词 / 正则）、Embedding 分类与 LLM 各处理了多少请求，节省的 LLM 调用比例
+- 快速路由精度: 快速路由 / Embedding 路由给出结果时的准确率，以及各来源的平均耗时
+
+--fast-only 只评测快速路由（不调用 LLM），置信度不足的用例记为交给 LLM。
+--embedding 在快速路由之后启用 Embedding 路由（样例来自 data/routing_exemplars.json，与评测集不重叠）。
 """
 
 import json
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
@@ -18,7 +24,9 @@ from collections import defaultdict
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.config import settings
 from src.graphs.customer_service_graph import SupervisorAgent
+from src.graphs.routing import EmbeddingRouter
 
 
 def load_eval_dataset(dataset_path: Path) -> dict:
@@ -27,13 +35,14 @@ def load_eval_dataset(dataset_path: Path) -> dict:
         return json.load(f)
 
 
-def evaluate_routing(supervisor: SupervisorAgent, dataset: dict) -> dict:
+def evaluate_routing(supervisor: SupervisorAgent, dataset: dict, fast_only: bool = False) -> dict:
     """
     执行 Agent 路由准确率评测
     
     Args:
         supervisor: Supervisor Agent
         dataset: 评测数据集
+        fast_only: 只评测快速路由，不调用 LLM
         
     Returns:
         评测结果
@@ -45,6 +54,7 @@ def evaluate_routing(supervisor: SupervisorAgent, dataset: dict) -> dict:
         "by_category": defaultdict(lambda: {"total": 0, "correct": 0}),
         "details": [],
         "confusion_matrix": defaultdict(lambda: defaultdict(int)),
+        "sources": defaultdict(lambda: {"total": 0, "correct": 0, "latency_ms": 0.0}),
     }
     
     for case in dataset["test_cases"]:
@@ -52,11 +62,20 @@ def evaluate_routing(supervisor: SupervisorAgent, dataset: dict) -> dict:
         expected_agent = case["expected_agent"]
         category = case.get("category", "未分类")
         
-        # 执行路由
-        try:
-            predicted_agent = supervisor.route(query)
-        except Exception as e:
-            predicted_agent = f"ERROR: {e}"
+        # 执行路由：先快速路由，再 Embedding 路由，都没有把握时再调用 LLM
+        start = time.perf_counter()
+        decision = supervisor.fast_route(query) or supervisor.embedding_route(query)
+        if decision is not None:
+            source, predicted_agent = decision.source, decision.agent
+        elif fast_only:
+            source, predicted_agent = "deferred", "LLM"
+        else:
+            source = "llm"
+            try:
+                predicted_agent = supervisor.route(query, fast_path=False)
+            except Exception as e:
+                predicted_agent = f"ERROR: {e}"
+        latency_ms = (time.perf_counter() - start) * 1000
         
         # 判断是否正确
         is_correct = predicted_agent == expected_agent
@@ -75,6 +94,11 @@ def evaluate_routing(supervisor: SupervisorAgent, dataset: dict) -> dict:
         if is_correct:
             results["by_category"][category]["correct"] += 1
         
+        # 按路由来源统计
+        results["sources"][source]["total"] += 1
+        results["sources"][source]["correct"] += int(is_correct)
+        results["sources"][source]["latency_ms"] += latency_ms
+        
         # 混淆矩阵
         results["confusion_matrix"][expected_agent][predicted_agent] += 1
         
@@ -86,6 +110,7 @@ def evaluate_routing(supervisor: SupervisorAgent, dataset: dict) -> dict:
             "expected": expected_agent,
             "predicted": predicted_agent,
             "correct": is_correct,
+            "source": source,
         })
     
     # 计算汇总指标
@@ -104,6 +129,14 @@ def evaluate_routing(supervisor: SupervisorAgent, dataset: dict) -> dict:
     for category, stats in results["by_category"].items():
         stats["accuracy"] = stats["correct"] / stats["total"] if stats["total"] > 0 else 0
     
+    # 各路由来源的准确率与平均耗时，以及节省的 LLM 调用比例
+    results["sources"] = dict(results["sources"])
+    for source, stats in results["sources"].items():
+        stats["accuracy"] = stats["correct"] / stats["total"]
+        stats["latency_ms"] = round(stats["latency_ms"] / stats["total"], 3)
+    saved_cases = sum(results["sources"].get(source, {}).get("total", 0) for source in ("rule", "embedding"))
+    results["llm_calls_saved"] = saved_cases / results["total_cases"]
+    
     return results
 
 
@@ -116,6 +149,12 @@ def print_results(results: dict):
     print(f"\n📈 汇总指标:")
     print(f"   测试用例数: {results['total_cases']}")
     print(f"   路由准确率: {results['accuracy']:.1%} ({results['correct']}/{results['total_cases']})")
+    print(f"   节省 LLM 调用: {results['llm_calls_saved']:.1%}")
+    
+    print(f"\n📋 按路由来源:")
+    print("-" * 40)
+    for source, stats in sorted(results["sources"].items()):
+        print(f"   {source}: {stats['total']} 次 | 准确率 {stats['accuracy']:.1%} | 平均 {stats['latency_ms']}ms")
     
     print(f"\n📋 按 Agent 准确率:")
     print("-" * 40)
@@ -161,6 +200,13 @@ def save_results(results: dict, output_path: Path):
 
 
 def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Agent 路由准确率评测脚本")
+    parser.add_argument("--fast-only", action="store_true", help="只评测快速路由（不调用 LLM）")
+    parser.add_argument("--embedding", action="store_true", help="启用 Embedding 路由（规则之后、LLM 之前）")
+    args = parser.parse_args()
+    
     print("🔍 开始 Agent 路由准确率评测...")
     
     # 加载数据集
@@ -169,11 +215,21 @@ def main():
     print(f"📚 加载评测数据集: {len(dataset['test_cases'])} 个测试用例")
     
     # 初始化 Supervisor
-    supervisor = SupervisorAgent()
+    embedding_router = None
+    if args.embedding:
+        embedding_router = EmbeddingRouter.from_file(
+            project_root / settings.routing_embedding_exemplars,
+            method=settings.routing_embedding_method,
+            k=settings.routing_embedding_k,
+        )
+    supervisor = SupervisorAgent(embedding_router=embedding_router)
     
     # 执行评测
-    print("⏳ 正在评测（需要调用 LLM，请耐心等待）...")
-    results = evaluate_routing(supervisor, dataset)
+    if args.fast_only:
+        print("⏳ 正在评测（仅快速路由）...")
+    else:
+        print("⏳ 正在评测（置信度不足时调用 LLM，请耐心等待）...")
+    results = evaluate_routing(supervisor, dataset, fast_only=args.fast_only)
     
     # 打印结果
     print_results(results)
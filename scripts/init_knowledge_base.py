@@ -8,6 +8,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.config import settings
 from src.rag import KnowledgeRetriever
 
 
@@ -30,11 +31,11 @@ def main():
     for md_file in md_files:
         print(f"   - {md_file.name}")
     
-    # 创建检索器
+    # 创建检索器（LLM_PROVIDER=mock 时使用模拟向量构建独立的集合）
     persist_dir = project_root / "chroma_data"
     retriever = KnowledgeRetriever(
         persist_directory=persist_dir,
-        collection_name="customer_service_kb",
+        collection_name="customer_service_kb_mock" if settings.llm_provider == "mock" else "customer_service_kb",
     )
     
     print(f"\n🔄 正在构建向量索引...")
@@ -4,11 +4,14 @@ from .chitchat_agent import ChitchatAgent, get_llm
 from .product_agent import ProductAgent
 from .order_agent import OrderAgent
 from .aftersales_agent import AfterSalesAgent
+from .triage_agent import TriageAgent, TriageResult
 
 __all__ = [
     "ChitchatAgent",
     "ProductAgent",
     "OrderAgent",
     "AfterSalesAgent",
+    "TriageAgent",
+    "TriageResult",
     "get_llm",
 ]
@@ -4,6 +4,7 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 
 from src.agents.chitchat_agent import get_llm
+from src.core.executor import run_sync
 from src.rag import KnowledgeRetriever
 
 
@@ -39,17 +40,17 @@ class AfterSalesAgent:
         self.llm = get_llm()
         self.retriever = retriever
 
-    def _get_policy_info(self, message: str) -> str:
-        """检索相关售后政策信息"""
-        if self.retriever:
-            docs = self.retriever.search(message, k=2)
-            if docs:
-                policy_texts = []
-                for doc in docs:
-                    source = doc.metadata.get("filename", "")
-                    content = doc.page_content.strip()
-                    policy_texts.append(f"【{source}】\n{content}")
-                return "\n\n---\n\n".join(policy_texts)
+    def _get_policy_info(self, message: str, documents: list | None = None) -> str:
+        """检索相关售后政策信息（documents 为已预取的检索结果）"""
+        if documents is None and self.retriever:
+            documents = self.retriever.search(message, k=2)
+        if documents:
+            policy_texts = []
+            for doc in documents[:2]:
+                source = doc.metadata.get("filename", "")
+                content = doc.page_content.strip()
+                policy_texts.append(f"【{source}】\n{content}")
+            return "\n\n---\n\n".join(policy_texts)
         
         # 如果没有检索器或没有找到相关内容，返回基本政策
         return """
@@ -60,16 +61,8 @@ class AfterSalesAgent:
 4. 客服热线：400-123-4567
 """
 
-    def chat(self, user_input: str, chat_history: list | None = None) -> str:
-        """
-        处理用户输入并返回回复
-        """
-        if chat_history is None:
-            chat_history = []
-
-        # 获取售后政策信息
-        policy_info = self._get_policy_info(user_input)
-
+    def _chain_and_inputs(self, user_input: str, chat_history: list | None, policy_info: str):
+        """构建 Chain 与输入（转换历史记录格式）"""
         # 构建 prompt
         prompt = ChatPromptTemplate.from_messages([
             ("system", self.SYSTEM_PROMPT),
@@ -81,16 +74,46 @@ class AfterSalesAgent:
 
         # 转换历史记录格式
         formatted_history = []
-        for msg in chat_history:
+        for msg in chat_history or []:
             if msg["role"] == "user":
                 formatted_history.append(HumanMessage(content=msg["content"]))
             elif msg["role"] == "assistant":
                 formatted_history.append(AIMessage(content=msg["content"]))
 
-        response = chain.invoke({
+        return chain, {
             "policy_info": policy_info,
             "input": user_input,
             "chat_history": formatted_history,
-        })
+        }
+
+    def chat(
+        self,
+        user_input: str,
+        chat_history: list | None = None,
+        documents: list | None = None,
+    ) -> str:
+        """
+        处理用户输入并返回回复（documents 为已预取的检索结果，为 None 时现场检索）
+        """
+        # 获取售后政策信息
+        policy_info = self._get_policy_info(user_input, documents)
+
+        chain, inputs = self._chain_and_inputs(user_input, chat_history, policy_info)
+        response = chain.invoke(inputs)
+        return response.content
 
+    async def achat(
+        self,
+        user_input: str,
+        chat_history: list | None = None,
+        documents: list | None = None,
+    ) -> str:
+        """异步版本的 chat（同步的知识库检索放到有界线程池执行）"""
+        if documents is None:
+            policy_info = await run_sync(self._get_policy_info, user_input)
+        else:
+            policy_info = self._get_policy_info(user_input, documents)
+
+        chain, inputs = self._chain_and_inputs(user_input, chat_history, policy_info)
+        response = await chain.ainvoke(inputs)
         return response.content
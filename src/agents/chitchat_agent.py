@@ -4,31 +4,19 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.language_models import BaseChatModel
 
-from src.config import settings
-
 
 def get_llm() -> BaseChatModel:
     """
     根据配置获取 LLM 实例
 
+    由 LLMRouter 统一创建并复用，所有 Agent 共享同一个客户端和连接池；
+    weighted 路由模式下返回在各提供商之间加权分流的模型
+
     Returns:
-        LLM 实例（OpenAI 或 通义千问）
+        LLM 实例（OpenAI / 通义千问，或加权路由模型）
     """
-    if settings.llm_provider == "openai":
-        from langchain_openai import ChatOpenAI
-        return ChatOpenAI(
-            model=settings.openai_model,
-            api_key=settings.openai_api_key,
-            base_url=settings.openai_base_url,
-            temperature=0.7,
-        )
-    else:  # dashscope
-        from langchain_community.chat_models import ChatTongyi
-        return ChatTongyi(
-            model=settings.dashscope_model,
-            api_key=settings.dashscope_api_key,
-            temperature=0.7,
-        )
+    from src.core.llm_router import get_llm_router
+    return get_llm_router().get_llm()
 
 
 class ChitchatAgent:
@@ -58,6 +46,20 @@ class ChitchatAgent:
 
         self.chain = self.prompt | self.llm
 
+    def _inputs(self, user_input: str, chat_history: list | None) -> dict:
+        """构建 Chain 输入（转换历史记录格式）"""
+        formatted_history = []
+        for msg in chat_history or []:
+            if msg["role"] == "user":
+                formatted_history.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                formatted_history.append(AIMessage(content=msg["content"]))
+
+        return {
+            "input": user_input,
+            "chat_history": formatted_history,
+        }
+
     def chat(self, user_input: str, chat_history: list | None = None) -> str:
         """
         处理用户输入并返回回复
@@ -69,20 +71,10 @@ class ChitchatAgent:
         Returns:
             Agent 的回复内容
         """
-        if chat_history is None:
-            chat_history = []
-
-        # 转换历史记录格式
-        formatted_history = []
-        for msg in chat_history:
-            if msg["role"] == "user":
-                formatted_history.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                formatted_history.append(AIMessage(content=msg["content"]))
-
-        response = self.chain.invoke({
-            "input": user_input,
-            "chat_history": formatted_history,
-        })
+        response = self.chain.invoke(self._inputs(user_input, chat_history))
+        return response.content
 
+    async def achat(self, user_input: str, chat_history: list | None = None) -> str:
+        """异步版本的 chat（LLM 调用不阻塞事件循环）"""
+        response = await self.chain.ainvoke(self._inputs(user_input, chat_history))
         return response.content
@@ -128,13 +128,8 @@ class OrderAgent:
         available_orders = ", ".join(MOCK_ORDERS.keys())
         return f"未检测到订单号。请提供您的订单号（示例订单号：{available_orders}）"
 
-    def chat(self, user_input: str, chat_history: list | None = None) -> str:
-        """
-        处理用户输入并返回回复
-        """
-        if chat_history is None:
-            chat_history = []
-
+    def _chain_and_inputs(self, user_input: str, chat_history: list | None):
+        """构建 Chain 与输入（查询订单信息、转换历史记录格式）"""
         # 获取订单信息
         order_info = self._get_order_info(user_input)
 
@@ -149,16 +144,28 @@ class OrderAgent:
 
         # 转换历史记录格式
         formatted_history = []
-        for msg in chat_history:
+        for msg in chat_history or []:
             if msg["role"] == "user":
                 formatted_history.append(HumanMessage(content=msg["content"]))
             elif msg["role"] == "assistant":
                 formatted_history.append(AIMessage(content=msg["content"]))
 
-        response = chain.invoke({
+        return chain, {
             "order_info": order_info,
             "input": user_input,
             "chat_history": formatted_history,
-        })
+        }
+
+    def chat(self, user_input: str, chat_history: list | None = None) -> str:
+        """
+        处理用户输入并返回回复
+        """
+        chain, inputs = self._chain_and_inputs(user_input, chat_history)
+        response = chain.invoke(inputs)
+        return response.content
 
+    async def achat(self, user_input: str, chat_history: list | None = None) -> str:
+        """异步版本的 chat（订单查询为内存操作，只有 LLM 调用是异步的）"""
+        chain, inputs = self._chain_and_inputs(user_input, chat_history)
+        response = await chain.ainvoke(inputs)
         return response.content
@@ -7,6 +7,7 @@ from langchain_core.runnables import RunnablePassthrough
 
 from src.config import settings
 from src.agents.chitchat_agent import get_llm
+from src.core.executor import run_sync
 from src.rag import KnowledgeRetriever
 
 
@@ -32,12 +33,12 @@ class ProductAgent:
 
 请用中文回复。"""
 
-    def __init__(self, retriever: KnowledgeRetriever):
+    def __init__(self, retriever: KnowledgeRetriever | None):
         """
         初始化 ProductAgent
         
         Args:
-            retriever: 知识库检索器
+            retriever: 知识库检索器（为 None 时不检索，按“未找到相关信息”回答）
         """
         self.llm = get_llm()
         self.retriever = retriever
@@ -48,20 +49,25 @@ class ProductAgent:
             ("human", "{input}"),
         ])
         
+        # 生成 Chain（输入已包含检索结果 context）
+        self.answer_chain = self.prompt | self.llm | StrOutputParser()
+        
         # 构建 RAG Chain
         self.chain = (
             {
-                "context": lambda x: self._format_docs(
-                    self.retriever.search(x["input"], k=3)
-                ),
+                "context": lambda x: self._format_docs(self._retrieve(x["input"])),
                 "chat_history": lambda x: x.get("chat_history", []),
                 "input": lambda x: x["input"],
             }
-            | self.prompt
-            | self.llm
-            | StrOutputParser()
+            | self.answer_chain
         )
     
+    def _retrieve(self, query: str, k: int = 3) -> list:
+        """检索知识库（没有检索器时返回空列表）"""
+        if self.retriever is None:
+            return []
+        return self.retriever.search(query, k=k)
+    
     def _format_docs(self, docs) -> str:
         """格式化检索到的文档"""
         if not docs:
@@ -76,35 +82,63 @@ class ProductAgent:
         
         return "\n\n---\n\n".join(formatted)
     
-    def chat(self, user_input: str, chat_history: list | None = None) -> str:
+    @staticmethod
+    def _format_history(chat_history: list | None) -> list:
+        """转换历史记录格式"""
+        formatted_history = []
+        for msg in chat_history or []:
+            if msg["role"] == "user":
+                formatted_history.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                formatted_history.append(AIMessage(content=msg["content"]))
+        return formatted_history
+    
+    def chat(
+        self,
+        user_input: str,
+        chat_history: list | None = None,
+        documents: list | None = None,
+    ) -> str:
         """
         处理用户输入并返回回复
         
         Args:
             user_input: 用户输入的消息
             chat_history: 对话历史记录
+            documents: 已预取的检索结果（为 None 时现场检索）
             
         Returns:
             Agent 的回复内容
         """
-        if chat_history is None:
-            chat_history = []
-        
-        # 转换历史记录格式
-        formatted_history = []
-        for msg in chat_history:
-            if msg["role"] == "user":
-                formatted_history.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                formatted_history.append(AIMessage(content=msg["content"]))
+        if documents is not None:
+            return self.answer_chain.invoke({
+                "context": self._format_docs(documents[:3]),
+                "input": user_input,
+                "chat_history": self._format_history(chat_history),
+            })
         
         response = self.chain.invoke({
             "input": user_input,
-            "chat_history": formatted_history,
+            "chat_history": self._format_history(chat_history),
         })
         
         return response
     
+    async def achat(
+        self,
+        user_input: str,
+        chat_history: list | None = None,
+        documents: list | None = None,
+    ) -> str:
+        """异步版本的 chat（同步的 Chroma 检索放到有界线程池执行，LLM 调用使用 ainvoke）"""
+        if documents is None:
+            documents = await run_sync(self._retrieve, user_input)
+        return await self.answer_chain.ainvoke({
+            "context": self._format_docs(documents[:3]),
+            "input": user_input,
+            "chat_history": self._format_history(chat_history),
+        })
+    
     def search_knowledge(self, query: str, k: int = 3) -> list[dict]:
         """
         仅检索知识库，不生成回复
@@ -116,7 +150,7 @@ class ProductAgent:
         Returns:
             检索结果列表
         """
-        docs = self.retriever.search(query, k=k)
+        docs = self._retrieve(query, k=k)
         
         results = []
         for doc in docs:
@@ -0,0 +1,101 @@
+"""分诊 Agent - 单次调用完成意图识别，并直接回答闲聊"""
+
+import json
+import re
+from dataclasses import dataclass
+
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+
+from src.agents.chitchat_agent import get_llm
+
+
+VALID_AGENTS = ("ProductAgent", "OrderAgent", "AfterSalesAgent", "ChitchatAgent")
+
+# 允许直接回答的意图：只有闲聊。
+# 订单（实时数据）、商品与售后（以知识库为准，需要检索）必须交给专业 Agent：
+# 分诊的直接回答没有检索依据，且会写入该 Agent 的回复缓存，不能与知识库版本的回答混用
+DIRECT_ANSWER_AGENTS = {"ChitchatAgent"}
+
+
+@dataclass
+class TriageResult:
+    """分诊结果"""
+    agent: str
+    answer: str | None  # 可以直接回答时为回复内容，否则为 None（交给 agent 处理）
+
+
+class TriageAgent:
+    """分诊 Agent：一次 LLM 调用同时输出 Agent 名称与（可选的）直接回复"""
+
+    PROMPT = """你是一个智能电商客服系统的前台，需要在一次回复中完成意图识别，并在可以直接回答时给出答案。
+
+可用的 Agent：
+1. ProductAgent - 商品咨询、价格查询、商品推荐、促销活动、优惠政策（需要检索知识库）
+2. OrderAgent - 订单查询、物流追踪、订单状态（需要查询订单数据）
+3. AfterSalesAgent - 退货、换货、退款、投诉、维修、售后政策
+4. ChitchatAgent - 闲聊、问候、无法分类的问题
+
+回答规则：
+- 闲聊、问候：在 answer 中直接给出友好、简洁的中文回复
+- 商品、订单、售后问题：answer 为 null，交给对应的 Agent 查询订单数据或知识库后回答
+
+用户输入: {user_input}
+
+请只输出一个 JSON 对象，格式为 {{"agent": "Agent 名称", "answer": "回复内容或 null"}}，不要输出其他内容。"""
+
+    def __init__(self):
+        """初始化 TriageAgent"""
+        self.llm = get_llm()
+
+    def _messages(self, user_input: str, chat_history: list | None) -> list[BaseMessage]:
+        """对话历史 + 分诊提示词"""
+        messages: list[BaseMessage] = []
+        for msg in chat_history or []:
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                messages.append(AIMessage(content=msg["content"]))
+        messages.append(HumanMessage(content=self.PROMPT.format(user_input=user_input)))
+        return messages
+
+    @staticmethod
+    def parse(content: str) -> TriageResult:
+        """解析 LLM 输出；不是合法 JSON 时按文本识别 Agent 名称，不直接回答"""
+        match = re.search(r"\{.*\}", content, re.S)
+        try:
+            data = json.loads(match.group(0)) if match else {}
+        except json.JSONDecodeError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+
+        agent_name = str(data.get("agent") or content)
+        agent = next(
+            (valid for valid in VALID_AGENTS if valid.lower() in agent_name.lower()),
+            "ChitchatAgent",
+        )
+        answer = data.get("answer")
+        if not isinstance(answer, str) or not answer.strip() or answer.strip().lower() == "null":
+            answer = None
+        if agent not in DIRECT_ANSWER_AGENTS:
+            answer = None
+        return TriageResult(agent=agent, answer=answer.strip() if answer else None)
+
+    def triage(self, user_input: str, chat_history: list | None = None) -> TriageResult:
+        """
+        意图识别并尝试直接回答
+
+        Args:
+            user_input: 用户输入的消息
+            chat_history: 对话历史记录
+
+        Returns:
+            分诊结果
+        """
+        response = self.llm.invoke(self._messages(user_input, chat_history))
+        return self.parse(response.content)
+
+    async def atriage(self, user_input: str, chat_history: list | None = None) -> TriageResult:
+        """异步版本的 triage"""
+        response = await self.llm.ainvoke(self._messages(user_input, chat_history))
+        return self.parse(response.content)
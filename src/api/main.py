@@ -2,10 +2,12 @@
 
 import uuid
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from src.config import settings
 from src.api.schemas import ChatRequest, ChatResponse, ToolCallInfo, ToolResultInfo
@@ -19,17 +21,51 @@ from src.core import (
     get_cache,
     get_ab_manager,
     get_llm_router,
+    get_single_flight,
+    get_retry_budget,
     configure_langsmith,
 )
+from src.core.bulkhead import get_bulkhead_stats
+from src.core.executor import run_sync, shutdown_sync_executor
 
 # 配置 LangSmith（如果配置了 API Key）
 configure_langsmith(project_name="ecommerce-chatbot")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动/停止后台任务"""
+    cache = get_cache()
+    snapshot_path = settings.cache_snapshot_path
+    if snapshot_path:
+        try:
+            await run_in_threadpool(cache.load_snapshot, snapshot_path)
+        except Exception as e:
+            print(f"⚠️ 缓存快照加载失败: {e}")
+        if settings.cache_snapshot_interval > 0:
+            cache.start_snapshotter(snapshot_path, settings.cache_snapshot_interval)
+    if settings.cache_sweep_interval > 0:
+        cache.start_sweeper(settings.cache_sweep_interval)
+    
+    yield
+    
+    await cache.stop_sweeper()
+    await get_llm_router().aclose()
+    if snapshot_path:
+        await cache.stop_snapshotter()
+        try:
+            await run_in_threadpool(cache.save_snapshot, snapshot_path)
+        except Exception as e:
+            print(f"⚠️ 缓存快照保存失败: {e}")
+    shutdown_sync_executor(wait=False)
+
+
 # 创建 FastAPI 应用
 app = FastAPI(
     title="智能电商客服 Multi-Agent 系统",
     description="基于 LangChain + LangGraph 的多 Agent 协作客服系统（生产级增强版）",
     version="0.5.0",
+    lifespan=lifespan,
 )
 
 # 配置 CORS
@@ -44,14 +80,15 @@ app.add_middleware(
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 
-# 初始化知识库检索器
+# 初始化知识库检索器（mock 模式使用模拟向量，与真实索引分开存放）
 retriever = KnowledgeRetriever(
     persist_directory=PROJECT_ROOT / "chroma_data",
-    collection_name="customer_service_kb",
+    collection_name="customer_service_kb_mock" if settings.llm_provider == "mock" else "customer_service_kb",
 )
 
 # 初始化 LangGraph 工作流（标准模式）
 customer_service_graph = CustomerServiceGraph(retriever=retriever)
+app.state.customer_service_graph = customer_service_graph  # 流式接口（src/api/stream.py）共用
 
 # 初始化会话管理器
 session_manager = InMemorySessionManager(max_history=20, ttl_minutes=60)
@@ -130,8 +167,9 @@ async def chat(request: ChatRequest):
                 for r in request.tool_results
             ]
         
-        # 调用 ToolEnabledAgent
-        result = tool_agent.chat(
+        # 调用 ToolEnabledAgent（同步调用放到有界线程池，避免阻塞事件循环）
+        result = await run_sync(
+            tool_agent.chat,
             user_input=request.message,
             chat_history=chat_history,
             tool_results=tool_results,
@@ -170,13 +208,34 @@ async def chat(request: ChatRequest):
             )
     
     # ===== 标准模式（LangGraph 工作流）=====
-    result = customer_service_graph.invoke(
-        user_input=request.message,
-        chat_history=chat_history,
-    )
+    # 响应缓存按 session 分组开关（A/B 实验 cache_enabled）
+    ab_manager = get_ab_manager()
+    use_cache = ab_manager.get_variant("cache_enabled", session_id) == "enabled"
+    
+    def run_graph():
+        # 异步执行工作流：LLM 调用不占用线程，同步依赖在有界线程池中执行
+        return customer_service_graph.ainvoke(
+            user_input=request.message,
+            chat_history=chat_history,
+            use_cache=use_cache,
+        )
+    
+    start_time = time.time()
+    if use_cache:
+        # 并发的相同请求只执行一次工作流，其余请求共享结果
+        request_key = customer_service_graph.request_key(request.message, chat_history)
+        result = await get_single_flight().do(request_key, run_graph)
+    else:
+        result = await run_graph()
+    ab_manager.record_result("cache_enabled", session_id, {
+        "latency": time.time() - start_time,
+        "cache_hit": int(result["cached"]),
+    })
 
-    session_manager.add_message(session_id, "user", request.message)
-    session_manager.add_message(session_id, "assistant", result["message"])
+    # 被降级的兜底回复不写入会话历史，避免影响后续对话
+    if not result.get("shed"):
+        session_manager.add_message(session_id, "user", request.message)
+        session_manager.add_message(session_id, "assistant", result["message"])
 
     return ChatResponse(
         type="response",
@@ -184,6 +243,7 @@ async def chat(request: ChatRequest):
         session_id=session_id,
         agent_used=result["agent_used"],
         tool_calls=None,
+        cached=result["cached"],
     )
 
 
@@ -225,7 +285,7 @@ async def get_tool_schema(tool_name: str):
 @app.get("/knowledge/search")
 async def search_knowledge(query: str, k: int = 3):
     """直接搜索知识库（调试用）"""
-    docs = retriever.search(query, k=k)
+    docs = await run_sync(retriever.search, query, k=k)
     results = [
         {
             "content": doc.page_content,
@@ -262,7 +322,14 @@ async def system_status():
     
     return {
         "cache": cache.get_stats(),
+        "single_flight": get_single_flight().get_stats(),
         "llm_router": llm_router.get_status(),
+        "retry_budget": get_retry_budget().get_stats(),
+        "graph_mode": customer_service_graph.mode,
+        "routing": customer_service_graph.supervisor.get_stats(),
+        "agent_concurrency": customer_service_graph.limiter.get_stats() if customer_service_graph.limiter else None,
+        "speculative_retrieval": customer_service_graph.get_prefetch_stats(),
+        "bulkheads": get_bulkhead_stats(),
         "ab_tests": ab_manager.get_all_experiments(),
     }
 
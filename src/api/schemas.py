@@ -42,6 +42,7 @@ class ChatResponse(BaseModel):
     session_id: str = Field(..., description="会话ID")
     agent_used: str = Field(..., description="处理该消息的 Agent 名称")
     tool_calls: list[ToolCallInfo] | None = Field(None, description="需要调用的工具列表（type=tool_call时）")
+    cached: bool = Field(default=False, description="回复是否来自响应缓存")
 
 
 # ===== Tool Schema 查询接口 =====
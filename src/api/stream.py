@@ -3,19 +3,27 @@
 
 使用 Server-Sent Events (SSE) 实现流式输出，
 让用户能够实时看到 AI 的响应过程。
+
+两种模式：
+- graph（默认）：完整执行 Multi-Agent 工作流（路由、知识库检索、订单数据），
+  依次推送路由结果、引用来源和 Agent 生成的 token
+- llm：跳过工作流，直接流式调用通用客服 LLM
 """
 
 import asyncio
 import json
 import time
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from src.core import get_llm, get_cache, get_ab_manager, llm_circuit_breaker
+from src.config import settings
+from src.core import get_llm, get_cache, get_ab_manager, get_single_flight, llm_circuit_breaker
+from src.core.executor import run_sync
 from src.core.langsmith_integration import trace_function
+from src.graphs.customer_service_graph import CustomerServiceGraph, history_fingerprint
 from src.memory import InMemorySessionManager
 
 router = APIRouter(prefix="/stream", tags=["流式响应"])
@@ -28,6 +36,88 @@ class StreamChatRequest(BaseModel):
     """流式聊天请求"""
     message: str = Field(..., description="用户消息")
     session_id: str | None = Field(None, description="会话 ID")
+    mode: Literal["graph", "llm"] = Field("graph", description="graph: 完整工作流；llm: 直接流式调用 LLM")
+
+
+STREAM_CACHE_NAMESPACE = "stream"
+
+
+def _stream_namespace(chat_history: list[dict]) -> str:
+    """流式回复缓存命名空间（对话历史不同则不共享）"""
+    return f"{STREAM_CACHE_NAMESPACE}:{history_fingerprint(chat_history)}"
+
+
+def _sse(event: dict) -> str:
+    """SSE 格式的数据块"""
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _replay_cached(content: str) -> AsyncGenerator[str, None]:
+    """
+    把缓存的完整回复切成块回放
+    
+    块大小和间隔可配置：间隔为 0 时立即全部发出，
+    大于 0 时模拟打字效果
+    """
+    size = max(1, settings.stream_replay_chunk_size)
+    for start in range(0, len(content), size):
+        if start and settings.stream_replay_interval > 0:
+            await asyncio.sleep(settings.stream_replay_interval)
+        yield content[start:start + size]
+
+
+async def _llm_token_stream(
+    message: str,
+    chat_history: list[dict],
+    cache_result: bool = True,
+) -> AsyncGenerator[str, None]:
+    """
+    调用 LLM 流式生成回复，完整生成后写入响应缓存
+    
+    Args:
+        message: 用户消息
+        chat_history: 对话历史
+        cache_result: 是否把完整回复写入缓存
+    
+    Yields:
+        回复内容块
+    """
+    # 获取 LLM（支持流式）
+    llm = get_llm()
+    
+    # 构建消息
+    from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+    
+    messages = [
+        SystemMessage(content="你是一个专业的电商客服助手，请用中文回复。"),
+    ]
+    
+    # 添加历史消息
+    for msg in chat_history[-10:]:  # 限制历史长度
+        if msg["role"] == "user":
+            messages.append(HumanMessage(content=msg["content"]))
+        elif msg["role"] == "assistant":
+            messages.append(AIMessage(content=msg["content"]))
+    
+    # 添加当前消息
+    messages.append(HumanMessage(content=message))
+    
+    # 流式调用
+    full_response = ""
+    async for chunk in llm.astream(messages):
+        if hasattr(chunk, "content") and chunk.content:
+            full_response += chunk.content
+            yield chunk.content
+    
+    # 只缓存完整结束的流（中途异常不会走到这里）
+    if cache_result and full_response:
+        await run_sync(
+            get_cache().get_or_set,
+            message,
+            full_response,
+            ttl=settings.cache_answer_ttl,
+            namespace=_stream_namespace(chat_history),
+        )
 
 
 async def generate_stream_response(
@@ -38,6 +128,9 @@ async def generate_stream_response(
     """
     生成流式响应
     
+    - 命中缓存：直接把缓存的回复按块回放，done 事件带 cached=true
+    - 未命中：相同问题（且对话历史相同）的并发请求共享同一条 LLM 流
+    
     Yields:
         SSE 格式的数据块
     """
@@ -45,62 +138,131 @@ async def generate_stream_response(
     full_response = ""
     
     try:
-        # 获取 LLM（支持流式）
-        llm = get_llm()
-        
-        # 构建消息
-        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-        
-        messages = [
-            SystemMessage(content="你是一个专业的电商客服助手，请用中文回复。"),
-        ]
-        
-        # 添加历史消息
-        for msg in chat_history[-10:]:  # 限制历史长度
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                messages.append(AIMessage(content=msg["content"]))
+        cache = get_cache()
+        ab_manager = get_ab_manager()
+        use_cache = ab_manager.get_variant("cache_enabled", session_id) == "enabled"
+        namespace = _stream_namespace(chat_history)
         
-        # 添加当前消息
-        messages.append(HumanMessage(content=message))
+        cached = await run_sync(cache.get, message, namespace=namespace) if use_cache else None
+        if cached is not None:
+            token_stream = _replay_cached(cached)
+        elif use_cache:
+            token_stream = get_single_flight().stream(
+                cache.make_key(message, namespace=namespace),
+                lambda: _llm_token_stream(message, chat_history),
+            )
+        else:
+            token_stream = _llm_token_stream(message, chat_history, cache_result=False)
         
-        # 流式调用
-        async for chunk in llm.astream(messages):
-            if hasattr(chunk, "content") and chunk.content:
-                content = chunk.content
-                full_response += content
-                
-                # SSE 格式
-                yield f"data: {json.dumps({'type': 'chunk', 'content': content}, ensure_ascii=False)}\n\n"
+        async for content in token_stream:
+            full_response += content
+            
+            # SSE 格式
+            yield _sse({'type': 'chunk', 'content': content})
         
         # 发送完成信号
         latency = time.time() - start_time
-        yield f"data: {json.dumps({'type': 'done', 'latency': round(latency, 2)}, ensure_ascii=False)}\n\n"
+        done_event = {'type': 'done', 'latency': round(latency, 2), 'cached': cached is not None}
+        yield _sse(done_event)
         
         # 保存到会话历史
         session_manager.add_message(session_id, "user", message)
         session_manager.add_message(session_id, "assistant", full_response)
         
         # 记录 A/B 测试结果
-        ab_manager = get_ab_manager()
         ab_manager.record_result("llm_provider", session_id, {"latency": latency})
+        ab_manager.record_result("cache_enabled", session_id, {
+            "latency": latency,
+            "cache_hit": int(cached is not None),
+        })
         
     except Exception as e:
         # 发送错误
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+        yield _sse({'type': 'error', 'message': str(e)})
+
+
+async def generate_graph_stream_response(
+    graph: CustomerServiceGraph,
+    message: str,
+    session_id: str,
+    chat_history: list[dict],
+) -> AsyncGenerator[str, None]:
+    """
+    生成工作流流式响应
+    
+    路由、检索与 Agent 生成的事件产生后立即推送，首个 token 在 Agent 开始生成时就到达客户端，
+    不必等整条回复完成；缓存命中的回复与 llm 模式一样按块回放，分诊直接回答、降级回复
+    等其他非逐 token 生成的回复整段作为一个 chunk 推送。
+    使用缓存时，相同问题（且对话历史相同）的并发请求共享同一次工作流执行
+    
+    Yields:
+        SSE 格式的数据块
+    """
+    start_time = time.time()
+    
+    try:
+        ab_manager = get_ab_manager()
+        use_cache = ab_manager.get_variant("cache_enabled", session_id) == "enabled"
+        
+        def run_graph():
+            return graph.astream(message, chat_history=chat_history, use_cache=use_cache)
+        
+        if use_cache:
+            events = get_single_flight().stream(graph.request_key(message, chat_history), run_graph)
+        else:
+            events = run_graph()
+        
+        result = None
+        async for event in events:
+            if event["type"] == "result":
+                result = event
+            elif event["type"] == "chunk" and event.get("cached"):
+                async for content in _replay_cached(event["content"]):
+                    yield _sse({'type': 'chunk', 'content': content})
+            else:
+                yield _sse(event)
+        
+        if result is None:
+            yield _sse({'type': 'error', 'message': '工作流未返回结果'})
+            return
+        
+        latency = time.time() - start_time
+        yield _sse({
+            'type': 'done',
+            'latency': round(latency, 2),
+            'cached': result["cached"],
+            'agent': result["agent_used"],
+            'shed': result["shed"],
+        })
+        
+        # 被降级的兜底回复不写入会话历史，避免影响后续对话
+        if not result["shed"]:
+            session_manager.add_message(session_id, "user", message)
+            session_manager.add_message(session_id, "assistant", result["message"])
+        
+        ab_manager.record_result("llm_provider", session_id, {"latency": latency})
+        ab_manager.record_result("cache_enabled", session_id, {
+            "latency": latency,
+            "cache_hit": int(result["cached"]),
+        })
+        
+    except Exception as e:
+        yield _sse({'type': 'error', 'message': str(e)})
 
 
 @router.post("/chat")
-async def stream_chat(request: StreamChatRequest):
+async def stream_chat(request: StreamChatRequest, http_request: Request):
     """
     流式聊天接口
     
     使用 SSE 实时返回响应内容
     
     响应格式：
+    - `{"type": "route", "agent": "ProductAgent"}` - 选定的 Agent（仅 graph 模式）
+    - `{"type": "sources", "sources": [{"source": "...", "category": "..."}]}` - 引用的知识库来源（仅 graph 模式）
     - `{"type": "chunk", "content": "..."}` - 内容块
-    - `{"type": "done", "latency": 1.5}` - 完成
+    - `{"type": "done", "latency": 1.5, "cached": false}` - 完成（cached 表示是否为缓存回放；
+      graph 模式另有 agent 与 shed）
     - `{"type": "error", "message": "..."}` - 错误
     """
     import uuid
@@ -108,8 +270,15 @@ async def stream_chat(request: StreamChatRequest):
     session_id = request.session_id or str(uuid.uuid4())
     chat_history = session_manager.get_chat_history(session_id)
     
+    if request.mode == "graph":
+        body = generate_graph_stream_response(
+            http_request.app.state.customer_service_graph, request.message, session_id, chat_history
+        )
+    else:
+        body = generate_stream_response(request.message, session_id, chat_history)
+    
     return StreamingResponse(
-        generate_stream_response(request.message, session_id, chat_history),
+        body,
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -7,8 +7,8 @@ from typing import Literal
 class Settings(BaseSettings):
     """应用配置类，从环境变量读取配置"""
 
-    # LLM 提供商选择: "openai" 或 "dashscope"
-    llm_provider: Literal["openai", "dashscope"] = "dashscope"
+    # LLM 提供商选择: "openai"、"dashscope" 或 "mock"（本地模拟，用于离线压测 / CI）
+    llm_provider: Literal["openai", "dashscope", "mock"] = "dashscope"
 
     # OpenAI 配置（保留备用）
     openai_api_key: str = ""
@@ -19,6 +19,108 @@ class Settings(BaseSettings):
     dashscope_api_key: str = ""
     dashscope_model: str = "qwen-plus"
 
+    # Mock 提供商配置（LLM_PROVIDER=mock 时生效）：首 token 延迟中位数（毫秒）与
+    # 对数正态离散度、输出速度（字符/秒）、失败率、随机种子
+    mock_latency_ms: float = 300.0
+    mock_latency_sigma: float = 0.3
+    mock_tokens_per_second: float = 50.0
+    mock_failure_rate: float = 0.0
+    mock_seed: int = 0
+
+    # LLM 路由模式: "weighted" 按延迟 / 错误率加权分流，"static" 固定主模型 + 手动切换
+    llm_routing_mode: Literal["weighted", "static"] = "weighted"
+    # 对冲请求（weighted 模式）：主提供商超过其延迟分位数仍未响应 / 未出首 token 时，
+    # 向次选提供商并行发出相同请求；每分钟对冲次数有上限
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_max_per_minute: int = 30
+    llm_hedge_min_delay: float = 0.3
+    llm_hedge_default_delay: float = 3.0
+
+    # LLM 限流（按提供商，0 表示不限）：每分钟请求数、每分钟 token 数、最大在途请求数
+    dashscope_rpm: int = 0
+    dashscope_tpm: int = 0
+    dashscope_max_concurrency: int = 0
+    openai_rpm: int = 0
+    openai_tpm: int = 0
+    openai_max_concurrency: int = 0
+    # 超限时最长排队时间（秒），预计超过则直接拒绝（切换到其他提供商）
+    llm_queue_max_wait: float = 5.0
+    # TPM 预约时预估的输出 token 数（调用完成后按实际用量修正）
+    llm_expected_completion_tokens: int = 256
+
+    # LLM 熔断器（每个提供商 / 模型一个）：滑动窗口大小、窗口内最少调用数、
+    # 失败率阈值、慢调用判定时长（秒）与慢调用率阈值、熔断恢复时间（秒）、半开试探请求数
+    llm_breaker_window_size: int = 20
+    llm_breaker_min_calls: int = 5
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_slow_call_duration: float = 15.0
+    llm_breaker_slow_call_rate: float = 0.8
+    llm_breaker_recovery_timeout: float = 30.0
+    llm_breaker_half_open_calls: int = 2
+
+    # 重试预算：最近 window 秒内重试数不超过请求数的 ratio 倍（外加每秒保底次数）
+    retry_budget_ratio: float = 0.1
+    retry_budget_min_per_second: float = 1.0
+    retry_budget_window: int = 10
+
+    # Agent 执行的自适应并发限制：按延迟相对最小延迟的变化动态调整在途上限，
+    # 超出上限的请求立即返回降级回复。算法: "gradient"（Vegas 风格梯度）或 "aimd"
+    # 默认关闭：初始上限需要按压测测出的服务容量设置（如 scripts/benchmark.py 下延迟开始拐头的并发数），
+    # 用一个猜测的小值开启会在正常负载下就开始降级
+    agent_concurrency_enabled: bool = False
+    agent_concurrency_algorithm: Literal["gradient", "aimd"] = "gradient"
+    agent_concurrency_initial: int = 20
+    agent_concurrency_min: int = 2
+    agent_concurrency_max: int = 200
+    agent_concurrency_tolerance: float = 2.0
+
+    # 快速路由：关键词 / 正则路由置信度达到阈值时不调用 LLM 做意图识别
+    routing_fast_path_enabled: bool = True
+    routing_fast_path_threshold: float = 0.8
+
+    # Embedding 路由：规则路由没有把握时，用 query 向量对标注样例分类（"knn" 或 "centroid"），
+    # 前两名相似度差 >= margin 时不调用 LLM。样例路径相对项目根目录
+    routing_embedding_enabled: bool = False
+    routing_embedding_exemplars: str = "data/routing_exemplars.json"
+    routing_embedding_method: Literal["knn", "centroid"] = "knn"
+    routing_embedding_k: int = 3
+    routing_embedding_margin: float = 0.05
+    # 共享 Embeddings 的 query 向量缓存条数（路由、语义缓存、检索复用同一个向量）
+    embedding_query_cache_size: int = 1024
+
+    # 工作流拓扑: "standard"（路由调用 + Agent 调用两跳）或 "single_call"
+    # （一次调用完成分诊并直接回答闲聊，商品 / 订单 / 售后问题交给专业 Agent）
+    graph_mode: Literal["standard", "single_call"] = "standard"
+
+    # 舱壁隔离：避免某一类慢请求占满整个服务的容量。Agent 的瓶颈是 LLM 提供商的并发上限，
+    # 因此默认容量 = 主提供商的 {provider}_max_concurrency × 该 Agent 的份额（向上取整）：
+    # 单个 Agent 最多占用提供商并发的 40%，份额之和大于 1，空闲 Agent 的名额不会浪费；
+    # 提供商不限并发（0）时舱壁也不限。bulkhead_limits 中显式配置的名称优先（0 表示不限），
+    # 两者都没有的名称使用 bulkhead_default_limit。
+    # 名额已满时与 LLM 限流一样排队等待（秒），超时才返回降级回复
+    bulkhead_limits: dict[str, int] = {}
+    bulkhead_shares: dict[str, float] = {
+        "ProductAgent": 0.4, "AfterSalesAgent": 0.4, "OrderAgent": 0.3, "ChitchatAgent": 0.2,
+    }
+    bulkhead_default_limit: int = 0
+    bulkhead_max_wait: float = 5.0
+
+    # 异步工作流中同步依赖（Chroma 检索、同步 embedding 等）使用的有界线程池大小
+    sync_executor_workers: int = 32
+
+    # 投机检索：路由需要调用 embedding / LLM 时并行启动知识库检索，
+    # 选中 RAG Agent 时直接使用预取结果，其他 Agent 丢弃
+    speculative_retrieval_enabled: bool = True
+    # RAG Agent 等待预取结果的最长时间（秒），超时后放弃预取、重新检索
+    speculative_retrieval_timeout: float = 3.0
+
+    # LLM HTTP 连接池（OpenAI 兼容客户端共享，长连接复用）
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive: int = 20
+    llm_http_keepalive_expiry: float = 60.0
+    llm_http_timeout: float = 60.0
+
     # LangSmith 配置
     langchain_tracing_v2: bool = False
     langchain_api_key: str = ""
@@ -27,6 +129,38 @@ class Settings(BaseSettings):
     # Redis 配置
     redis_url: str = "redis://localhost:6379"
 
+    # 响应缓存配置
+    # 语义索引: "exact"（精确暴力检索）或 "ivf"（近似检索，适合大规模缓存）
+    cache_semantic_index: Literal["exact", "ivf"] = "exact"
+    cache_ivf_nlist: int = 256
+    cache_ivf_nprobe: int = 8
+    # 淘汰策略: "lru" / "lfu"；准入策略: "none" / "tinylfu"（W-TinyLFU，带 1% 的 LRU 准入窗口）
+    cache_eviction_policy: Literal["lru", "lfu"] = "lru"
+    cache_admission_policy: Literal["none", "tinylfu"] = "none"
+    # 后台过期清理间隔（秒），<= 0 表示只在读写时惰性清理
+    cache_sweep_interval: float = 30.0
+    # 路由结果 / Agent 回复缓存时间（秒）
+    cache_route_ttl: float = 86400.0
+    cache_answer_ttl: float = 3600.0
+    # 流式缓存回放：每块字符数、块间隔（秒，0 表示立即全部发出）
+    stream_replay_chunk_size: int = 8
+    stream_replay_interval: float = 0.0
+    # 是否启用 Redis 二级缓存（多 worker / 多副本共享，使用 redis_url）
+    cache_l2_enabled: bool = False
+    # Redis 二级缓存的连接 / 读写超时（秒），超时按未命中处理
+    cache_l2_timeout: float = 0.5
+    # 计算精确缓存 key 前的查询规范化规则（按固定顺序执行）与额外的商品别名
+    cache_normalize_rules: list[str] = [
+        "nfkc", "fullwidth", "lowercase", "punctuation", "whitespace", "aliases", "stopwords",
+    ]
+    cache_query_aliases: dict[str, str] = {}
+    # 缓存快照路径（不含后缀，为空则不启用）与定期快照间隔（秒）
+    cache_snapshot_path: str = ""
+    cache_snapshot_interval: float = 300.0
+
+    # 知识库版本（参与回复缓存 key，知识库更新后修改即可使旧回复失效）
+    knowledge_base_version: str = "1"
+
     # 应用配置
     app_debug: bool = True
     app_host: str = "0.0.0.0"
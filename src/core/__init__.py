@@ -7,16 +7,38 @@ from .circuit_breaker import (
     with_retry,
     llm_circuit_breaker,
 )
+from .bulkhead import (
+    Bulkhead,
+    BulkheadFullError,
+    get_bulkhead,
+)
+from .executor import (
+    get_sync_executor,
+    run_sync,
+    submit_sync,
+)
 from .llm_router import (
     LLMRouter,
     get_llm_router,
     get_llm,
     get_llm_with_fallback,
 )
+from .rate_limiter import (
+    ProviderLimiter,
+    RateLimitExceeded,
+)
+from .retry_budget import (
+    RetryBudget,
+    get_retry_budget,
+)
 from .response_cache import (
     ResponseCache,
     get_cache,
 )
+from .single_flight import (
+    SingleFlight,
+    get_single_flight,
+)
 from .langsmith_integration import (
     configure_langsmith,
     is_langsmith_enabled,
@@ -36,14 +58,31 @@ __all__ = [
     "CircuitOpenError",
     "with_retry",
     "llm_circuit_breaker",
+    # 舱壁隔离
+    "Bulkhead",
+    "BulkheadFullError",
+    "get_bulkhead",
+    # 同步任务线程池
+    "get_sync_executor",
+    "run_sync",
+    "submit_sync",
     # 多模型支持
     "LLMRouter",
     "get_llm_router",
     "get_llm",
     "get_llm_with_fallback",
+    # 限流
+    "ProviderLimiter",
+    "RateLimitExceeded",
+    # 重试预算
+    "RetryBudget",
+    "get_retry_budget",
     # 响应缓存
     "ResponseCache",
     "get_cache",
+    # 请求合并
+    "SingleFlight",
+    "get_single_flight",
     # LangSmith
     "configure_langsmith",
     "is_langsmith_enabled",
@@ -0,0 +1,185 @@
+"""
+自适应并发限制模块 (Adaptive Concurrency Limit)
+
+LLM 后端的延迟随时段变化，固定的并发上限要么太保守、要么压垮提供商。
+这里按实测延迟动态调整允许的在途请求数（参考 TCP Vegas / Netflix concurrency-limits）：
+1. 记录一段时间窗口内的最小延迟（min_rtt）作为“无排队”基线
+2. gradient（默认）：limit ← limit × min(1, tolerance × min_rtt / rtt) + √limit，
+   延迟上升说明开始排队，按比例收缩；延迟接近基线时按 √limit 的余量增长
+3. aimd：失败或延迟超过 tolerance × min_rtt 时乘性减小，否则加性增大
+4. 只有在途请求数接近上限时才增长，避免空闲期把上限推得过高
+
+超过上限的请求不排队，立即失败（由调用方返回降级回复），不再堆到已经饱和的提供商上。
+
+使用方式：
+```python
+from src.core.adaptive_limiter import AdaptiveConcurrencyLimiter
+
+limiter = AdaptiveConcurrencyLimiter(initial_limit=20)
+
+token = limiter.try_acquire()
+if token is None:
+    return "系统繁忙"  # 被限流，快速降级
+try:
+    result = call_llm()
+    limiter.release(token)
+except Exception:
+    limiter.release(token, dropped=True)
+    raise
+```
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrencyLimiter:
+    """自适应并发限制器（线程安全，非阻塞）"""
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        algorithm: Literal["gradient", "aimd"] = "gradient",
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        backoff_ratio: float = 0.9,
+        min_rtt_window: float = 60.0,
+    ):
+        """
+        Args:
+            initial_limit: 初始并发上限
+            min_limit: 并发上限下限
+            max_limit: 并发上限上限
+            algorithm: 调整算法，"gradient" 或 "aimd"
+            tolerance: 可容忍的延迟倍数（相对 min_rtt），超过视为排队
+            smoothing: gradient 算法的平滑系数（0-1）
+            backoff_ratio: aimd 算法的乘性减小系数
+            min_rtt_window: 最小延迟基线的滑动时间窗口（秒）
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.algorithm = algorithm
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff_ratio = backoff_ratio
+        self.min_rtt_window = min_rtt_window
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        # 单调队列：(时间, 延迟)，队首为窗口内最小延迟
+        self._rtt_window: deque[tuple[float, float]] = deque()
+        self._last_rtt = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"accepted": 0, "shed": 0, "dropped": 0}
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def min_rtt(self) -> float | None:
+        """窗口内的最小延迟（秒）"""
+        return self._rtt_window[0][1] if self._rtt_window else None
+
+    def try_acquire(self) -> float | None:
+        """
+        尝试获取一个名额（不等待）
+
+        Returns:
+            成功时返回开始时间（作为 release 的凭证），超过上限返回 None
+        """
+        with self._lock:
+            if self._in_flight >= int(self._limit):
+                self._stats["shed"] += 1
+                return None
+            self._in_flight += 1
+            self._stats["accepted"] += 1
+        return time.monotonic()
+
+    def release(self, token: float, dropped: bool = False):
+        """
+        释放名额并按本次延迟调整上限
+
+        Args:
+            token: try_acquire 返回的凭证
+            dropped: 调用失败 / 超时（视为过载信号）
+        """
+        now = time.monotonic()
+        rtt = now - token
+        with self._lock:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            if dropped:
+                self._stats["dropped"] += 1
+            else:
+                self._record_rtt(now, rtt)
+            self._last_rtt = rtt
+
+            old = int(self._limit)
+            if self.algorithm == "aimd":
+                self._aimd(rtt, dropped, in_flight)
+            else:
+                self._gradient(rtt, dropped, in_flight)
+            self._limit = min(float(self.max_limit), max(float(self.min_limit), self._limit))
+            new = int(self._limit)
+
+        if new != old:
+            logger.debug(f"[AdaptiveLimiter] 并发上限 {old} -> {new} (rtt={rtt * 1000:.0f}ms)")
+
+    def _record_rtt(self, now: float, rtt: float):
+        """维护窗口内最小延迟（调用方持锁）"""
+        while self._rtt_window and self._rtt_window[-1][1] >= rtt:
+            self._rtt_window.pop()
+        self._rtt_window.append((now, rtt))
+        while now - self._rtt_window[0][0] > self.min_rtt_window:
+            self._rtt_window.popleft()
+
+    def _gradient(self, rtt: float, dropped: bool, in_flight: int):
+        """Vegas 风格梯度调整（调用方持锁）"""
+        min_rtt = self.min_rtt
+        if dropped:
+            gradient = 0.5
+        elif min_rtt is None or rtt <= 0:
+            return
+        else:
+            gradient = max(0.5, min(1.0, self.tolerance * min_rtt / rtt))
+
+        # 应用空闲（在途请求远低于上限）时不增长，只允许收缩
+        headroom = math.sqrt(self._limit) if in_flight * 2 >= self._limit else 0.0
+        target = self._limit * gradient + headroom
+        self._limit = self._limit * (1 - self.smoothing) + target * self.smoothing
+
+    def _aimd(self, rtt: float, dropped: bool, in_flight: int):
+        """加性增、乘性减（调用方持锁）"""
+        min_rtt = self.min_rtt
+        overloaded = dropped or (min_rtt is not None and rtt > self.tolerance * min_rtt)
+        if overloaded:
+            self._limit *= self.backoff_ratio
+        elif in_flight * 2 >= self._limit:
+            self._limit += 1.0
+
+    def get_stats(self) -> dict:
+        """并发上限与延迟基线（延迟单位为毫秒）"""
+        with self._lock:
+            min_rtt = self.min_rtt
+            return {
+                "algorithm": self.algorithm,
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "min_rtt_ms": round(min_rtt * 1000, 1) if min_rtt is not None else None,
+                "last_rtt_ms": round(self._last_rtt * 1000, 1),
+                **self._stats,
+            }
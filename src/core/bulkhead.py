@@ -0,0 +1,136 @@
+"""
+舱壁隔离模块 (Bulkhead)
+
+为不同类型的工作（各个 Agent、下游依赖）分配独立的并发名额，
+某一类慢请求（如 ProductAgent 的 RAG 调用）占满自己的舱壁后只会被拒绝，
+不会耗尽整个服务的线程 / 事件循环容量，其他 Agent 不受影响。
+
+舱壁复用 ConcurrencyLimiter（同步线程与协程共用 FIFO 队列），
+名额已满时最多等待 max_wait 秒，超时抛出 BulkheadFullError（计为拒绝，而非失败）。
+
+使用方式：
+```python
+from src.core.bulkhead import get_bulkhead
+
+bulkhead = get_bulkhead("ProductAgent")
+
+async with bulkhead.acquire():
+    await product_agent.achat(...)
+
+with bulkhead.acquire_sync():
+    product_agent.chat(...)
+```
+"""
+
+import math
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+from src.config import settings
+from src.core.rate_limiter import ConcurrencyLimiter
+
+
+class BulkheadFullError(Exception):
+    """舱壁名额已满且等待超时"""
+    pass
+
+
+class Bulkhead:
+    """命名舱壁（线程安全）"""
+
+    def __init__(self, name: str, max_concurrent: int, max_wait: float = 0.5):
+        """
+        Args:
+            name: 舱壁名称（Agent 或下游依赖）
+            max_concurrent: 最大并发数（<= 0 表示不限）
+            max_wait: 名额已满时的最长等待时间（秒）
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._limiter = ConcurrencyLimiter(max_concurrent)
+        self._stats = {"accepted": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _reject(self):
+        self._count("rejected")
+        raise BulkheadFullError(f"舱壁 '{self.name}' 已满（{self.max_concurrent} 并发，等待 {self.max_wait}s）")
+
+    @asynccontextmanager
+    async def acquire(self, timeout: float | None = None):
+        """异步获取名额，等待超时抛出 BulkheadFullError"""
+        if not await self._limiter.acquire(self.max_wait if timeout is None else timeout):
+            self._reject()
+        self._count("accepted")
+        try:
+            yield
+        finally:
+            self._limiter.release()
+
+    @contextmanager
+    def acquire_sync(self, timeout: float | None = None):
+        """同步获取名额，等待超时抛出 BulkheadFullError"""
+        if not self._limiter.acquire_sync(self.max_wait if timeout is None else timeout):
+            self._reject()
+        self._count("accepted")
+        try:
+            yield
+        finally:
+            self._limiter.release()
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_wait": self.max_wait,
+                "active": self._limiter.active,
+                "waiting": self._limiter.waiting,
+                **self._stats,
+            }
+
+
+# ===== 全局实例 =====
+
+_bulkheads: dict[str, Bulkhead] = {}
+_bulkheads_lock = threading.Lock()
+
+
+def bulkhead_limit(name: str) -> int:
+    """
+    舱壁容量：显式配置优先，其次按主提供商的并发上限 × 份额计算，否则使用默认容量
+
+    提供商不限并发时按份额计算的舱壁也不限（返回 0）
+    """
+    if name in settings.bulkhead_limits:
+        return settings.bulkhead_limits[name]
+    share = settings.bulkhead_shares.get(name)
+    if share is None:
+        return settings.bulkhead_default_limit
+    provider_limit = getattr(settings, f"{settings.llm_provider}_max_concurrency", 0)
+    if provider_limit <= 0:
+        return 0
+    return max(1, math.ceil(provider_limit * share))
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """获取命名舱壁（容量见 bulkhead_limit）"""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _bulkheads_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                bulkhead = _bulkheads[name] = Bulkhead(
+                    name,
+                    max_concurrent=bulkhead_limit(name),
+                    max_wait=settings.bulkhead_max_wait,
+                )
+    return bulkhead
+
+
+def get_bulkhead_stats() -> dict:
+    """所有舱壁的统计"""
+    return {name: bulkhead.get_stats() for name, bulkhead in list(_bulkheads.items())}
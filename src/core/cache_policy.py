@@ -0,0 +1,322 @@
+"""
+缓存淘汰与准入策略
+
+淘汰策略（决定缓存满时踢掉谁），所有操作 O(1)：
+1. LRU：最近最少使用，基于 OrderedDict
+2. LFU：最不经常使用，基于 频次 -> OrderedDict 的分桶结构，同频次按 LRU
+
+准入策略（决定新条目能否挤掉淘汰候选）：
+- TinyLFU：用 Count-Min Sketch 近似统计近期访问频次（读和写都计数）
+- W-TinyLFU：新条目先进入容量约 1% 的 LRU 窗口，被挤出窗口时再与主区的淘汰候选比较频次，
+  频次更高才进入主区。一次性查询只能在窗口里停留，冲刷不了热点；
+  刚开始变热的 key 在窗口中积累频次后就能进入主区
+
+使用方式：
+```python
+from src.core.cache_policy import create_eviction_policy, TinyLFUAdmission
+
+admission = TinyLFUAdmission(max_size=1000)
+policy = WindowTinyLFUPolicy(create_eviction_policy("lru"), admission, max_size=1000)
+```
+"""
+
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Literal
+
+import numpy as np
+
+EvictionPolicyType = Literal["lru", "lfu"]
+AdmissionPolicyType = Literal["none", "tinylfu"]
+
+
+class EvictionPolicy(ABC):
+    """淘汰策略抽象基类（只跟踪 key，不持有缓存值）"""
+
+    @abstractmethod
+    def record_insert(self, key: str) -> None:
+        """记录新写入的 key"""
+        pass
+
+    @abstractmethod
+    def record_access(self, key: str) -> None:
+        """记录一次命中"""
+        pass
+
+    @abstractmethod
+    def remove(self, key: str) -> None:
+        """移除 key（删除、过期或被淘汰）"""
+        pass
+
+    @abstractmethod
+    def victim(self) -> str | None:
+        """返回下一个应被淘汰的 key（不移除）"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空"""
+        pass
+
+    def victim_for(self, incoming: str) -> tuple[str | None, bool]:
+        """
+        缓存已满、要写入 incoming 时应淘汰的 key
+
+        Returns:
+            (淘汰的 key, 是否为准入拒绝)；淘汰的 key 可能就是 incoming 本身
+        """
+        return self.victim(), False
+
+
+class LRUPolicy(EvictionPolicy):
+    """LRU 淘汰策略"""
+
+    def __init__(self):
+        self._order: OrderedDict[str, None] = OrderedDict()
+
+    def record_insert(self, key: str) -> None:
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def record_access(self, key: str) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+
+    def remove(self, key: str) -> None:
+        self._order.pop(key, None)
+
+    def victim(self) -> str | None:
+        return next(iter(self._order), None)
+
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class LFUPolicy(EvictionPolicy):
+    """
+    LFU 淘汰策略（同频次内按 LRU）
+
+    非空的频次桶按频次升序串成双向链表（0 为哨兵头），
+    最小频次就是链表头，任意删除后也能 O(1) 找到下一个最小频次
+    """
+
+    def __init__(self):
+        self._freq: dict[str, int] = {}
+        self._buckets: dict[int, OrderedDict[str, None]] = {}
+        self._next: dict[int, int] = {}
+        self._prev: dict[int, int] = {}
+
+    def _link(self, freq: int, after: int):
+        """在频次 after 之后插入新的频次桶"""
+        self._buckets[freq] = OrderedDict()
+        nxt = self._next.get(after)
+        self._next[after] = freq
+        self._prev[freq] = after
+        if nxt is not None:
+            self._next[freq] = nxt
+            self._prev[nxt] = freq
+
+    def _discard(self, key: str, freq: int):
+        """从频次桶中移除 key，桶空时摘除该频次节点"""
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if bucket:
+            return
+        del self._buckets[freq]
+        prev = self._prev.pop(freq)
+        nxt = self._next.pop(freq, None)
+        if nxt is None:
+            self._next.pop(prev, None)
+        else:
+            self._next[prev] = nxt
+            self._prev[nxt] = prev
+
+    def _bump(self, key: str, freq: int):
+        if freq + 1 not in self._buckets:
+            self._link(freq + 1, after=freq)
+        self._buckets[freq + 1][key] = None
+        self._freq[key] = freq + 1
+        self._discard(key, freq)
+
+    def record_insert(self, key: str) -> None:
+        if key in self._freq:
+            self._bump(key, self._freq[key])
+            return
+        if 1 not in self._buckets:
+            self._link(1, after=0)
+        self._freq[key] = 1
+        self._buckets[1][key] = None
+
+    def record_access(self, key: str) -> None:
+        if key in self._freq:
+            self._bump(key, self._freq[key])
+
+    def remove(self, key: str) -> None:
+        freq = self._freq.pop(key, None)
+        if freq is not None:
+            self._discard(key, freq)
+
+    def victim(self) -> str | None:
+        min_freq = self._next.get(0)
+        if min_freq is None:
+            return None
+        return next(iter(self._buckets[min_freq]))
+
+    def clear(self) -> None:
+        self._freq.clear()
+        self._buckets.clear()
+        self._next.clear()
+        self._prev.clear()
+
+
+class TinyLFUAdmission:
+    """
+    TinyLFU 准入策略
+
+    Count-Min Sketch（4 行，计数上限 15）记录 key 的近期访问频次；
+    累计记录次数达到 sample_size 后所有计数减半（老化），让频次反映近期热度。
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, max_size: int, sample_factor: int = 10):
+        """
+        初始化
+
+        Args:
+            max_size: 缓存容量（决定 sketch 宽度）
+            sample_factor: 老化周期 = max_size * sample_factor 次记录
+        """
+        width = 1
+        while width < max(16, max_size * 4):
+            width <<= 1
+        self._shift = 64 - (width.bit_length() - 1)
+        self._table = np.zeros((self.DEPTH, width), dtype=np.uint8)
+        self._sample_size = max(1, max_size * sample_factor)
+        self._additions = 0
+        # 每行一个奇数乘子，取 64 位乘积的高位作为下标（各行相互独立，高位由 key 的全部位决定）
+        self._multipliers = (
+            0x9E3779B97F4A7C15,
+            0xC2B2AE3D27D4EB4F,
+            0x165667B19E3779F9,
+            0xD6E8FEB86659FD93,
+        )
+
+    def _indexes(self, key: str) -> list[int]:
+        # 不用内置 hash()：它按进程随机化，同样的访问序列在不同 worker / 重启后会得到不同的准入结果
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return [((h * m) & 0xFFFFFFFFFFFFFFFF) >> self._shift for m in self._multipliers]
+
+    def record(self, key: str) -> None:
+        """记录一次访问"""
+        for row, idx in enumerate(self._indexes(key)):
+            if self._table[row, idx] < self.MAX_COUNT:
+                self._table[row, idx] += 1
+
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._table >>= 1
+            self._additions //= 2
+
+    def frequency(self, key: str) -> int:
+        """估计 key 的近期访问频次"""
+        return int(min(self._table[row, idx] for row, idx in enumerate(self._indexes(key))))
+
+    def admit(self, candidate: str, victim: str) -> bool:
+        """新条目频次高于淘汰候选时才准入"""
+        return self.frequency(candidate) > self.frequency(victim)
+
+    def clear(self) -> None:
+        self._table[:] = 0
+        self._additions = 0
+
+
+class WindowTinyLFUPolicy(EvictionPolicy):
+    """
+    W-TinyLFU：LRU 准入窗口 + TinyLFU 过滤 + 主区淘汰策略
+
+    新 key 总是先进入窗口；缓存满时，窗口最老的 key 作为候选与主区淘汰候选比较频次，
+    败者被淘汰，胜出的候选在新 key 进入窗口时晋升到主区
+    """
+
+    def __init__(
+        self,
+        main: EvictionPolicy,
+        admission: TinyLFUAdmission,
+        max_size: int,
+        window_ratio: float = 0.01,
+    ):
+        """
+        初始化
+
+        Args:
+            main: 主区淘汰策略
+            admission: TinyLFU 频次统计
+            max_size: 缓存总容量
+            window_ratio: 窗口占总容量的比例（容量为 1 时不设窗口，退化为 TinyLFU）
+        """
+        self._main = main
+        self._admission = admission
+        self._window: OrderedDict[str, None] = OrderedDict()
+        self.window_size = max(1, int(max_size * window_ratio)) if max_size > 1 else 0
+
+    def record_insert(self, key: str) -> None:
+        if self.window_size == 0:
+            self._main.record_insert(key)
+            return
+        self._window[key] = None
+        self._window.move_to_end(key)
+        while len(self._window) > self.window_size:
+            promoted, _ = self._window.popitem(last=False)
+            self._main.record_insert(promoted)
+
+    def record_access(self, key: str) -> None:
+        if key in self._window:
+            self._window.move_to_end(key)
+        else:
+            self._main.record_access(key)
+
+    def remove(self, key: str) -> None:
+        if key in self._window:
+            del self._window[key]
+        else:
+            self._main.remove(key)
+
+    def victim(self) -> str | None:
+        return self._main.victim() or next(iter(self._window), None)
+
+    def victim_for(self, incoming: str) -> tuple[str | None, bool]:
+        main_victim = self._main.victim()
+        if self.window_size == 0:
+            candidate = incoming
+        elif len(self._window) >= self.window_size:
+            candidate = next(iter(self._window))
+        else:
+            # 窗口未满，新 key 进窗口不会挤出候选，直接从主区淘汰
+            return self.victim(), False
+
+        if main_victim is None:
+            return (None if candidate == incoming else candidate), False
+        if self._admission.admit(candidate, main_victim):
+            return main_victim, False
+        return candidate, True
+
+    def clear(self) -> None:
+        self._window.clear()
+        self._main.clear()
+
+
+def create_eviction_policy(kind: EvictionPolicyType = "lru") -> EvictionPolicy:
+    """
+    创建淘汰策略
+
+    Args:
+        kind: "lru" 或 "lfu"
+    """
+    if kind == "lru":
+        return LRUPolicy()
+    elif kind == "lfu":
+        return LFUPolicy()
+    raise ValueError(f"不支持的淘汰策略: {kind}")
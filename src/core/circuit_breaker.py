@@ -3,28 +3,53 @@
 
 熔断机制是一种保护系统的设计模式，类似于电路保险丝：
 1. CLOSED（闭合）：正常状态，请求正常通过
-2. OPEN（断开）：连续失败达到阈值后，直接拒绝请求，避免雪崩
-3. HALF_OPEN（半开）：经过一段时间后，允许部分请求通过，测试服务是否恢复
+2. OPEN（断开）：滑动窗口内失败率 / 慢调用率达到阈值后，直接拒绝请求，避免雪崩
+3. HALF_OPEN（半开）：经过一段时间后，允许少量试探请求通过，测试服务是否恢复
+
+滑动窗口是固定大小的环形缓冲区（最近 window_size 次调用的结果），
+计数随写入增量维护；状态读取不加锁，只有记录结果和状态转换时短暂持有线程锁，
+同步线程和协程可以共用同一个熔断器。
 
 核心参数：
-- failure_threshold: 触发熔断的连续失败次数
+- window_size: 滑动窗口大小（最近多少次调用）
+- failure_threshold: 窗口内至少有多少次调用才开始计算失败率（兼容旧参数名）
+- failure_rate_threshold: 触发熔断的失败率
+- slow_call_duration / slow_call_rate_threshold: 慢调用判定时长与触发熔断的慢调用率
 - recovery_timeout: 熔断后多久进入半开状态
-- half_open_max_calls: 半开状态允许的最大请求数
+- half_open_max_calls: 半开状态允许的试探请求数（全部成功后恢复闭合）
+- bulkhead: 可选的舱壁，限制该依赖的并发数（见 src/core/bulkhead.py）
 """
 
 import time
 import asyncio
+import inspect
+import threading
+from collections import deque
 from enum import Enum
 from typing import Callable, TypeVar, ParamSpec
 from functools import wraps
 from dataclasses import dataclass, field
 import logging
 
+from src.core.bulkhead import Bulkhead, BulkheadFullError
+from src.core.retry_budget import (
+    JitterMode,
+    RetryBudget,
+    backoff_delay,
+    get_retry_budget,
+    is_retryable,
+    retry_after_seconds,
+)
+
 logger = logging.getLogger(__name__)
 
 P = ParamSpec("P")
 T = TypeVar("T")
 
+# 环形缓冲区中每次调用的结果位
+_FAILED = 0b01
+_SLOW = 0b10
+
 
 class CircuitState(Enum):
     """熔断器状态"""
@@ -39,14 +64,17 @@ class CircuitBreakerStats:
     total_calls: int = 0
     success_count: int = 0
     failure_count: int = 0
+    slow_count: int = 0
+    rejected_count: int = 0  # 熔断拒绝
+    bulkhead_rejected_count: int = 0  # 舱壁已满拒绝
     consecutive_failures: int = 0
     last_failure_time: float = 0
-    state_changes: list = field(default_factory=list)
+    state_changes: deque = field(default_factory=lambda: deque(maxlen=50))  # 最近的状态转换
 
 
 class CircuitBreaker:
     """
-    熔断器
+    熔断器（线程安全，同步 / 异步通用）
     
     使用方式：
     ```python
@@ -55,6 +83,14 @@ class CircuitBreaker:
     @breaker
     def call_api():
         return requests.get("https://api.example.com")
+    
+    # 或者自行调用并上报结果
+    if breaker.allow_request():
+        try:
+            call_api()
+            breaker.record_success(duration)
+        except Exception as e:
+            breaker.record_failure(e, duration)
     ```
     """
     
@@ -65,36 +101,65 @@ class CircuitBreaker:
         half_open_max_calls: int = 3,
         fallback: Callable | None = None,
         name: str = "default",
+        window_size: int = 20,
+        failure_rate_threshold: float = 0.5,
+        slow_call_duration: float | None = None,
+        slow_call_rate_threshold: float = 1.0,
+        bulkhead: Bulkhead | None = None,
     ):
         """
         初始化熔断器
         
         Args:
-            failure_threshold: 连续失败多少次后触发熔断
+            failure_threshold: 窗口内的最少调用次数，达到后才按失败率 / 慢调用率判断
             recovery_timeout: 熔断后多少秒进入半开状态
             half_open_max_calls: 半开状态允许尝试的请求数
-            fallback: 熔断时的降级函数
+            fallback: 熔断 / 调用失败 / 舱壁已满时的降级函数（异步调用时可以是协程函数）
             name: 熔断器名称（用于日志）
+            window_size: 滑动窗口大小（最近多少次调用）
+            failure_rate_threshold: 触发熔断的失败率（0-1）
+            slow_call_duration: 超过该耗时（秒）的调用记为慢调用，None 表示不统计
+            slow_call_rate_threshold: 触发熔断的慢调用率（0-1）
+            bulkhead: 舱壁（限制该依赖的并发数），为 None 表示不限制
         """
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
         self.half_open_max_calls = half_open_max_calls
         self.fallback = fallback
         self.name = name
+        self.window_size = max(window_size, failure_threshold)
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.bulkhead = bulkhead
         
         self._state = CircuitState.CLOSED
         self._stats = CircuitBreakerStats()
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        
+        # 环形缓冲区与增量维护的窗口计数
+        self._window = bytearray(self.window_size)
+        self._window_index = 0
+        self._window_count = 0
+        self._window_failures = 0
+        self._window_slow = 0
+        
+        # 半开状态：已放行的试探请求数、成功数、进入半开的时间
         self._half_open_calls = 0
-        self._lock = asyncio.Lock()
+        self._half_open_successes = 0
+        self._half_open_since = 0.0
     
     @property
     def state(self) -> CircuitState:
-        """获取当前状态（自动检查是否应该转换）"""
-        if self._state == CircuitState.OPEN:
-            # 检查是否应该进入半开状态
-            if time.time() - self._stats.last_failure_time >= self.recovery_timeout:
-                self._transition_to(CircuitState.HALF_OPEN)
-        return self._state
+        """获取当前状态（不加锁；熔断超时后自动转为半开）"""
+        state = self._state
+        if state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            with self._lock:
+                if self._state == CircuitState.OPEN:
+                    self._transition_to(CircuitState.HALF_OPEN)
+                state = self._state
+        return state
     
     @property
     def stats(self) -> CircuitBreakerStats:
@@ -102,7 +167,7 @@ class CircuitBreaker:
         return self._stats
     
     def _transition_to(self, new_state: CircuitState):
-        """状态转换"""
+        """状态转换（调用方持锁）"""
         if self._state != new_state:
             old_state = self._state
             self._state = new_state
@@ -113,37 +178,110 @@ class CircuitBreaker:
             })
             logger.info(f"[CircuitBreaker:{self.name}] {old_state.value} -> {new_state.value}")
             
-            if new_state == CircuitState.HALF_OPEN:
+            if new_state == CircuitState.OPEN:
+                self._opened_at = time.monotonic()
+            elif new_state == CircuitState.HALF_OPEN:
                 self._half_open_calls = 0
+                self._half_open_successes = 0
+                self._half_open_since = time.monotonic()
+            else:
+                self._reset_window()
+    
+    def _reset_window(self):
+        self._window = bytearray(self.window_size)
+        self._window_index = 0
+        self._window_count = 0
+        self._window_failures = 0
+        self._window_slow = 0
+    
+    def _push(self, outcome: int):
+        """写入环形缓冲区，覆盖最旧的结果并更新计数（调用方持锁）"""
+        if self._window_count == self.window_size:
+            evicted = self._window[self._window_index]
+            self._window_failures -= evicted & _FAILED
+            self._window_slow -= (evicted & _SLOW) >> 1
+        else:
+            self._window_count += 1
+        self._window[self._window_index] = outcome
+        self._window_index = (self._window_index + 1) % self.window_size
+        self._window_failures += outcome & _FAILED
+        self._window_slow += (outcome & _SLOW) >> 1
     
-    def _record_success(self):
-        """记录成功"""
-        self._stats.total_calls += 1
-        self._stats.success_count += 1
-        self._stats.consecutive_failures = 0
+    def _should_open(self) -> bool:
+        """窗口内调用数达到下限后，失败率或慢调用率超过阈值（调用方持锁）"""
+        count = self._window_count
+        if count < self.failure_threshold:
+            return False
+        if self._window_failures / count >= self.failure_rate_threshold:
+            return True
+        return self.slow_call_duration is not None and self._window_slow / count >= self.slow_call_rate_threshold
+    
+    def allow_request(self) -> bool:
+        """
+        是否放行本次请求
         
-        # 半开状态下成功，恢复到闭合
-        if self._state == CircuitState.HALF_OPEN:
-            self._half_open_calls += 1
-            if self._half_open_calls >= self.half_open_max_calls:
-                self._transition_to(CircuitState.CLOSED)
+        闭合状态不加锁；半开状态最多放行 half_open_max_calls 个试探请求
+        （试探请求迟迟没有结果时，超过 recovery_timeout 后重新放行）。
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            with self._lock:
+                if self._state == CircuitState.HALF_OPEN:
+                    if (
+                        self._half_open_calls >= self.half_open_max_calls
+                        and time.monotonic() - self._half_open_since >= self.recovery_timeout
+                    ):
+                        self._half_open_calls = self._half_open_successes
+                        self._half_open_since = time.monotonic()
+                    if self._half_open_calls < self.half_open_max_calls:
+                        self._half_open_calls += 1
+                        return True
+        self._stats.rejected_count += 1
+        return False
     
-    def _record_failure(self, error: Exception):
+    def record_success(self, duration: float = 0.0):
+        """记录成功（耗时超过 slow_call_duration 记为慢调用）"""
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        with self._lock:
+            self._stats.total_calls += 1
+            self._stats.success_count += 1
+            self._stats.slow_count += int(slow)
+            self._stats.consecutive_failures = 0
+            
+            if self._state == CircuitState.HALF_OPEN:
+                # 半开状态下慢调用视为未恢复，重新熔断；试探请求全部成功则恢复闭合
+                if slow:
+                    self._transition_to(CircuitState.OPEN)
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition_to(CircuitState.CLOSED)
+            elif self._state == CircuitState.CLOSED:
+                self._push(_SLOW if slow else 0)
+                if slow and self._should_open():
+                    self._transition_to(CircuitState.OPEN)
+    
+    def record_failure(self, error: Exception | None = None, duration: float = 0.0):
         """记录失败"""
-        self._stats.total_calls += 1
-        self._stats.failure_count += 1
-        self._stats.consecutive_failures += 1
-        self._stats.last_failure_time = time.time()
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        with self._lock:
+            self._stats.total_calls += 1
+            self._stats.failure_count += 1
+            self._stats.slow_count += int(slow)
+            self._stats.consecutive_failures += 1
+            self._stats.last_failure_time = time.time()
+            
+            if self._state == CircuitState.CLOSED:
+                self._push(_FAILED | (_SLOW if slow else 0))
+                if self._should_open():
+                    self._transition_to(CircuitState.OPEN)
+            elif self._state == CircuitState.HALF_OPEN:
+                # 半开状态下失败，重新熔断
+                self._transition_to(CircuitState.OPEN)
         
         logger.warning(f"[CircuitBreaker:{self.name}] 调用失败: {error}")
-        
-        # 检查是否需要熔断
-        if self._state == CircuitState.CLOSED:
-            if self._stats.consecutive_failures >= self.failure_threshold:
-                self._transition_to(CircuitState.OPEN)
-        elif self._state == CircuitState.HALF_OPEN:
-            # 半开状态下失败，重新熔断
-            self._transition_to(CircuitState.OPEN)
     
     def __call__(self, func: Callable[P, T]) -> Callable[P, T]:
         """装饰器模式"""
@@ -159,61 +297,134 @@ class CircuitBreaker:
             return async_wrapper
         return sync_wrapper
     
-    async def call_async(self, func: Callable, *args, **kwargs):
-        """异步调用"""
-        async with self._lock:
-            state = self.state
-        
-        if state == CircuitState.OPEN:
-            logger.warning(f"[CircuitBreaker:{self.name}] 熔断中，使用降级策略")
-            if self.fallback:
-                return self.fallback(*args, **kwargs)
-            raise CircuitOpenError(f"Circuit breaker '{self.name}' is OPEN")
-        
+    def release_permit(self):
+        """放弃已获得的放行许可（未实际调用，如舱壁已满）"""
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+    
+    def _fallback_sync(self, error: Exception, *args, **kwargs):
+        """同步降级：有降级函数时返回其结果，否则抛出 error（同步调用只支持同步降级函数）"""
+        if not self.fallback:
+            raise error
+        return self.fallback(*args, **kwargs)
+    
+    async def _fallback_async(self, error: Exception, *args, **kwargs):
+        """异步降级：降级函数可以是普通函数或协程函数"""
+        if not self.fallback:
+            raise error
+        result = self.fallback(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    
+    def _open_error(self) -> "CircuitOpenError":
+        logger.warning(f"[CircuitBreaker:{self.name}] 熔断中，使用降级策略")
+        return CircuitOpenError(f"Circuit breaker '{self.name}' is OPEN")
+    
+    def _bulkhead_rejected(self, error: Exception):
+        self._stats.bulkhead_rejected_count += 1
+        logger.warning(f"[CircuitBreaker:{self.name}] {error}，使用降级策略")
+    
+    async def _guarded_async(self, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
         try:
             if asyncio.iscoroutinefunction(func):
                 result = await func(*args, **kwargs)
             else:
                 result = func(*args, **kwargs)
-            
-            async with self._lock:
-                self._record_success()
-            return result
-            
         except Exception as e:
-            async with self._lock:
-                self._record_failure(e)
-            
-            if self.fallback:
-                return self.fallback(*args, **kwargs)
-            raise
+            self.record_failure(e, time.perf_counter() - start)
+            return await self._fallback_async(e, *args, **kwargs)
+        
+        self.record_success(time.perf_counter() - start)
+        return result
+    
+    def _guarded_sync(self, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e, time.perf_counter() - start)
+            return self._fallback_sync(e, *args, **kwargs)
+        
+        self.record_success(time.perf_counter() - start)
+        return result
+    
+    async def call_async(self, func: Callable, *args, **kwargs):
+        """
+        异步调用
+        
+        熔断中或舱壁已满时使用降级函数（可等待），舱壁拒绝单独计数，不计为失败
+        """
+        if not self.allow_request():
+            return await self._fallback_async(self._open_error(), *args, **kwargs)
+        if self.bulkhead is None:
+            return await self._guarded_async(func, *args, **kwargs)
+        
+        entered = False
+        try:
+            async with self.bulkhead.acquire():
+                entered = True
+                return await self._guarded_async(func, *args, **kwargs)
+        except BulkheadFullError as e:
+            if entered:
+                raise
+            self.release_permit()
+            self._bulkhead_rejected(e)
+            return await self._fallback_async(e, *args, **kwargs)
     
     def call_sync(self, func: Callable, *args, **kwargs):
         """同步调用"""
-        state = self.state
-        
-        if state == CircuitState.OPEN:
-            logger.warning(f"[CircuitBreaker:{self.name}] 熔断中，使用降级策略")
-            if self.fallback:
-                return self.fallback(*args, **kwargs)
-            raise CircuitOpenError(f"Circuit breaker '{self.name}' is OPEN")
+        if not self.allow_request():
+            return self._fallback_sync(self._open_error(), *args, **kwargs)
+        if self.bulkhead is None:
+            return self._guarded_sync(func, *args, **kwargs)
         
+        entered = False
         try:
-            result = func(*args, **kwargs)
-            self._record_success()
-            return result
-        except Exception as e:
-            self._record_failure(e)
-            if self.fallback:
-                return self.fallback(*args, **kwargs)
-            raise
+            with self.bulkhead.acquire_sync():
+                entered = True
+                return self._guarded_sync(func, *args, **kwargs)
+        except BulkheadFullError as e:
+            if entered:
+                raise
+            self.release_permit()
+            self._bulkhead_rejected(e)
+            return self._fallback_sync(e, *args, **kwargs)
     
     def reset(self):
         """重置熔断器"""
-        self._state = CircuitState.CLOSED
-        self._stats = CircuitBreakerStats()
-        self._half_open_calls = 0
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._stats = CircuitBreakerStats()
+            self._half_open_calls = 0
+            self._half_open_successes = 0
+            self._reset_window()
         logger.info(f"[CircuitBreaker:{self.name}] 已重置")
+    
+    def get_stats(self) -> dict:
+        """熔断器状态与滑动窗口统计"""
+        state = self.state
+        with self._lock:
+            count = self._window_count
+            return {
+                "name": self.name,
+                "state": state.value,
+                "window": {
+                    "size": self.window_size,
+                    "calls": count,
+                    "failure_rate": round(self._window_failures / count, 4) if count else 0.0,
+                    "slow_call_rate": round(self._window_slow / count, 4) if count else 0.0,
+                },
+                "total_calls": self._stats.total_calls,
+                "failures": self._stats.failure_count,
+                "slow_calls": self._stats.slow_count,
+                "rejected": self._stats.rejected_count,
+                "bulkhead_rejected": self._stats.bulkhead_rejected_count,
+                "bulkhead": self.bulkhead.get_stats() if self.bulkhead else None,
+                "state_changes": list(self._stats.state_changes)[-5:],
+            }
 
 
 class CircuitOpenError(Exception):
@@ -228,55 +439,79 @@ def with_retry(
     retry_delay: float = 1.0,
     exponential_backoff: bool = True,
     retryable_exceptions: tuple = (Exception,),
+    max_delay: float = 30.0,
+    jitter: JitterMode = "full",
+    budget: RetryBudget | None = None,
+    retryable: Callable[[Exception], bool] | None = is_retryable,
 ):
     """
     重试装饰器
     
+    只重试临时性错误，退避带随机抖动，服务端返回 Retry-After 时按其等待；
+    每次重试都要从重试预算中申请，预算耗尽（故障期间）时直接抛出，避免放大负载。
+    
     Args:
         max_retries: 最大重试次数
         retry_delay: 初始重试延迟（秒）
         exponential_backoff: 是否使用指数退避
         retryable_exceptions: 可重试的异常类型
+        max_delay: 单次等待上限（秒），Retry-After 超过该值时不再重试
+        jitter: 抖动方式，"full" / "decorrelated" / "none"
+        budget: 重试预算，为 None 使用全局预算
+        retryable: 错误分类函数（返回是否可重试），为 None 时不额外分类
     """
+    def next_delay(error: Exception, attempt: int, previous: float) -> float | None:
+        """下一次重试前的等待时间；不应重试时返回 None"""
+        if attempt >= max_retries:
+            logger.error(f"重试耗尽: {error}")
+            return None
+        if retryable is not None and not retryable(error):
+            return None
+        
+        delay = backoff_delay(attempt, retry_delay, max_delay, previous, jitter, exponential_backoff)
+        server_delay = retry_after_seconds(error)
+        if server_delay is not None:
+            if server_delay > max_delay:
+                logger.warning(f"Retry-After {server_delay:.1f}s 超过上限，放弃重试: {error}")
+                return None
+            delay = max(delay, server_delay)
+        
+        if not (budget or get_retry_budget()).try_acquire():
+            logger.warning(f"重试预算耗尽，放弃重试: {error}")
+            return None
+        logger.warning(f"重试 {attempt + 1}/{max_retries}，延迟 {delay:.2f}s: {error}")
+        return delay
+    
     def decorator(func: Callable[P, T]) -> Callable[P, T]:
         @wraps(func)
         async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            last_exception = None
+            (budget or get_retry_budget()).record_request()
+            delay = retry_delay
             
             for attempt in range(max_retries + 1):
                 try:
                     if asyncio.iscoroutinefunction(func):
                         return await func(*args, **kwargs)
                     return func(*args, **kwargs)
-                    
                 except retryable_exceptions as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        delay = retry_delay * (2 ** attempt if exponential_backoff else 1)
-                        logger.warning(f"重试 {attempt + 1}/{max_retries}，延迟 {delay}s: {e}")
-                        await asyncio.sleep(delay)
-                    else:
-                        logger.error(f"重试耗尽: {e}")
-            
-            raise last_exception
+                    delay = next_delay(e, attempt, delay)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
         
         @wraps(func)
         def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            last_exception = None
+            (budget or get_retry_budget()).record_request()
+            delay = retry_delay
             
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
                 except retryable_exceptions as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        delay = retry_delay * (2 ** attempt if exponential_backoff else 1)
-                        logger.warning(f"重试 {attempt + 1}/{max_retries}，延迟 {delay}s: {e}")
-                        time.sleep(delay)
-                    else:
-                        logger.error(f"重试耗尽: {e}")
-            
-            raise last_exception
+                    delay = next_delay(e, attempt, delay)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
         
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
@@ -287,14 +522,18 @@ def with_retry(
 
 # ===== 全局熔断器实例 =====
 
-# LLM 调用熔断器
+# LLM 不可用 / 过载时的降级回复
+LLM_FALLBACK_MESSAGE = "抱歉，系统暂时繁忙，请稍后重试。您也可以联系人工客服获取帮助。"
+
+# 通用 LLM 调用熔断器（带降级回复）；按提供商 / 模型隔离的熔断器由 LLMRouter 创建，
+# 见 get_llm_router().breaker(provider)
 llm_circuit_breaker = CircuitBreaker(
     name="llm",
     failure_threshold=3,
     recovery_timeout=60.0,
     fallback=lambda *args, **kwargs: {
         "type": "response",
-        "content": "抱歉，系统暂时繁忙，请稍后重试。您也可以联系人工客服获取帮助。",
+        "content": LLM_FALLBACK_MESSAGE,
         "tool_calls": None,
     },
 )
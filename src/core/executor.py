@@ -0,0 +1,70 @@
+"""
+同步任务线程池模块
+
+异步工作流里仍有少量只能同步调用的依赖（Chroma 检索、同步 embedding 接口等），
+直接在事件循环里调用会阻塞同一 worker 上的所有会话。这里提供一个有界的专用线程池：
+1. 线程数固定（settings.sync_executor_workers），突发流量只会排队，不会无限创建线程
+2. 与 FastAPI 默认线程池隔离，慢检索不会占满其他同步端点的线程
+3. 保留调用方的 contextvars（LangSmith 追踪、回调上下文在线程内依然可用）
+
+使用方式：
+```python
+from src.core.executor import run_sync, submit_sync
+
+docs = await run_sync(retriever.search, query, k=3)
+
+future = submit_sync(retriever.search, query, k=3)  # 先启动，稍后再取结果
+```
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from src.config import settings
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_sync_executor() -> ThreadPoolExecutor:
+    """获取全局同步任务线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.sync_executor_workers,
+                    thread_name_prefix="shopmate-sync",
+                )
+    return _executor
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在有界线程池中执行同步函数并等待结果"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_sync_executor(),
+        functools.partial(context.run, func, *args, **kwargs),
+    )
+
+
+def submit_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+    """提交同步函数到有界线程池，立即返回 Future（同步、异步调用方均可使用）"""
+    context = contextvars.copy_context()
+    return get_sync_executor().submit(context.run, func, *args, **kwargs)
+
+
+def shutdown_sync_executor(wait: bool = True):
+    """关闭线程池（应用退出时调用）"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -1,18 +1,23 @@
 """
 多模型支持模块
 
-支持多个 LLM 提供商，自动故障转移：
-1. 主模型（primary）：优先使用
-2. 备用模型（fallback）：主模型失败时自动切换
+支持多个 LLM 提供商，两种路由模式（settings.llm_routing_mode）：
+1. weighted（默认）：按 EWMA 延迟与错误率加权分流，失败自动切换、恢复后自动回流
+   （见 src/core/routed_llm.py）
+2. static：固定使用主模型（primary），手动 switch_to_fallback / switch_to_primary
+
+每个提供商的客户端实例只创建一次并长期复用，OpenAI 兼容客户端共享
+同一个保持长连接的 HTTP 连接池，避免每次调用都重新建连和 TLS 握手。
+应用退出时调用 `aclose()` 释放连接。
 
 使用方式：
 ```python
 from src.core.llm_router import get_llm, LLMRouter
 
-# 简单用法（自动选择可用模型）
+# 简单用法（weighted 模式下自动选择最快的健康后端）
 llm = get_llm()
 
-# 高级用法（手动切换）
+# static 模式（手动切换）
 router = LLMRouter()
 llm = router.get_primary()
 # 如果失败，自动切换
@@ -21,12 +26,17 @@ llm = router.switch_to_fallback()
 """
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 from dataclasses import dataclass
 
 from langchain_core.language_models.chat_models import BaseChatModel
 
 from src.config import settings
+from src.core.circuit_breaker import CircuitBreaker, CircuitState
+from src.core.rate_limiter import ProviderLimiter, estimate_tokens
+from src.core.routed_llm import HedgePolicy, LatencyKind, ProviderHealth, RoutedChatModel, WeightTable
 
 logger = logging.getLogger(__name__)
 
@@ -67,17 +77,81 @@ class LLMRouter:
                 api_key=settings.openai_api_key,
                 base_url=settings.openai_base_url,
             ),
+            # 本地模拟提供商，仅在 LLM_PROVIDER=mock 时启用
+            "mock": ModelConfig(
+                provider="mock",
+                model="mock",
+                api_key="mock" if settings.llm_provider == "mock" else "",
+            ),
         }
         
-        # 当前活跃的提供商
+        # 当前活跃的提供商（mock 模式完全离线，只使用本地模拟提供商）
         self._active_provider = settings.llm_provider
+        self.offline = settings.llm_provider == "mock"
         self._fallback_used = False
         
-        logger.info(f"LLMRouter 初始化: 主模型={self._active_provider}")
+        # 加权路由：每个提供商的实时健康度
+        self.routing_mode = settings.llm_routing_mode
+        self._weights = WeightTable()
+        for name, cfg in self.models.items():
+            self._weights.health(name, cfg.model)
+        self._routed: RoutedChatModel | None = None
+        
+        # 对冲请求：主提供商迟迟不响应时向次选提供商并行发出相同请求
+        self.hedging = HedgePolicy(
+            enabled=settings.llm_hedge_enabled,
+            percentile=settings.llm_hedge_percentile,
+            max_per_minute=settings.llm_hedge_max_per_minute,
+            min_delay=settings.llm_hedge_min_delay,
+            default_delay=settings.llm_hedge_default_delay,
+        )
+        self._hedge_executor: ThreadPoolExecutor | None = None
+        
+        # 每个提供商的限流器（RPM / TPM / 并发上限），超限时短暂排队
+        self._limiters = {
+            name: ProviderLimiter(
+                name,
+                rpm=getattr(settings, f"{name}_rpm", 0),
+                tpm=getattr(settings, f"{name}_tpm", 0),
+                max_concurrency=getattr(settings, f"{name}_max_concurrency", 0),
+                max_wait=settings.llm_queue_max_wait,
+            )
+            for name in self.models
+        }
+        
+        # 每个提供商 / 模型一个熔断器，某个提供商故障时只摘除它，不影响其他提供商
+        self._breakers = {
+            name: CircuitBreaker(
+                name=f"{name}:{cfg.model}",
+                window_size=settings.llm_breaker_window_size,
+                failure_threshold=settings.llm_breaker_min_calls,
+                failure_rate_threshold=settings.llm_breaker_failure_rate,
+                slow_call_duration=settings.llm_breaker_slow_call_duration,
+                slow_call_rate_threshold=settings.llm_breaker_slow_call_rate,
+                recovery_timeout=settings.llm_breaker_recovery_timeout,
+                half_open_max_calls=settings.llm_breaker_half_open_calls,
+            )
+            for name, cfg in self.models.items()
+        }
+        
+        # 长期复用的客户端实例（provider -> LLM）与共享的 HTTP 连接池
+        self._clients: dict[str, BaseChatModel] = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._lock = threading.Lock()
+        
+        logger.info(f"LLMRouter 初始化: 主模型={self._active_provider}, 路由模式={self.routing_mode}")
     
     @property
     def available_providers(self) -> list[str]:
-        """获取所有可用的提供商"""
+        """
+        获取所有可用的提供商
+        
+        LLM_PROVIDER=mock 时只使用本地模拟提供商：即使 .env 中配置了真实提供商的 API Key，
+        离线运行（压测、评测脚本）也不会把流量分到付费的真实提供商
+        """
+        if self.offline:
+            return ["mock"]
         return [name for name, cfg in self.models.items() if cfg.is_available]
     
     @property
@@ -90,19 +164,37 @@ class LLMRouter:
         """是否正在使用备用模型"""
         return self._fallback_used
     
+    def _http_clients(self):
+        """获取共享的 httpx 同步 / 异步客户端（懒加载，调用方持锁）"""
+        if self._http_client is None:
+            import httpx
+            
+            limits = httpx.Limits(
+                max_connections=settings.llm_http_max_connections,
+                max_keepalive_connections=settings.llm_http_max_keepalive,
+                keepalive_expiry=settings.llm_http_keepalive_expiry,
+            )
+            timeout = httpx.Timeout(settings.llm_http_timeout, connect=10.0)
+            self._http_client = httpx.Client(limits=limits, timeout=timeout)
+            self._http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return self._http_client, self._http_async_client
+    
     def _create_llm(self, provider: str) -> BaseChatModel:
         """创建 LLM 实例"""
         config = self.models.get(provider)
-        if not config or not config.is_available:
+        if not config or provider not in self.available_providers:
             raise ValueError(f"Provider '{provider}' 不可用或未配置")
         
         if provider == "openai":
             from langchain_openai import ChatOpenAI
+            http_client, http_async_client = self._http_clients()
             return ChatOpenAI(
                 model=config.model,
                 api_key=config.api_key,
                 base_url=config.base_url,
                 temperature=config.temperature,
+                http_client=http_client,
+                http_async_client=http_async_client,
             )
         elif provider == "dashscope":
             from langchain_community.chat_models import ChatTongyi
@@ -111,18 +203,124 @@ class LLMRouter:
                 api_key=config.api_key,
                 temperature=config.temperature,
             )
+        elif provider == "mock":
+            from src.core.mock_llm import MockChatModel
+            return MockChatModel(
+                latency_ms=settings.mock_latency_ms,
+                latency_sigma=settings.mock_latency_sigma,
+                tokens_per_second=settings.mock_tokens_per_second,
+                failure_rate=settings.mock_failure_rate,
+                seed=settings.mock_seed,
+            )
         else:
             raise ValueError(f"不支持的 provider: {provider}")
     
+    def route_order(self) -> list[str]:
+        """
+        本次调用的提供商尝试顺序（首选按权重随机，其余为后备）
+        
+        熔断中的提供商不参与分流；全部熔断时仍返回全部，由熔断器直接拒绝。
+        """
+        providers = self.available_providers
+        healthy = [p for p in providers if self._breakers[p].state != CircuitState.OPEN]
+        return self._weights.order(healthy or providers)
+    
+    def record_result(
+        self,
+        provider: str,
+        latency: float,
+        error: Exception | None = None,
+        kind: LatencyKind = "completion",
+        sample: bool = True,
+    ):
+        """
+        记录一次调用结果，更新该提供商的 EWMA 延迟、错误率与熔断器窗口
+        
+        kind 区分完整耗时与流式首 token 延迟（对冲等待时间按调用类型取各自的分位数）；
+        sample=False 时只更新 EWMA，不计入分位数样本
+        """
+        self._weights.record(provider, latency, failed=error is not None, kind=kind, sample=sample)
+        if error is not None:
+            self._breakers[provider].record_failure(error, latency)
+            logger.warning(f"LLM 调用失败 [{provider}]: {error}")
+        else:
+            self._breakers[provider].record_success(latency)
+    
+    def breaker(self, provider: str) -> CircuitBreaker:
+        """提供商的熔断器"""
+        return self._breakers[provider]
+    
+    def health(self, provider: str) -> ProviderHealth:
+        """提供商的实时健康度（延迟样本用于计算对冲等待时间）"""
+        return self._weights.health(provider)
+    
+    def limiter(self, provider: str) -> ProviderLimiter:
+        """提供商的限流器"""
+        return self._limiters[provider]
+    
+    def estimate_tokens(self, messages: list) -> int:
+        """预估一次调用的 token 数（用于 TPM 预约，调用后按实际用量修正）"""
+        return estimate_tokens(messages, settings.llm_expected_completion_tokens)
+    
+    def hedge_executor(self) -> ThreadPoolExecutor:
+        """同步调用对冲使用的线程池（懒加载）"""
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=16, thread_name_prefix="llm-hedge"
+                    )
+        return self._hedge_executor
+    
+    def get_weights(self) -> dict:
+        """各提供商的实时权重与健康度"""
+        return self._weights.snapshot(self.available_providers)
+    
     def get_llm(self, provider: str | None = None) -> BaseChatModel:
         """
-        获取 LLM 实例
+        获取 LLM 实例（每个提供商只创建一次，之后复用）
         
         Args:
-            provider: 指定提供商，为 None 则使用当前活跃的
+            provider: 指定提供商；为 None 时 weighted 模式返回加权路由模型，
+                      static 模式使用当前活跃的提供商
         """
+        if provider is None and self.routing_mode == "weighted":
+            if not self.available_providers:
+                raise ValueError("没有可用的 LLM 提供商")
+            if self._routed is None:
+                self._routed = RoutedChatModel(router=self)
+            return self._routed
+        
         target = provider or self._active_provider
-        return self._create_llm(target)
+        llm = self._clients.get(target)
+        if llm is None:
+            with self._lock:
+                llm = self._clients.get(target)
+                if llm is None:
+                    llm = self._create_llm(target)
+                    self._clients[target] = llm
+                    logger.info(f"LLM 客户端已创建: {target}")
+        return llm
+    
+    def close(self):
+        """关闭同步连接池并清空客户端注册表"""
+        with self._lock:
+            self._clients.clear()
+            self._routed = None
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+                self._hedge_executor = None
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+    
+    async def aclose(self):
+        """关闭所有连接池（应用退出时调用）"""
+        async_client = self._http_async_client
+        self._http_async_client = None
+        self.close()
+        if async_client is not None:
+            await async_client.aclose()
     
     def get_primary(self) -> BaseChatModel:
         """获取主模型"""
@@ -131,17 +329,17 @@ class LLMRouter:
     def get_fallback(self) -> BaseChatModel | None:
         """获取备用模型"""
         # 找到第一个不是主模型且可用的提供商
-        for provider, config in self.models.items():
-            if provider != settings.llm_provider and config.is_available:
+        for provider in self.available_providers:
+            if provider != settings.llm_provider:
                 return self.get_llm(provider)
         return None
     
     def switch_to_fallback(self) -> BaseChatModel | None:
-        """切换到备用模型"""
+        """切换到备用模型（static 模式；weighted 模式下自动切换，无需调用）"""
         fallback = self.get_fallback()
         if fallback:
-            for provider, config in self.models.items():
-                if provider != settings.llm_provider and config.is_available:
+            for provider in self.available_providers:
+                if provider != settings.llm_provider:
                     self._active_provider = provider
                     self._fallback_used = True
                     logger.warning(f"已切换到备用模型: {provider}")
@@ -150,7 +348,7 @@ class LLMRouter:
         return None
     
     def switch_to_primary(self) -> BaseChatModel:
-        """切换回主模型"""
+        """切换回主模型（static 模式；weighted 模式下故障恢复后自动回流）"""
         self._active_provider = settings.llm_provider
         self._fallback_used = False
         logger.info(f"已切换回主模型: {settings.llm_provider}")
@@ -162,6 +360,12 @@ class LLMRouter:
             "active_provider": self._active_provider,
             "using_fallback": self._fallback_used,
             "available_providers": self.available_providers,
+            "clients": sorted(self._clients),
+            "routing_mode": self.routing_mode,
+            "weights": self.get_weights(),
+            "hedging": self.hedging.get_stats(),
+            "rate_limits": {name: limiter.get_stats() for name, limiter in self._limiters.items()},
+            "circuit_breakers": {name: breaker.get_stats() for name, breaker in self._breakers.items()},
             "models": {
                 name: {
                     "model": cfg.model,
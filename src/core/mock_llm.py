@@ -0,0 +1,207 @@
+"""
+本地 Mock LLM 模块
+
+离线压测与 CI 使用的确定性 Chat 模型（LLM_PROVIDER=mock）：
+1. 延迟：对数正态分布（中位数 + 离散度），流式按 tokens/s 逐块输出
+2. 失败：按失败率抛出 MockLLMError，用于验证熔断、限流、对冲与故障切换
+3. 回复：内置路由规则（识别 Supervisor 路由提示词并按关键词返回 Agent 名称；
+   识别单次调用模式的分诊提示词并返回 JSON），其余按模板生成，同一输入总是得到同一回复
+4. 用量：按字符数报告输入 / 输出 token，便于对比不同工作流的 token 消耗
+
+同一 seed 下延迟与失败序列可复现，便于对比不同版本的压测结果。
+
+使用方式：
+```python
+from src.core.mock_llm import MockChatModel
+
+llm = MockChatModel(latency_ms=200, tokens_per_second=80, failure_rate=0.05)
+llm.invoke("iPhone 15 Pro 多少钱？")
+```
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field, PrivateAttr
+
+# Supervisor 路由提示词的特征与关键词 -> Agent（按顺序匹配）
+_ROUTING_MARKER = "请只输出一个 Agent 名称"
+# 单次调用模式（分诊 + 直接回答）提示词的特征
+_TRIAGE_MARKER = "请只输出一个 JSON 对象"
+_ROUTING_INPUT = re.compile(r"用户输入[:：]\s*(.*)")
+_ROUTING_KEYWORDS = [
+    ("OrderAgent", ("订单", "物流", "快递", "发货", "到哪", "ord")),
+    ("AfterSalesAgent", ("退", "换货", "售后", "维修", "保修", "投诉", "坏")),
+    ("ProductAgent", ("多少钱", "价格", "推荐", "优惠", "活动", "折扣", "配置", "颜色", "iphone", "华为", "小米", "macbook")),
+]
+
+DEFAULT_TEMPLATES = [
+    "您好！关于「{input}」，这是模拟回复：我们已为您查询到相关信息，如需进一步帮助请告诉我。",
+    "感谢您的咨询。针对「{input}」，建议您参考商品详情页或联系人工客服，我们会尽快为您处理。",
+    "收到您的问题「{input}」。模拟客服为您解答：相关政策以页面公示为准，祝您购物愉快！",
+]
+
+
+class MockLLMError(Exception):
+    """模拟的提供商错误（按 429 处理，可重试）"""
+    status_code = 429
+
+
+class MockChatModel(BaseChatModel):
+    """确定性的本地 Mock Chat 模型"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency_ms: float = 300.0  # 首 token 延迟中位数（毫秒）
+    latency_sigma: float = 0.3  # 对数正态分布的离散度，0 表示固定延迟
+    tokens_per_second: float = 50.0  # 输出速度（按字符计），<= 0 表示瞬时输出
+    failure_rate: float = 0.0  # 失败概率
+    templates: list[str] = Field(default_factory=lambda: list(DEFAULT_TEMPLATES))
+    chunk_size: int = 4  # 流式每块字符数
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _rng_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {
+            "latency_ms": self.latency_ms,
+            "tokens_per_second": self.tokens_per_second,
+            "failure_rate": self.failure_rate,
+        }
+
+    def _sample(self) -> tuple[float, bool]:
+        """采样一次调用的首 token 延迟（秒）与是否失败"""
+        with self._rng_lock:
+            factor = self._rng.lognormvariate(0.0, self.latency_sigma) if self.latency_sigma > 0 else 1.0
+            failed = self._rng.random() < self.failure_rate
+        return self.latency_ms / 1000 * factor, failed
+
+    def _respond(self, messages: list[BaseMessage]) -> str:
+        """根据输入生成确定性的回复"""
+        prompt = str(messages[-1].content) if messages else ""
+
+        if _ROUTING_MARKER in prompt or _TRIAGE_MARKER in prompt:
+            match = _ROUTING_INPUT.search(prompt)
+            user_input = match.group(1) if match else prompt
+            agent = self._classify(user_input)
+            if _ROUTING_MARKER in prompt:
+                return agent
+            # 分诊：闲聊直接回答，其他意图交给专业 Agent
+            answer = self._template(user_input) if agent == "ChitchatAgent" else None
+            return json.dumps({"agent": agent, "answer": answer}, ensure_ascii=False)
+
+        return self._template(prompt)
+
+    @staticmethod
+    def _classify(user_input: str) -> str:
+        user_input = user_input.lower()
+        for agent, keywords in _ROUTING_KEYWORDS:
+            if any(keyword in user_input for keyword in keywords):
+                return agent
+        return "ChitchatAgent"
+
+    def _template(self, text: str) -> str:
+        index = zlib.crc32(text.encode()) % len(self.templates)
+        return self.templates[index].format(input=text[:50])
+
+    def _chunks(self, text: str) -> list[str]:
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def _chunk_delay(self) -> float:
+        return self.chunk_size / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    @staticmethod
+    def _result(text: str, messages: list[BaseMessage]) -> ChatResult:
+        input_tokens = sum(len(str(message.content)) for message in messages)
+        usage = {"input_tokens": input_tokens, "output_tokens": len(text), "total_tokens": input_tokens + len(text)}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, failed = self._sample()
+        text = self._respond(messages)
+        if failed:
+            time.sleep(latency)
+            raise MockLLMError("模拟的提供商错误 (429)")
+        time.sleep(latency + len(self._chunks(text)) * self._chunk_delay())
+        return self._result(text, messages)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, failed = self._sample()
+        text = self._respond(messages)
+        if failed:
+            await asyncio.sleep(latency)
+            raise MockLLMError("模拟的提供商错误 (429)")
+        await asyncio.sleep(latency + len(self._chunks(text)) * self._chunk_delay())
+        return self._result(text, messages)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        latency, failed = self._sample()
+        time.sleep(latency)
+        if failed:
+            raise MockLLMError("模拟的提供商错误 (429)")
+        for i, piece in enumerate(self._chunks(self._respond(messages))):
+            if i:
+                time.sleep(self._chunk_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        latency, failed = self._sample()
+        await asyncio.sleep(latency)
+        if failed:
+            raise MockLLMError("模拟的提供商错误 (429)")
+        for i, piece in enumerate(self._chunks(self._respond(messages))):
+            if i:
+                await asyncio.sleep(self._chunk_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
@@ -0,0 +1,207 @@
+"""
+查询规范化模块
+
+精确缓存按 query hash 匹配，"iPhone 15 Pro 多少钱？" 与 "iphone15pro多少钱?"
+只是写法不同却会互相错过。在计算 hash 前按顺序执行一组可配置的规则：
+1. nfkc：Unicode NFKC 规范化（兼容字符、全角英数字）
+2. fullwidth：全角 / 中文标点转半角
+3. lowercase：转小写
+4. punctuation：去除标点（夹在两个数字或两个拉丁字母之间的 . - / : , 保留，
+   "1.5万" 与 "15万"、"10-20元" 与 "1020元" 是不同的问题）
+5. whitespace：去除空白（同样保留夹在两个数字或两个拉丁字母之间的空白，压缩为一个空格）
+6. aliases：商品别名归一（如 "苹果手机" -> "iphone"）
+7. stopwords：去除语气词（句末的 吗/呢/啊 等）和 "请问"、"一下" 等填充词
+
+每条规则统计生效次数，缓存再统计每条规则贡献的精确命中数，
+用于评估规范化带来的命中率提升。
+
+使用方式：
+```python
+from src.core.query_normalizer import QueryNormalizer
+
+normalizer = QueryNormalizer(rules=["nfkc", "lowercase", "whitespace"])
+text, fired = normalizer.normalize("iPhone 15 Pro 多少钱？")
+```
+"""
+
+import re
+import unicodedata
+
+# 默认规则顺序（别名在去空白之后执行，别名表按规范化后的形式匹配）
+DEFAULT_RULES = ["nfkc", "fullwidth", "lowercase", "punctuation", "whitespace", "aliases", "stopwords"]
+
+# 商品别名 -> 标准名（均为规范化后的形式：小写，只有两个拉丁字母之间保留一个空格）
+# 注意别名不能是标准名的前缀，否则标准名会被重复替换
+DEFAULT_ALIASES = {
+    "苹果手机": "iphone",
+    "爱疯": "iphone",
+    "苹果平板": "ipad",
+    "苹果手表": "apple watch",
+    "苹果笔记本": "macbook",
+    "苹果电脑": "macbook",
+    "mbp": "macbook pro",
+    "华为手表": "华为watch",
+}
+
+# 句末语气词（只在句末去除，避免误伤 "呢子大衣" 之类的词）
+DEFAULT_PARTICLES = "吗呢啊呀吧哦嘛啦哈呗"
+# 任意位置的填充词
+DEFAULT_FILLERS = ["请问", "一下", "麻烦", "您好", "你好"]
+
+# 夹在两个数字或两个拉丁字母之间时有语义（小数点、区间、日期、时间、千分位），不去除
+_INFIX_PUNCT = ".-/:,"
+
+# 中文标点 -> 半角（NFKC 不处理这些）
+_FULLWIDTH_PUNCT = str.maketrans({
+    "。": ".", "，": ",", "、": ",", "；": ";", "：": ":", "？": "?", "！": "!",
+    "“": '"', "”": '"', "‘": "'", "’": "'", "（": "(", "）": ")",
+    "【": "[", "】": "]", "《": "<", "》": ">", "…": "...", "—": "-", "～": "~",
+    "　": " ",
+})
+
+
+def _char_kind(ch: str) -> str | None:
+    """ASCII 数字 / 拉丁字母的类别，其他字符返回 None"""
+    if ch.isascii():
+        if ch.isdigit():
+            return "digit"
+        if ch.isalpha():
+            return "latin"
+    return None
+
+
+def _joins_same_kind(text: str, start: int, end: int) -> bool:
+    """text[start:end] 两侧是否同为数字或同为拉丁字母"""
+    if start == 0 or end >= len(text):
+        return False
+    kind = _char_kind(text[start - 1])
+    return kind is not None and kind == _char_kind(text[end])
+
+
+class QueryNormalizer:
+    """查询规范化器"""
+
+    def __init__(
+        self,
+        rules: list[str] | None = None,
+        aliases: dict[str, str] | None = None,
+        particles: str = DEFAULT_PARTICLES,
+        fillers: list[str] | None = None,
+    ):
+        """
+        初始化
+
+        Args:
+            rules: 启用的规则（按 DEFAULT_RULES 中的顺序执行），为 None 启用全部
+            aliases: 额外的别名表，与默认别名合并
+            particles: 句末语气词
+            fillers: 任意位置去除的填充词
+        """
+        enabled = set(DEFAULT_RULES if rules is None else rules)
+        unknown = enabled - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"不支持的规范化规则: {sorted(unknown)}")
+        self.rules = [rule for rule in DEFAULT_RULES if rule in enabled]
+
+        self.aliases = {**DEFAULT_ALIASES, **(aliases or {})}
+        # 最长优先，一次扫描完成替换
+        keys = sorted(self.aliases, key=len, reverse=True)
+        self._alias_pattern = re.compile("|".join(map(re.escape, keys))) if keys else None
+
+        fillers = DEFAULT_FILLERS if fillers is None else fillers
+        self._filler_pattern = re.compile("|".join(map(re.escape, fillers))) if fillers else None
+        self._particle_pattern = re.compile(f"[{re.escape(particles)}]+$") if particles else None
+
+        self._stats = {rule: {"applied": 0, "hits": 0} for rule in self.rules}
+        self._normalized_hits = 0
+
+    def _apply(self, rule: str, text: str) -> str:
+        if rule == "nfkc":
+            return unicodedata.normalize("NFKC", text)
+        if rule == "fullwidth":
+            return text.translate(_FULLWIDTH_PUNCT)
+        if rule == "lowercase":
+            return text.lower()
+        if rule == "punctuation":
+            return "".join(
+                ch for i, ch in enumerate(text)
+                if not unicodedata.category(ch).startswith("P")
+                or (ch in _INFIX_PUNCT and _joins_same_kind(text, i, i + 1))
+            )
+        if rule == "whitespace":
+            return re.sub(
+                r"\s+",
+                lambda m: " " if _joins_same_kind(text, m.start(), m.end()) else "",
+                text,
+            ).strip()
+        if rule == "aliases":
+            if self._alias_pattern is None:
+                return text
+            return self._alias_pattern.sub(lambda m: self.aliases[m.group(0)], text)
+        if rule == "stopwords":
+            if self._filler_pattern is not None:
+                text = self._filler_pattern.sub("", text)
+            if self._particle_pattern is not None:
+                text = self._particle_pattern.sub("", text)
+            return text
+        return text
+
+    def normalize(self, query: str, record: bool = False) -> tuple[str, tuple[str, ...]]:
+        """
+        规范化查询
+
+        Args:
+            query: 原始查询
+            record: 是否计入规则生效统计
+
+        Returns:
+            (规范化后的文本, 实际改变了文本的规则)
+        """
+        text = query.strip()
+        fired = []
+        for rule in self.rules:
+            result = self._apply(rule, text)
+            if result != text:
+                fired.append(rule)
+                text = result
+
+        # 全部规则作用后为空（如纯标点），退回原文，避免不同查询撞到同一个 key
+        if not text:
+            return query.strip().lower(), ()
+
+        if record:
+            for rule in fired:
+                self._stats[rule]["applied"] += 1
+        return text, tuple(fired)
+
+    def record_hit(self, rules: set[str] | tuple[str, ...]):
+        """记录一次依赖规范化才命中的精确匹配（归因到参与的规则）"""
+        self._normalized_hits += 1
+        for rule in rules:
+            if rule in self._stats:
+                self._stats[rule]["hits"] += 1
+
+    def get_stats(self, lookups: int = 0) -> dict:
+        """
+        获取规则统计
+
+        Args:
+            lookups: 缓存查询总数，用于计算每条规则贡献的命中率
+        """
+        return {
+            "rules": {
+                rule: {
+                    **stats,
+                    "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0,
+                }
+                for rule, stats in self._stats.items()
+            },
+            "normalized_hits": self._normalized_hits,
+            "hit_rate": round(self._normalized_hits / lookups, 4) if lookups else 0,
+        }
+
+    def clear_stats(self):
+        """清空统计"""
+        for stats in self._stats.values():
+            stats["applied"] = stats["hits"] = 0
+        self._normalized_hits = 0
@@ -0,0 +1,357 @@
+"""
+限流模块 (Rate Limiter)
+
+在调用 LLM 提供商之前按提供商限流，避免触发 429 进而拖垮熔断器：
+1. TokenBucket：令牌桶，预约式扣减（允许欠账），排队者按先来后到拿到令牌
+2. ConcurrencyLimiter：在途请求数上限，同步线程和协程可以混合等待
+3. ProviderLimiter：组合 RPM / TPM 令牌桶与并发上限，超过上限的请求短暂排队，
+   预计等待超过 max_wait 才拒绝；记录排队等待时间等指标
+
+使用方式：
+```python
+from src.core.rate_limiter import ProviderLimiter
+
+limiter = ProviderLimiter("dashscope", rpm=600, tpm=100_000, max_concurrency=20)
+
+async with limiter.acquire(tokens=800) as reservation:
+    result = await llm.ainvoke(messages)
+    reservation.settle(actual_tokens)  # 按实际用量多退少补
+
+with limiter.acquire_sync(tokens=800):
+    result = llm.invoke(messages)
+```
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """排队等待超过上限"""
+    pass
+
+
+class TokenBucket:
+    """
+    令牌桶（线程安全）
+
+    reserve 立即扣减令牌，余额可以为负（欠账），返回需要等待的秒数；
+    后来的请求看到更大的欠账，自然按到达顺序排队。
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        """
+        Args:
+            rate_per_minute: 每分钟补充的令牌数
+            burst_seconds: 桶容量（以秒计的突发量）
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, max_wait: float | None = None) -> float | None:
+        """
+        预约令牌
+
+        Returns:
+            需要等待的秒数；超过 max_wait 时不扣减并返回 None
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if max_wait is not None and wait > max_wait:
+                self._tokens += amount
+                return None
+            return wait
+
+    def refund(self, amount: float):
+        """归还令牌（amount 为负时补扣）"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+@dataclass
+class _Waiter:
+    event: threading.Event | None = None
+    future: asyncio.Future | None = None
+    loop: asyncio.AbstractEventLoop | None = None
+    granted: bool = False
+
+
+class ConcurrencyLimiter:
+    """
+    并发上限（线程安全，同步 / 异步调用方共用一个队列）
+
+    释放时直接把名额交给队首等待者（FIFO），limit <= 0 表示不限制。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _try_take(self) -> bool:
+        """调用方持锁"""
+        if self.limit <= 0 or (self._active < self.limit and not self._waiters):
+            self._active += 1
+            return True
+        return False
+
+    def acquire_sync(self, timeout: float | None = None) -> bool:
+        """同步获取名额，超时返回 False"""
+        with self._lock:
+            if self._try_take():
+                return True
+            waiter = _Waiter(event=threading.Event())
+            self._waiters.append(waiter)
+
+        waiter.event.wait(timeout)
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    async def acquire(self, timeout: float | None = None) -> bool:
+        """异步获取名额，超时返回 False"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_take():
+                return True
+            waiter = _Waiter(future=loop.create_future(), loop=loop)
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release()
+            raise
+
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        """释放名额（有等待者时直接移交）"""
+        with self._lock:
+            if self.limit > 0 and self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                if waiter.event is not None:
+                    waiter.event.set()
+                else:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                return
+            self._active -= 1
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class Reservation:
+    """一次限流许可（用于按实际 token 用量多退少补）"""
+
+    def __init__(self, limiter: "ProviderLimiter", tokens: int):
+        self._limiter = limiter
+        self.tokens = tokens
+
+    def settle(self, actual_tokens: int | None):
+        """按实际用量修正 TPM 令牌桶"""
+        if actual_tokens is None or self._limiter.token_bucket is None:
+            return
+        self._limiter.token_bucket.refund(self.tokens - actual_tokens)
+        self.tokens = actual_tokens
+
+
+class ProviderLimiter:
+    """单个提供商的限流器（RPM + TPM + 并发上限）"""
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 0,
+        max_wait: float = 5.0,
+    ):
+        """
+        Args:
+            name: 提供商名称
+            rpm: 每分钟请求数上限（0 表示不限）
+            tpm: 每分钟 token 数上限（0 表示不限）
+            max_concurrency: 最大在途请求数（0 表示不限）
+            max_wait: 最长排队时间（秒），预计超过则拒绝
+        """
+        self.name = name
+        self.max_wait = max_wait
+        self.request_bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.token_bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.concurrency = ConcurrencyLimiter(max_concurrency)
+        self._config = {"rpm": rpm, "tpm": tpm, "max_concurrency": max_concurrency}
+
+        self._waits: deque[float] = deque(maxlen=1000)  # 最近的排队等待时间（秒）
+        self._stats = {"requests": 0, "queued": 0, "rejected": 0, "total_wait": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """预约 RPM / TPM 令牌，返回需要等待的秒数"""
+        wait = 0.0
+        if self.request_bucket is not None:
+            request_wait = self.request_bucket.reserve(1, self.max_wait)
+            if request_wait is None:
+                self._reject("RPM")
+            wait = request_wait
+        if self.token_bucket is not None and tokens:
+            token_wait = self.token_bucket.reserve(tokens, self.max_wait)
+            if token_wait is None:
+                if self.request_bucket is not None:
+                    self.request_bucket.refund(1)
+                self._reject("TPM")
+            wait = max(wait, token_wait)
+        return wait
+
+    def _refund(self, tokens: int):
+        """归还未被使用的 RPM / TPM 预约（请求没有真正发出）"""
+        if self.request_bucket is not None:
+            self.request_bucket.refund(1)
+        if self.token_bucket is not None and tokens:
+            self.token_bucket.refund(tokens)
+
+    def _reject(self, reason: str):
+        with self._stats_lock:
+            self._stats["rejected"] += 1
+        raise RateLimitExceeded(f"[{self.name}] {reason} 限流排队超过 {self.max_wait}s")
+
+    def _record_wait(self, wait: float):
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["total_wait"] += wait
+            if wait > 0.001:
+                self._stats["queued"] += 1
+            self._waits.append(wait)
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0):
+        """异步获取许可（短暂排队），退出时释放并发名额"""
+        start = time.monotonic()
+        wait = self._reserve(tokens)
+        started = False
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            remaining = max(0.0, self.max_wait - (time.monotonic() - start))
+            if not await self.concurrency.acquire(remaining):
+                self._reject("并发")
+            started = True
+        finally:
+            # 并发名额被拒绝或排队时被取消：请求没有发出，归还预约的令牌
+            if not started:
+                self._refund(tokens)
+        self._record_wait(time.monotonic() - start)
+        try:
+            yield Reservation(self, tokens)
+        finally:
+            self.concurrency.release()
+
+    @contextmanager
+    def acquire_sync(self, tokens: int = 0):
+        """同步获取许可（短暂排队），退出时释放并发名额"""
+        start = time.monotonic()
+        wait = self._reserve(tokens)
+        started = False
+        try:
+            if wait > 0:
+                time.sleep(wait)
+
+            remaining = max(0.0, self.max_wait - (time.monotonic() - start))
+            if not self.concurrency.acquire_sync(remaining):
+                self._reject("并发")
+            started = True
+        finally:
+            if not started:
+                self._refund(tokens)
+        self._record_wait(time.monotonic() - start)
+        try:
+            yield Reservation(self, tokens)
+        finally:
+            self.concurrency.release()
+
+    def get_stats(self) -> dict:
+        """限流统计（排队等待时间单位为毫秒）"""
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            requests = self._stats["requests"]
+            return {
+                **self._config,
+                "requests": requests,
+                "queued": self._stats["queued"],
+                "rejected": self._stats["rejected"],
+                "in_flight": self.concurrency.active,
+                "waiting": self.concurrency.waiting,
+                "queue_wait_ms": {
+                    "avg": round(self._stats["total_wait"] / requests * 1000, 2) if requests else 0,
+                    "p50": round(waits[len(waits) // 2] * 1000, 2) if waits else 0,
+                    "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0,
+                    "max": round(waits[-1] * 1000, 2) if waits else 0,
+                },
+            }
+
+
+def estimate_tokens(messages: list[Any], completion_tokens: int = 256) -> int:
+    """
+    粗略估计一次调用的 token 数（中文约 1.5 字 / token）
+
+    Args:
+        messages: 消息列表
+        completion_tokens: 预估的输出 token 数
+    """
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return int(chars / 1.5) + completion_tokens
+
+
+def usage_tokens(result: Any) -> int | None:
+    """从 ChatResult 中取实际 token 用量"""
+    try:
+        usage = result.generations[0].message.usage_metadata
+        if usage:
+            return usage.get("total_tokens")
+    except (AttributeError, IndexError):
+        pass
+    token_usage = (getattr(result, "llm_output", None) or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens")
@@ -0,0 +1,257 @@
+"""
+Redis 二级缓存模块
+
+多个 uvicorn worker / 副本之间共享的 L2 缓存层：
+1. 值使用紧凑 JSON 序列化，超过阈值时 zlib 压缩
+2. 过期交给 Redis 服务端 TTL（SET EX）
+3. 读取时用 pipeline 一次往返拿到值和剩余 TTL，回填 L1 时沿用剩余 TTL
+
+测试或本地开发可以使用 LocalRedis 替身（接口与 redis / fakeredis 客户端一致）：
+```python
+from src.core.redis_cache import RedisCacheTier, LocalRedis
+
+l2 = RedisCacheTier(LocalRedis())
+cache = ResponseCache(l2=l2)
+```
+"""
+
+import fnmatch
+import json
+import logging
+import time
+import zlib
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 序列化格式头
+_RAW = b"j"
+_COMPRESSED = b"z"
+
+
+def dumps(value: Any, compress_threshold: int = 512) -> bytes:
+    """紧凑序列化，超过阈值时压缩"""
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+    if len(data) > compress_threshold:
+        return _COMPRESSED + zlib.compress(data, 6)
+    return _RAW + data
+
+
+def loads(data: bytes) -> Any:
+    """反序列化"""
+    header, body = data[:1], data[1:]
+    if header == _COMPRESSED:
+        body = zlib.decompress(body)
+    return json.loads(body)
+
+
+class LocalRedis:
+    """
+    进程内 Redis 替身
+
+    实现 RedisCacheTier 用到的命令子集（get/set/delete/pttl/scan_iter/pipeline），
+    语义与 redis-py / fakeredis 一致，用于测试和无 Redis 的本地环境。
+    """
+
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+
+    @staticmethod
+    def _k(key: str | bytes) -> str:
+        return key.decode() if isinstance(key, bytes) else key
+
+    def _alive(self, key: str | bytes) -> tuple[bytes, float | None] | None:
+        key = self._k(key)
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str | bytes) -> bytes | None:
+        item = self._alive(key)
+        return item[0] if item else None
+
+    def set(self, key: str, value: bytes, ex: int | None = None, nx: bool = False) -> bool | None:
+        if nx and self._alive(key) is not None:
+            return None
+        expires_at = time.time() + ex if ex else None
+        self._data[self._k(key)] = (value, expires_at)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(self._k(key), None) is not None)
+
+    def pttl(self, key: str) -> int:
+        item = self._alive(key)
+        if item is None:
+            return -2
+        if item[1] is None:
+            return -1
+        return int((item[1] - time.time()) * 1000)
+
+    def scan_iter(self, match: str = "*"):
+        for key in list(self._data):
+            if fnmatch.fnmatchcase(key, match) and self._alive(key) is not None:
+                yield key.encode()
+
+    def pipeline(self, transaction: bool = True) -> "_LocalPipeline":
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """LocalRedis 的 pipeline：缓冲命令，execute 时依次执行"""
+
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        results = [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+        self._commands.clear()
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._commands.clear()
+
+
+class RedisCacheTier:
+    """
+    Redis 二级缓存
+
+    key 为 L1 计算好的 query hash（已包含命名空间），值为序列化后的响应。
+    Redis 不可用时记录错误并降级为未命中，不影响主流程。
+    """
+
+    def __init__(
+        self,
+        client,
+        prefix: str = "response_cache:",
+        compress_threshold: int = 512,
+    ):
+        """
+        初始化
+
+        Args:
+            client: redis.Redis 客户端（decode_responses=False）或 LocalRedis
+            prefix: key 前缀
+            compress_threshold: 序列化后超过该字节数时压缩
+        """
+        self.client = client
+        self.prefix = prefix
+        self.compress_threshold = compress_threshold
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        """
+        读取值和剩余 TTL（一次 pipeline 往返）
+
+        Returns:
+            (值, 剩余秒数)，未命中返回 None
+        """
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self._key(key))
+            pipe.pttl(self._key(key))
+            data, pttl = pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"L2 缓存读取失败: {e}")
+            return None
+
+        if data is None:
+            return None
+        remaining = pttl / 1000 if pttl and pttl > 0 else 0.0
+        return loads(data), remaining
+
+    def set(self, key: str, value: Any, ttl: float):
+        """写入值，过期由 Redis 服务端处理"""
+        try:
+            data = dumps(value, self.compress_threshold)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"L2 缓存跳过不可序列化的值: {e}")
+            return
+
+        try:
+            self.client.set(self._key(key), data, ex=max(1, int(ttl)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"L2 缓存写入失败: {e}")
+
+    def get_or_set(self, key: str, value: Any, ttl: float) -> Any:
+        """
+        原子地写入（仅当不存在时）并返回最终值
+
+        SET NX EX 与 GET 在同一个 pipeline 中发送：多个 worker 同时回填时，
+        只有第一个写入生效，其余 worker 拿到的是已存在的值。
+        """
+        try:
+            data = dumps(value, self.compress_threshold)
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(self._key(key), data, ex=max(1, int(ttl)), nx=True)
+            pipe.get(self._key(key))
+            _, current = pipe.execute()
+        except (TypeError, ValueError):
+            return value
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"L2 缓存写入失败: {e}")
+            return value
+        return loads(current) if current is not None else value
+
+    def delete(self, key: str):
+        """删除 key"""
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"L2 缓存删除失败: {e}")
+
+    def clear(self):
+        """删除本前缀下的所有 key"""
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"L2 缓存清空失败: {e}")
+
+
+def create_redis_tier(
+    redis_url: str,
+    prefix: str = "response_cache:",
+    timeout: float = 0.5,
+) -> RedisCacheTier:
+    """
+    根据 URL 创建 Redis 二级缓存
+
+    Args:
+        redis_url: Redis 连接 URL
+        prefix: key 前缀
+        timeout: 连接与读写超时（秒）。Redis 卡住时按超时降级为未命中，
+            不会无限期阻塞调用方
+    """
+    import redis
+
+    client = redis.from_url(
+        redis_url,
+        decode_responses=False,
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
+    )
+    return RedisCacheTier(client, prefix=prefix)
@@ -2,7 +2,7 @@
 响应缓存模块
 
 基于语义相似度的缓存，减少重复 LLM 调用：
-1. 精确匹配缓存（query hash）
+1. 精确匹配缓存（规范化后的 query hash）
 2. 语义相似度缓存（embedding 相似度）
 
 使用方式：
@@ -18,27 +18,73 @@ if cached:
 # 生成响应后存入缓存
 response = llm.invoke(query)
 cache.set(query, response)
+
+# 命名空间隔离（同一问题在不同 Agent / 上下文下的回复互不干扰）
+cache.set(query, agent_name, namespace="route")
 ```
 """
 
+import asyncio
 import hashlib
+import heapq
+import itertools
+import os
+import struct
+import threading
 import time
+import zlib
+from pathlib import Path
 from typing import Any
 from dataclasses import dataclass, field
+from functools import wraps
 import logging
 
+from src.config import settings
+from src.core.cache_policy import (
+    AdmissionPolicyType,
+    EvictionPolicyType,
+    TinyLFUAdmission,
+    WindowTinyLFUPolicy,
+    create_eviction_policy,
+)
+from src.core.query_normalizer import QueryNormalizer
+from src.core.redis_cache import RedisCacheTier, create_redis_tier, dumps, loads
+from src.core.semantic_index import SemanticIndexType, create_semantic_index
+
 logger = logging.getLogger(__name__)
 
+# 快照格式：文件头 + 若干条记录，每条记录为
+#   长度(>I) | created_at(>d) | ttl(>d) | 向量下标(>i，-1 表示无向量) | 序列化的条目
+# 向量单独存为 .npy，加载时 mmap 按下标读取
+_SNAPSHOT_MAGIC = b"RCSNAP\x01\n"
+_RECORD_LEN = struct.Struct(">I")
+_RECORD_HEAD = struct.Struct(">ddi")
+
+
+def _synchronized(method):
+    """方法级加锁（图节点可能在线程池中并发读写缓存）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 @dataclass
 class CacheEntry:
     """缓存条目"""
     query: str
     response: Any
-    embedding: list[float] | None = None
+    key: str = ""  # query hash
+    namespace: str = ""
+    row: int | None = None  # 在语义索引中的行号
     created_at: float = field(default_factory=time.time)
     hits: int = 0
     ttl: float = 3600.0  # 默认 1 小时过期
+    
+    @property
+    def expires_at(self) -> float:
+        return self.created_at + self.ttl
 
 
 class ResponseCache:
@@ -48,6 +94,10 @@ class ResponseCache:
     支持两种缓存模式：
     1. 精确匹配：基于 query hash
     2. 语义相似：基于 embedding 余弦相似度（需要 embeddings 模块）
+    
+    两级存储：
+    - L1：进程内字典（精确 + 语义）
+    - L2：可选的 Redis（仅精确匹配），多个 worker 共享
     """
     
     def __init__(
@@ -56,6 +106,12 @@ class ResponseCache:
         ttl: float = 3600.0,
         similarity_threshold: float = 0.95,
         enable_semantic: bool = False,
+        semantic_index: SemanticIndexType = "exact",
+        semantic_index_options: dict | None = None,
+        eviction_policy: EvictionPolicyType = "lru",
+        admission_policy: AdmissionPolicyType = "none",
+        l2: RedisCacheTier | None = None,
+        normalizer: QueryNormalizer | None = None,
     ):
         """
         初始化缓存
@@ -65,31 +121,78 @@ class ResponseCache:
             ttl: 缓存过期时间（秒）
             similarity_threshold: 语义相似度阈值（0-1）
             enable_semantic: 是否启用语义缓存
+            semantic_index: 语义索引类型，"exact" 精确检索 / "ivf" 近似检索
+            semantic_index_options: 传给语义索引的参数（如 nlist、nprobe）
+            eviction_policy: 淘汰策略，"lru" / "lfu"
+            admission_policy: 准入策略，"none" / "tinylfu"
+            l2: Redis 二级缓存，为 None 则只使用进程内缓存
+            normalizer: 计算 hash 前的查询规范化器，为 None 使用默认规则
         """
         self.max_size = max_size
         self.ttl = ttl
         self.similarity_threshold = similarity_threshold
         self.enable_semantic = enable_semantic
+        self.semantic_index_type = semantic_index
         
-        # 精确匹配缓存（hash -> entry）
+        # 精确匹配缓存（hash -> entry），淘汰顺序由策略对象维护
         self._exact_cache: dict[str, CacheEntry] = {}
+        self.eviction_policy = eviction_policy
+        self.admission_policy = admission_policy
+        self._policy = create_eviction_policy(eviction_policy)
+        self._admission = (
+            TinyLFUAdmission(max_size) if admission_policy == "tinylfu" else None
+        )
+        if self._admission:
+            # W-TinyLFU：新条目先进 LRU 窗口，挤出窗口时再与主区淘汰候选比较频次
+            self._policy = WindowTinyLFUPolicy(self._policy, self._admission, max_size)
+        self._l2 = l2
+        self._normalizer = normalizer or QueryNormalizer()
+        
+        # 语义缓存（用于相似度匹配）：向量存于索引矩阵，行号 -> entry
+        self._semantic_index = create_semantic_index(
+            semantic_index, **(semantic_index_options or {})
+        )
+        self._semantic_entries: dict[int, CacheEntry] = {}
         
-        # 语义缓存（用于相似度匹配）
-        self._semantic_cache: list[CacheEntry] = []
+        # 过期时间小顶堆 (expires_at, seq, key, entry)，只弹出到期的条目
+        self._expiry_heap: list[tuple[float, int, str, CacheEntry]] = []
+        self._expiry_seq = itertools.count()
+        self._sweeper_task: asyncio.Task | None = None
+        self._snapshot_task: asyncio.Task | None = None
+        self._lock = threading.RLock()
         
         # 统计
         self._stats = {
             "hits": 0,
             "misses": 0,
+            "l1_hits": 0,
+            "l2_hits": 0,
             "semantic_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "admission_rejections": 0,
         }
         
         # Embedding 函数（懒加载）
         self._embeddings = None
     
-    def _get_hash(self, query: str) -> str:
-        """计算 query hash"""
-        return hashlib.sha256(query.strip().lower().encode()).hexdigest()[:16]
+    @staticmethod
+    def _hash(normalized: str, namespace: str) -> str:
+        raw = f"{namespace}\x00{normalized}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+    
+    def _get_hash(self, query: str, namespace: str = "") -> str:
+        """计算 query hash（规范化后计算，命名空间参与计算）"""
+        return self._hash(self._normalizer.normalize(query)[0], namespace)
+    
+    def make_key(self, query: str, namespace: str = "") -> str:
+        """计算缓存 key（可用于请求合并等需要与缓存一致的场景）"""
+        return self._get_hash(query, namespace)
+    
+    @staticmethod
+    def _namespace_label(namespace: str) -> int:
+        """命名空间 -> 语义索引分区标签（31 位哈希，命中后再校验命名空间）"""
+        return zlib.crc32(namespace.encode()) & 0x7FFFFFFF
     
     def _get_embedding(self, query: str) -> list[float] | None:
         """获取 query 的 embedding"""
@@ -98,8 +201,8 @@ class ResponseCache:
         
         if self._embeddings is None:
             try:
-                from src.rag.embeddings import get_embeddings
-                self._embeddings = get_embeddings()
+                from src.rag.embeddings import get_shared_embeddings
+                self._embeddings = get_shared_embeddings()
             except Exception as e:
                 logger.warning(f"无法加载 embeddings: {e}")
                 self.enable_semantic = False
@@ -111,132 +214,457 @@ class ResponseCache:
             logger.warning(f"Embedding 计算失败: {e}")
             return None
     
-    def _cosine_similarity(self, a: list[float], b: list[float]) -> float:
-        """计算余弦相似度"""
-        dot_product = sum(x * y for x, y in zip(a, b))
-        norm_a = sum(x ** 2 for x in a) ** 0.5
-        norm_b = sum(x ** 2 for x in b) ** 0.5
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return dot_product / (norm_a * norm_b)
+    def _remove(self, query_hash: str):
+        """删除条目，同时释放其语义索引行"""
+        entry = self._exact_cache.pop(query_hash, None)
+        self._policy.remove(query_hash)
+        if entry is not None and entry.row is not None:
+            self._semantic_index.remove(entry.row)
+            self._semantic_entries.pop(entry.row, None)
+            entry.row = None
     
-    def _cleanup_expired(self):
-        """清理过期条目"""
-        now = time.time()
+    def _expire_due(self, now: float | None = None) -> int:
+        """
+        弹出已到期的条目（摊还 O(log n)，只处理到期部分）
+        
+        Returns:
+            本次过期的条目数
+        """
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        expired = 0
+        
+        while heap and heap[0][0] <= now:
+            _, _, key, entry = heapq.heappop(heap)
+            # 条目可能已被覆盖、淘汰或失效，堆中只是残留记录
+            if self._exact_cache.get(key) is entry:
+                self._remove(key)
+                expired += 1
+        
+        self._stats["expirations"] += expired
         
-        # 清理精确缓存
-        expired_keys = [
-            k for k, v in self._exact_cache.items()
-            if now - v.created_at > v.ttl
-        ]
-        for k in expired_keys:
-            del self._exact_cache[k]
-        
-        # 清理语义缓存
-        self._semantic_cache = [
-            e for e in self._semantic_cache
-            if now - e.created_at <= e.ttl
-        ]
+        # 残留记录过多时重建堆，防止覆盖写导致堆无限增长
+        if len(heap) > 2 * len(self._exact_cache) + 64:
+            self._expiry_heap = [item for item in heap if self._exact_cache.get(item[2]) is item[3]]
+            heapq.heapify(self._expiry_heap)
+        
+        return expired
     
-    def _evict_lru(self):
-        """LRU 淘汰"""
-        if len(self._exact_cache) >= self.max_size:
-            # 按命中次数和时间排序，淘汰最少使用的
-            sorted_items = sorted(
-                self._exact_cache.items(),
-                key=lambda x: (x[1].hits, x[1].created_at),
-            )
-            # 淘汰 10%
-            to_remove = max(1, len(sorted_items) // 10)
-            for k, _ in sorted_items[:to_remove]:
-                del self._exact_cache[k]
+    @_synchronized
+    def purge_expired(self) -> int:
+        """清理所有已过期条目，返回清理数量"""
+        return self._expire_due()
     
-    def get(self, query: str) -> Any | None:
+    def _make_room(self, query_hash: str) -> bool:
+        """
+        缓存已满时淘汰一个条目，O(1)
+        
+        Returns:
+            是否允许写入（未设准入窗口时，TinyLFU 可能直接拒绝新条目）
+        """
+        if len(self._exact_cache) < self.max_size:
+            return True
+        
+        victim, rejected = self._policy.victim_for(query_hash)
+        if rejected:
+            # 淘汰的是频次输给主区候选的准入候选（窗口中最老的条目或新条目本身）
+            self._stats["admission_rejections"] += 1
+        if victim is None:
+            return True
+        if victim == query_hash:
+            return False
+        
+        self._remove(victim)
+        self._stats["evictions"] += 1
+        return True
+    
+    def _touch(self, entry: CacheEntry):
+        """记录一次命中"""
+        entry.hits += 1
+        self._policy.record_access(entry.key)
+    
+    def get(self, query: str, namespace: str = "") -> Any | None:
         """
         获取缓存的响应
         
+        只在读写 L1 时持锁：L2（Redis 网络往返）与 embedding 计算在锁外进行，
+        慢速的 Redis / embedding 接口不会阻塞其他线程的 L1 命中
+        
         Args:
             query: 用户查询
+            namespace: 命名空间，只在同一命名空间内匹配
             
         Returns:
             缓存的响应，未命中返回 None
         """
-        self._cleanup_expired()
+        with self._lock:
+            self._expire_due()
+            
+            # 1. 精确匹配（规范化后）
+            normalized, fired = self._normalizer.normalize(query, record=True)
+            query_hash = self._hash(normalized, namespace)
+            if self._admission:
+                self._admission.record(query_hash)
+            
+            entry = self._exact_cache.get(query_hash)
+            if entry is not None:
+                # 原文不同却命中：这次命中归功于规范化，归因到两侧生效的规则
+                if entry.query.strip().lower() != query.strip().lower():
+                    _, entry_fired = self._normalizer.normalize(entry.query)
+                    self._normalizer.record_hit(set(fired) | set(entry_fired))
+                self._touch(entry)
+                self._stats["hits"] += 1
+                self._stats["l1_hits"] += 1
+                logger.debug(f"缓存命中(精确): {query[:30]}...")
+                return entry.response
+            
+            search_semantic = self.enable_semantic and len(self._semantic_index) > 0
         
-        # 1. 精确匹配
-        query_hash = self._get_hash(query)
-        if query_hash in self._exact_cache:
-            entry = self._exact_cache[query_hash]
-            entry.hits += 1
-            self._stats["hits"] += 1
-            logger.debug(f"缓存命中(精确): {query[:30]}...")
-            return entry.response
-        
-        # 2. 语义匹配
-        if self.enable_semantic and self._semantic_cache:
-            query_embedding = self._get_embedding(query)
-            if query_embedding:
-                best_match = None
-                best_score = 0.0
-                
-                for entry in self._semantic_cache:
-                    if entry.embedding:
-                        score = self._cosine_similarity(query_embedding, entry.embedding)
-                        if score > best_score:
-                            best_score = score
-                            best_match = entry
-                
-                if best_match and best_score >= self.similarity_threshold:
-                    best_match.hits += 1
+        # 2. L2 精确匹配（其他 worker 写入的结果），命中后按剩余 TTL 回填 L1
+        if self._l2 is not None:
+            found = self._l2.get(query_hash)
+            if found is not None:
+                response, remaining = found
+                with self._lock:
+                    self._store(query_hash, query, response, remaining or self.ttl, namespace, embed=False)
                     self._stats["hits"] += 1
-                    self._stats["semantic_hits"] += 1
-                    logger.debug(f"缓存命中(语义): {query[:30]}... (相似度: {best_score:.2f})")
-                    return best_match.response
+                    self._stats["l2_hits"] += 1
+                logger.debug(f"缓存命中(L2): {query[:30]}...")
+                return response
         
-        self._stats["misses"] += 1
-        return None
+        # 3. 语义匹配（一次矩阵-向量乘法 + argmax）
+        query_embedding = self._get_embedding(query) if search_semantic else None
+        with self._lock:
+            if query_embedding:
+                matches = self._semantic_index.search(
+                    query_embedding, k=1, label=self._namespace_label(namespace)
+                )
+                if matches and matches[0][1] >= self.similarity_threshold:
+                    row, score = matches[0]
+                    best_match = self._semantic_entries.get(row)
+                    # 分区标签是哈希值，命中后校验命名空间防止碰撞
+                    if best_match is not None and best_match.namespace == namespace:
+                        self._touch(best_match)
+                        self._stats["hits"] += 1
+                        self._stats["l1_hits"] += 1
+                        self._stats["semantic_hits"] += 1
+                        logger.debug(f"缓存命中(语义): {query[:30]}... (相似度: {score:.2f})")
+                        return best_match.response
+            
+            self._stats["misses"] += 1
+            return None
     
-    def set(self, query: str, response: Any, ttl: float | None = None):
+    def set(
+        self,
+        query: str,
+        response: Any,
+        ttl: float | None = None,
+        namespace: str = "",
+        embedding: list[float] | None = None,
+    ):
         """
-        设置缓存
+        设置缓存（覆盖已有的值）
         
         Args:
             query: 用户查询
             response: 响应内容
             ttl: 缓存过期时间（秒），为 None 使用默认值
+            namespace: 命名空间
+            embedding: 已计算好的 query 向量（为 None 时按需计算）
+        """
+        ttl = ttl or self.ttl
+        query_hash = self._get_hash(query, namespace)
+        embedding = self._entry_embedding(query, embedding)
+        with self._lock:
+            self._expire_due()
+            if self._admission:
+                self._admission.record(query_hash)
+            self._store(query_hash, query, response, ttl, namespace, embed=embedding is not None, embedding=embedding)
+        if self._l2 is not None:
+            self._l2.set(query_hash, response, ttl)
+    
+    def get_or_set(
+        self,
+        query: str,
+        response: Any,
+        ttl: float | None = None,
+        namespace: str = "",
+        embedding: list[float] | None = None,
+    ) -> Any:
         """
-        self._evict_lru()
+        未命中后回填缓存：其他 worker 已经写入时沿用已有的值
+        
+        L2 用一次 pipeline（SET NX EX + GET）完成写入与读取，多个 worker 同时回填
+        同一个问题时只有第一个写入生效，各 worker 的 L1 都回填这一份值
+        
+        Returns:
+            缓存中最终的值（可能是其他 worker 写入的）
+        """
+        ttl = ttl or self.ttl
+        query_hash = self._get_hash(query, namespace)
+        if self._l2 is not None:
+            response = self._l2.get_or_set(query_hash, response, ttl)
+        embedding = self._entry_embedding(query, embedding)
+        with self._lock:
+            self._expire_due()
+            if self._admission:
+                self._admission.record(query_hash)
+            self._store(query_hash, query, response, ttl, namespace, embed=embedding is not None, embedding=embedding)
+        return response
+    
+    def _entry_embedding(self, query: str, embedding: list[float] | None) -> list[float] | None:
+        """写入语义索引用的向量（在锁外计算）"""
+        if embedding is None and self.enable_semantic:
+            return self._get_embedding(query)
+        return embedding
+    
+    def _store(
+        self,
+        query_hash: str,
+        query: str,
+        response: Any,
+        ttl: float,
+        namespace: str,
+        embed: bool = True,
+        embedding: Any = None,
+        created_at: float | None = None,
+        hits: int = 0,
+    ):
+        """写入 L1（精确缓存 + 可选的语义索引）"""
+        if query_hash in self._exact_cache:
+            self._remove(query_hash)
+        elif not self._make_room(query_hash):
+            logger.debug(f"缓存准入拒绝: {query[:30]}...")
+            return
         
-        query_hash = self._get_hash(query)
         entry = CacheEntry(
             query=query,
             response=response,
-            ttl=ttl or self.ttl,
+            key=query_hash,
+            namespace=namespace,
+            ttl=ttl,
+            hits=hits,
         )
+        if created_at is not None:
+            entry.created_at = created_at
         
         # 存入精确缓存
         self._exact_cache[query_hash] = entry
+        self._policy.record_insert(query_hash)
+        heapq.heappush(
+            self._expiry_heap,
+            (entry.expires_at, next(self._expiry_seq), query_hash, entry),
+        )
         
         # 存入语义缓存
-        if self.enable_semantic:
-            entry.embedding = self._get_embedding(query)
-            if entry.embedding:
-                self._semantic_cache.append(entry)
+        if embed and self.enable_semantic:
+            if embedding is None:
+                embedding = self._get_embedding(query)
+            if embedding is not None and len(embedding):
+                entry.row = self._semantic_index.add(
+                    embedding, label=self._namespace_label(namespace)
+                )
+                self._semantic_entries[entry.row] = entry
         
         logger.debug(f"缓存写入: {query[:30]}...")
     
-    def invalidate(self, query: str):
+    def invalidate(self, query: str, namespace: str = ""):
         """使特定查询的缓存失效"""
-        query_hash = self._get_hash(query)
-        if query_hash in self._exact_cache:
-            del self._exact_cache[query_hash]
+        query_hash = self._get_hash(query, namespace)
+        with self._lock:
+            self._remove(query_hash)
+        if self._l2 is not None:
+            self._l2.delete(query_hash)
     
     def clear(self):
         """清空所有缓存"""
-        self._exact_cache.clear()
-        self._semantic_cache.clear()
+        with self._lock:
+            self._exact_cache.clear()
+            self._expiry_heap.clear()
+            self._policy.clear()
+            if self._admission:
+                self._admission.clear()
+            self._semantic_index.clear()
+            self._semantic_entries.clear()
+        if self._l2 is not None:
+            self._l2.clear()
         logger.info("缓存已清空")
     
+    async def _sweep_loop(self, interval: float):
+        """后台定期清理过期条目，保证空闲时内存也能及时释放"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                expired = self.purge_expired()
+                if expired:
+                    logger.debug(f"后台清理过期缓存: {expired} 条")
+            except Exception as e:
+                logger.warning(f"后台缓存清理失败: {e}")
+    
+    def start_sweeper(self, interval: float = 30.0):
+        """
+        启动后台过期清理任务（需在事件循环中调用）
+        
+        Args:
+            interval: 清理间隔（秒）
+        """
+        if self._sweeper_task is None or self._sweeper_task.done():
+            self._sweeper_task = asyncio.create_task(self._sweep_loop(interval))
+            logger.info(f"缓存后台清理已启动: 每 {interval}s")
+    
+    async def stop_sweeper(self):
+        """停止后台过期清理任务"""
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self._sweeper_task = None
+    
+    def save_snapshot(self, path: str | Path) -> int:
+        """
+        把未过期的 L1 条目（含语义向量）写入快照
+        
+        生成两个文件：<path>.rec（长度前缀的记录）和 <path>.npy（向量矩阵）。
+        先写临时文件再原子替换，写入过程中进程退出不会留下半个快照。
+        
+        Returns:
+            写入的条目数
+        """
+        import numpy as np
+        
+        # 持锁只做拷贝，序列化和写盘在锁外完成
+        with self._lock:
+            self._expire_due()
+            entries = list(self._exact_cache.values())
+            vectors = []
+            for entry in entries:
+                vector = self._semantic_index.get_vector(entry.row) if entry.row is not None else None
+                # get_vector 返回矩阵视图，需要拷贝出锁
+                vectors.append(vector.copy() if vector is not None else None)
+        
+        base = Path(path)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        rec_path, npy_path = base.with_suffix(".rec"), base.with_suffix(".npy")
+        rec_tmp, npy_tmp = rec_path.with_suffix(".rec.tmp"), npy_path.with_suffix(".tmp.npy")
+        
+        kept: list = []
+        written = 0
+        with open(rec_tmp, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            for entry, vector in zip(entries, vectors):
+                try:
+                    body = dumps([entry.query, entry.namespace, entry.response, entry.hits])
+                except (TypeError, ValueError):
+                    continue  # 不可序列化的响应不进快照
+                vec_index = -1
+                if vector is not None:
+                    vec_index = len(kept)
+                    kept.append(vector)
+                head = _RECORD_HEAD.pack(entry.created_at, entry.ttl, vec_index)
+                f.write(_RECORD_LEN.pack(len(head) + len(body)))
+                f.write(head)
+                f.write(body)
+                written += 1
+        
+        matrix = np.stack(kept).astype(np.float32) if kept else np.zeros((0, 0), dtype=np.float32)
+        np.save(npy_tmp, matrix)
+        os.replace(npy_tmp, npy_path)
+        os.replace(rec_tmp, rec_path)
+        
+        logger.info(f"缓存快照已保存: {written} 条 -> {rec_path}")
+        return written
+    
+    @_synchronized
+    def load_snapshot(self, path: str | Path) -> int:
+        """
+        从快照预热 L1
+        
+        只解析记录头判断是否过期，过期记录直接跳过不反序列化；
+        向量文件以 mmap 方式打开，只读取需要的行。
+        key 按当前规则重新计算，快照与 key 规则变更兼容。
+        
+        Returns:
+            加载的条目数（快照不存在时为 0）
+        """
+        import numpy as np
+        
+        base = Path(path)
+        rec_path, npy_path = base.with_suffix(".rec"), base.with_suffix(".npy")
+        if not rec_path.exists():
+            return 0
+        
+        vectors = np.load(npy_path, mmap_mode="r") if npy_path.exists() else None
+        now = time.time()
+        loaded = skipped = 0
+        
+        with open(rec_path, "rb") as f:
+            if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                logger.warning(f"缓存快照格式不匹配，跳过: {rec_path}")
+                return 0
+            
+            while True:
+                size_bytes = f.read(_RECORD_LEN.size)
+                if len(size_bytes) < _RECORD_LEN.size:
+                    break
+                (size,) = _RECORD_LEN.unpack(size_bytes)
+                record = f.read(size)
+                if len(record) < size:
+                    break  # 截断的尾部记录
+                
+                created_at, ttl, vec_index = _RECORD_HEAD.unpack_from(record)
+                if created_at + ttl <= now:
+                    skipped += 1
+                    continue
+                
+                query, namespace, response, hits = loads(record[_RECORD_HEAD.size:])
+                embedding = None
+                if vec_index >= 0 and vectors is not None and vec_index < len(vectors):
+                    embedding = vectors[vec_index]
+                
+                self._store(
+                    self._get_hash(query, namespace), query, response, ttl, namespace,
+                    embed=embedding is not None, embedding=embedding,
+                    created_at=created_at, hits=hits,
+                )
+                loaded += 1
+        
+        logger.info(f"缓存快照已加载: {loaded} 条（跳过过期 {skipped} 条）")
+        return loaded
+    
+    async def _snapshot_loop(self, path: str | Path, interval: float):
+        """后台定期保存快照"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.save_snapshot, path)
+            except Exception as e:
+                logger.warning(f"缓存快照保存失败: {e}")
+    
+    def start_snapshotter(self, path: str | Path, interval: float = 300.0):
+        """
+        启动后台定期快照任务（需在事件循环中调用）
+        
+        Args:
+            path: 快照路径（不含后缀）
+            interval: 快照间隔（秒）
+        """
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop(path, interval))
+            logger.info(f"缓存定期快照已启动: 每 {interval}s -> {path}")
+    
+    async def stop_snapshotter(self):
+        """停止后台快照任务"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+    
+    @_synchronized
     def get_stats(self) -> dict:
         """获取缓存统计"""
         total = self._stats["hits"] + self._stats["misses"]
@@ -244,12 +672,23 @@ class ResponseCache:
         
         return {
             "size": len(self._exact_cache),
-            "semantic_size": len(self._semantic_cache),
+            "semantic_size": len(self._semantic_index),
+            "semantic_index": self.semantic_index_type,
             "max_size": self.max_size,
             "hits": self._stats["hits"],
             "misses": self._stats["misses"],
+            "l1_hits": self._stats["l1_hits"],
+            "l2_hits": self._stats["l2_hits"],
+            "l2_enabled": self._l2 is not None,
+            "l2_errors": self._l2.errors if self._l2 is not None else 0,
             "semantic_hits": self._stats["semantic_hits"],
+            "eviction_policy": self.eviction_policy,
+            "admission_policy": self.admission_policy,
+            "evictions": self._stats["evictions"],
+            "expirations": self._stats["expirations"],
+            "admission_rejections": self._stats["admission_rejections"],
             "hit_rate": round(hit_rate, 4),
+            "normalization": self._normalizer.get_stats(total),
         }
 
 
@@ -266,5 +705,20 @@ def get_cache() -> ResponseCache:
             max_size=1000,
             ttl=3600.0,
             enable_semantic=False,  # 默认禁用语义缓存（节省 embedding 调用）
+            semantic_index=settings.cache_semantic_index,
+            semantic_index_options=(
+                {"nlist": settings.cache_ivf_nlist, "nprobe": settings.cache_ivf_nprobe}
+                if settings.cache_semantic_index == "ivf" else None
+            ),
+            eviction_policy=settings.cache_eviction_policy,
+            admission_policy=settings.cache_admission_policy,
+            l2=(
+                create_redis_tier(settings.redis_url, timeout=settings.cache_l2_timeout)
+                if settings.cache_l2_enabled else None
+            ),
+            normalizer=QueryNormalizer(
+                rules=settings.cache_normalize_rules,
+                aliases=settings.cache_query_aliases,
+            ),
         )
     return _cache_instance
@@ -0,0 +1,215 @@
+"""
+重试预算模块 (Retry Budget)
+
+故障期间每个请求都重试 3 次会把提供商的负载放大数倍，同步的指数退避还会
+让重试集中在同一时刻（惊群）。这里提供：
+1. RetryBudget：滑动窗口内重试次数不超过请求数的一定比例（外加每秒少量保底），
+   超出预算时放弃重试并计数
+2. 错误分类：只重试超时、连接错误、429 / 5xx 等临时性错误
+3. Retry-After：服务端给出等待时间时优先遵守
+4. 退避抖动：full jitter（[0, 指数退避] 内均匀随机）或 decorrelated jitter
+
+使用方式：
+```python
+from src.core.circuit_breaker import with_retry
+from src.core.retry_budget import get_retry_budget
+
+@with_retry(max_retries=2, jitter="decorrelated")  # 默认使用全局重试预算
+async def call_llm():
+    ...
+
+get_retry_budget().get_stats()  # {"requests": ..., "retries": ..., "exhausted": ...}
+```
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Literal
+
+from src.config import settings
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+JitterMode = Literal["full", "decorrelated", "none"]
+
+
+class RetryBudget:
+    """
+    重试预算（线程安全）
+
+    按秒分桶统计最近 window 秒内的请求数与重试数，
+    重试数 < ratio × 请求数 + min_per_second × window 时才允许重试。
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, window: int = 10):
+        """
+        Args:
+            ratio: 允许的重试比例（相对请求数）
+            min_per_second: 每秒保底的重试次数（低流量时也能重试）
+            window: 滑动窗口长度（秒）
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = max(1, int(window))
+        self._requests = [0] * self.window
+        self._retries = [0] * self.window
+        self._slots = [0] * self.window  # 每个桶对应的秒
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "exhausted": 0}
+
+    def _bucket(self, now: float) -> int:
+        """当前秒的桶下标，过期的桶清零（调用方持锁）"""
+        second = int(now)
+        index = second % self.window
+        if self._slots[index] != second:
+            self._slots[index] = second
+            self._requests[index] = 0
+            self._retries[index] = 0
+        return index
+
+    def _totals(self, now: float) -> tuple[int, int]:
+        oldest = int(now) - self.window + 1
+        requests = retries = 0
+        for i in range(self.window):
+            if self._slots[i] >= oldest:
+                requests += self._requests[i]
+                retries += self._retries[i]
+        return requests, retries
+
+    def record_request(self):
+        """记录一次首次请求（存入预算）"""
+        with self._lock:
+            self._requests[self._bucket(time.time())] += 1
+            self._stats["requests"] += 1
+
+    def try_acquire(self) -> bool:
+        """申请一次重试，超出预算返回 False"""
+        now = time.time()
+        with self._lock:
+            index = self._bucket(now)
+            requests, retries = self._totals(now)
+            if retries >= requests * self.ratio + self.min_per_second * self.window:
+                self._stats["exhausted"] += 1
+                return False
+            self._retries[index] += 1
+            self._stats["retries"] += 1
+            return True
+
+    def get_stats(self) -> dict:
+        """重试预算统计（累计值与当前窗口内的值）"""
+        with self._lock:
+            requests, retries = self._totals(time.time())
+            return {
+                "ratio": self.ratio,
+                "window_seconds": self.window,
+                "window_requests": requests,
+                "window_retries": retries,
+                **self._stats,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._requests = [0] * self.window
+            self._retries = [0] * self.window
+            self._slots = [0] * self.window
+            self._stats = {"requests": 0, "retries": 0, "exhausted": 0}
+
+
+def _status_code(error: Exception) -> int | None:
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    是否为临时性错误（超时、连接错误、429 / 5xx）
+
+    认证失败、参数错误等 4xx 以及本地限流 / 熔断拒绝不重试。
+    """
+    code = _status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    try:
+        import openai
+        if isinstance(error, openai.APIConnectionError):  # 包含 APITimeoutError
+            return True
+    except ImportError:
+        pass
+    return False
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """从异常中读取服务端要求的等待时间（Retry-After 头，秒数或 HTTP 日期）"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    max_delay: float,
+    previous: float,
+    jitter: JitterMode = "full",
+    exponential: bool = True,
+) -> float:
+    """
+    计算第 attempt 次重试（从 0 开始）前的等待时间
+
+    Args:
+        attempt: 重试序号
+        base: 初始延迟（秒）
+        max_delay: 延迟上限（秒）
+        previous: 上一次的延迟（decorrelated jitter 使用）
+        jitter: "full" / "decorrelated" / "none"
+        exponential: 是否指数增长
+    """
+    ceiling = min(max_delay, base * (2 ** attempt if exponential else 1))
+    if jitter == "full":
+        return random.uniform(0, ceiling)
+    if jitter == "decorrelated":
+        return min(max_delay, random.uniform(base, max(base, previous * 3)))
+    return ceiling
+
+
+# ===== 全局实例 =====
+
+_retry_budget: RetryBudget | None = None
+
+
+def get_retry_budget() -> RetryBudget:
+    """获取全局重试预算"""
+    global _retry_budget
+    if _retry_budget is None:
+        _retry_budget = RetryBudget(
+            ratio=settings.retry_budget_ratio,
+            min_per_second=settings.retry_budget_min_per_second,
+            window=settings.retry_budget_window,
+        )
+    return _retry_budget
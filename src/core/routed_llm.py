@@ -0,0 +1,602 @@
+"""
+加权路由模块
+
+在多个 LLM 提供商之间按实时健康度分流：
+1. 每个提供商维护 EWMA 延迟与 EWMA 错误率
+2. 权重 = 速度（1 / 延迟）× 健康度（(1 - 错误率)²），越快越稳的后端分到越多流量
+3. 错误率随时间指数衰减，并保留最小探测权重，故障或变慢的提供商恢复后自动回流
+4. 单次调用失败时按权重依次尝试其余提供商（流式调用只在尚未输出时切换）；
+   每个提供商有独立的滑动窗口熔断器，熔断期间不参与分流
+5. 可选对冲请求（HedgePolicy）：主提供商超过其历史延迟分位数仍未响应时，
+   向次选提供商并行发出相同请求，先完成者胜出，另一个被取消
+
+RoutedChatModel 是一个普通的 BaseChatModel，可以直接接入 prompt | llm 链、
+bind_tools 和 astream，对调用方透明。
+
+使用方式：
+```python
+from src.core.llm_router import get_llm_router
+
+llm = get_llm_router().get_llm()  # weighted 模式下返回 RoutedChatModel
+llm.invoke("你好")
+```
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import TimeoutError as FuturesTimeout, as_completed
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator, Literal
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+
+from src.core.circuit_breaker import CircuitOpenError
+from src.core.rate_limiter import usage_tokens
+
+logger = logging.getLogger(__name__)
+
+# 延迟样本类型：completion（非流式调用的完整耗时）/ first_token（流式调用的首 token 延迟）
+LatencyKind = Literal["completion", "first_token"]
+
+
+@dataclass
+class ProviderHealth:
+    """单个提供商的实时健康度"""
+    provider: str
+    model: str
+    alpha: float = 0.2  # EWMA 平滑系数
+    error_half_life: float = 30.0  # 错误率衰减半衰期（秒）
+    ewma_latency: float | None = None  # 秒（流式调用为首 token 延迟）
+    ewma_error: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    updated_at: float = field(default_factory=time.time)
+    # 最近的成功延迟，按调用类型分开保存（两者量级不同，混在一起分位数对两类调用都不准）
+    completion_samples: deque = field(default_factory=lambda: deque(maxlen=200))
+    first_token_samples: deque = field(default_factory=lambda: deque(maxlen=200))
+
+    def error_rate(self, now: float | None = None) -> float:
+        """当前错误率（没有新调用时随时间衰减，让故障后端自动恢复）"""
+        now = time.time() if now is None else now
+        elapsed = max(0.0, now - self.updated_at)
+        return self.ewma_error * 0.5 ** (elapsed / self.error_half_life)
+
+    def samples(self, kind: LatencyKind = "completion") -> deque:
+        """某类调用的延迟样本"""
+        return self.first_token_samples if kind == "first_token" else self.completion_samples
+
+    def _update(self, latency: float, failed: bool, kind: LatencyKind, sample: bool):
+        now = time.time()
+        self.ewma_error = self.error_rate(now)
+        self.ewma_error += self.alpha * ((1.0 if failed else 0.0) - self.ewma_error)
+        if not failed:
+            if sample:
+                self.samples(kind).append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+        self.calls += 1
+        self.errors += int(failed)
+        self.updated_at = now
+
+    def latency_percentile(self, q: float, kind: LatencyKind = "completion") -> float:
+        """最近成功调用延迟的分位数（q 为 0-100）"""
+        ordered = sorted(self.samples(kind))
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(len(ordered) * q / 100))
+        return ordered[index]
+
+    def record_success(self, latency: float, kind: LatencyKind = "completion", sample: bool = True):
+        """
+        记录成功调用
+
+        Args:
+            latency: 延迟（秒）
+            kind: 延迟类型（决定进入哪一组分位数样本）
+            sample: 是否计入分位数样本（被对冲取消的调用只有部分耗时，只更新 EWMA）
+        """
+        self._update(latency, failed=False, kind=kind, sample=sample)
+
+    def record_failure(self, latency: float, kind: LatencyKind = "completion"):
+        self._update(latency, failed=True, kind=kind, sample=False)
+
+
+class HedgePolicy:
+    """
+    对冲请求策略
+
+    主提供商在其历史延迟的某个分位数之后仍未返回（流式为未出首 token），
+    就向次选提供商再发一次相同请求，取先完成的一个并取消另一个。
+    每分钟的对冲次数有预算上限，控制额外开销。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        max_per_minute: int = 30,
+        min_delay: float = 0.3,
+        default_delay: float = 3.0,
+        min_samples: int = 20,
+    ):
+        """
+        Args:
+            enabled: 是否启用
+            percentile: 触发对冲的延迟分位数（0-100）
+            max_per_minute: 每分钟最多对冲次数
+            min_delay: 对冲等待下限（秒）
+            default_delay: 样本不足时的对冲等待（秒）
+            min_samples: 使用分位数所需的最少延迟样本数
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_per_minute = max_per_minute
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self._issued: deque[float] = deque()
+        self._lock = threading.Lock()
+        self._stats = {"fired": 0, "won": 0, "budget_exhausted": 0}
+
+    def delay(self, health: ProviderHealth, kind: LatencyKind = "completion") -> float:
+        """主提供商的对冲等待时间（非流式按完整耗时分位数，流式按首 token 延迟分位数）"""
+        if len(health.samples(kind)) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, health.latency_percentile(self.percentile, kind))
+
+    def try_acquire(self) -> bool:
+        """申请一次对冲预算（滑动 60 秒窗口）"""
+        now = time.monotonic()
+        with self._lock:
+            while self._issued and now - self._issued[0] >= 60.0:
+                self._issued.popleft()
+            if len(self._issued) >= self.max_per_minute:
+                self._stats["budget_exhausted"] += 1
+                return False
+            self._issued.append(now)
+            self._stats["fired"] += 1
+            return True
+
+    def record_win(self):
+        """对冲请求先于主请求完成"""
+        with self._lock:
+            self._stats["won"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "percentile": self.percentile,
+                "budget_per_minute": self.max_per_minute,
+                "used_last_minute": len(self._issued),
+                **self._stats,
+            }
+
+
+class RoutedChatModel(BaseChatModel):
+    """按权重在多个提供商之间分流的 Chat 模型（可选对冲请求）"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    router: Any  # LLMRouter
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"providers": self.router.available_providers}
+
+    def bind_tools(self, tools, *, tool_choice: str | None = None, **kwargs):
+        """绑定工具（OpenAI 格式，各提供商的 _generate 都接受 tools 参数）"""
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    def _hedge_pair(self, order: list[str]) -> tuple[str, str] | None:
+        """启用对冲且有次选时返回 (主, 次)"""
+        if self.router.hedging.enabled and len(order) > 1:
+            return order[0], order[1]
+        return None
+
+    # 内部调用不传 run_manager：token 回调由外层 BaseChatModel 统一发出，避免重复
+
+    # ----- 非流式 -----
+
+    # 每次调用先经过熔断器放行，再经过该提供商的限流器（排队时间不计入延迟）。
+    # 熔断中直接拒绝，不占用 RPM / TPM 预约与并发名额；被限流拒绝或排队时被取消则归还熔断器的放行许可。
+    # 两种拒绝都不计入健康度，直接尝试下一个提供商
+
+    def _admit(self, provider: str):
+        if not self.router.breaker(provider).allow_request():
+            raise CircuitOpenError(f"LLM 提供商 '{provider}' 熔断中")
+
+    @contextmanager
+    def _permit_sync(self, provider: str, messages):
+        """熔断器放行 + 限流许可（同步）"""
+        self._admit(provider)
+        entered = False
+        try:
+            with self.router.limiter(provider).acquire_sync(self.router.estimate_tokens(messages)) as reservation:
+                entered = True
+                yield reservation
+        except BaseException:
+            if not entered:
+                self.router.breaker(provider).release_permit()
+            raise
+
+    @asynccontextmanager
+    async def _permit(self, provider: str, messages):
+        """熔断器放行 + 限流许可（异步）"""
+        self._admit(provider)
+        entered = False
+        try:
+            async with self.router.limiter(provider).acquire(self.router.estimate_tokens(messages)) as reservation:
+                entered = True
+                yield reservation
+        except BaseException:
+            if not entered:
+                self.router.breaker(provider).release_permit()
+            raise
+
+    def _call(self, provider: str, messages, stop, **kwargs) -> ChatResult:
+        """调用单个提供商并记录延迟 / 错误"""
+        with self._permit_sync(provider, messages) as reservation:
+            start = time.perf_counter()
+            try:
+                result = self.router.get_llm(provider)._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self.router.record_result(provider, time.perf_counter() - start, error=e)
+                raise
+            self.router.record_result(provider, time.perf_counter() - start)
+            reservation.settle(usage_tokens(result))
+            return result
+
+    async def _acall(self, provider: str, messages, stop, **kwargs) -> ChatResult:
+        async with self._permit(provider, messages) as reservation:
+            start = time.perf_counter()
+            try:
+                result = await self.router.get_llm(provider)._agenerate(messages, stop=stop, **kwargs)
+            except asyncio.CancelledError:
+                # 被对冲取消：耗时是该提供商延迟的下界，计入 EWMA 让慢后端降权，
+                # 但不是一次完整调用的延迟，不进入分位数样本
+                self.router.record_result(provider, time.perf_counter() - start, sample=False)
+                raise
+            except Exception as e:
+                self.router.record_result(provider, time.perf_counter() - start, error=e)
+                raise
+            self.router.record_result(provider, time.perf_counter() - start)
+            reservation.settle(usage_tokens(result))
+            return result
+
+    def _provider_stream(self, provider: str, messages, stop, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """单个提供商的流（持有限流许可直到流结束，按首 token 延迟记录健康度）"""
+        with self._permit_sync(provider, messages):
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in self.router.get_llm(provider)._stream(messages, stop=stop, **kwargs):
+                    if not started:
+                        started = True
+                        self.router.record_result(provider, time.perf_counter() - start, kind="first_token")
+                    yield chunk
+            except Exception as e:
+                self.router.record_result(provider, time.perf_counter() - start, error=e, kind="first_token")
+                raise
+            if not started:
+                self.router.record_result(provider, time.perf_counter() - start, kind="first_token")
+
+    async def _provider_astream(self, provider: str, messages, stop, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        async with self._permit(provider, messages):
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in self.router.get_llm(provider)._astream(messages, stop=stop, **kwargs):
+                    if not started:
+                        started = True
+                        self.router.record_result(provider, time.perf_counter() - start, kind="first_token")
+                    yield chunk
+            except asyncio.CancelledError:
+                # 被对冲取消：同 _acall，只计入 EWMA，不进入首 token 分位数样本
+                if not started:
+                    self.router.record_result(provider, time.perf_counter() - start, kind="first_token", sample=False)
+                raise
+            except Exception as e:
+                self.router.record_result(provider, time.perf_counter() - start, error=e, kind="first_token")
+                raise
+            if not started:
+                self.router.record_result(provider, time.perf_counter() - start, kind="first_token")
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        order = self.router.route_order()
+        pair = self._hedge_pair(order)
+        last_error: Exception | None = None
+
+        if pair is not None:
+            # 同步调用在线程中对冲：输掉的一方无法中断，只丢弃其结果
+            primary, secondary = pair
+            policy = self.router.hedging
+            pool = self.router.hedge_executor()
+            first = pool.submit(self._call, primary, messages, stop, **kwargs)
+            futures = [first]
+            try:
+                return first.result(timeout=policy.delay(self.router.health(primary)))
+            except FuturesTimeout:
+                if policy.try_acquire():
+                    futures.append(pool.submit(self._call, secondary, messages, stop, **kwargs))
+                for future in as_completed(futures):
+                    if future.exception() is None:
+                        if future is not first:
+                            policy.record_win()
+                        return future.result()
+                    last_error = future.exception()
+                order = order[len(futures):]
+            except Exception as e:
+                last_error = e
+                order = order[1:]
+
+        for provider in order:
+            try:
+                return self._call(provider, messages, stop, **kwargs)
+            except Exception as e:
+                last_error = e
+        raise last_error or ValueError("没有可用的 LLM 提供商")
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        order = self.router.route_order()
+        pair = self._hedge_pair(order)
+        last_error: Exception | None = None
+
+        if pair is not None:
+            primary, secondary = pair
+            policy = self.router.hedging
+            first = asyncio.ensure_future(self._acall(primary, messages, stop, **kwargs))
+            tasks = [first]
+            try:
+                done, pending = await asyncio.wait(
+                    tasks, timeout=policy.delay(self.router.health(primary))
+                )
+                if not done and policy.try_acquire():
+                    tasks.append(asyncio.ensure_future(self._acall(secondary, messages, stop, **kwargs)))
+                pending = set(tasks) - done
+                while True:
+                    for task in done:
+                        if task.exception() is None:
+                            if task is not first:
+                                policy.record_win()
+                            return task.result()
+                        last_error = task.exception()
+                    if not pending:
+                        break
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                # 取消输掉（或调用方已放弃）的请求
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+            order = order[len(tasks):]
+
+        for provider in order:
+            try:
+                return await self._acall(provider, messages, stop, **kwargs)
+            except Exception as e:
+                last_error = e
+        raise last_error or ValueError("没有可用的 LLM 提供商")
+
+    # ----- 流式 -----
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        last_error: Exception | None = None
+        for provider in self.router.route_order():
+            started = False
+            try:
+                for chunk in self._provider_stream(provider, messages, stop, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    raise  # 已经输出了部分内容，不能再切换
+                last_error = e
+                continue
+            return
+        raise last_error or ValueError("没有可用的 LLM 提供商")
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        order = self.router.route_order()
+        policy = self.router.hedging
+
+        # 每个候选流：首块任务 -> 流迭代器
+        streams: dict[asyncio.Future, AsyncIterator] = {}
+
+        def launch(provider: str) -> asyncio.Future:
+            iterator = self._provider_astream(provider, messages, stop, **kwargs).__aiter__()
+            task = asyncio.ensure_future(iterator.__anext__())
+            streams[task] = iterator
+            return task
+
+        winner: asyncio.Future | None = None
+        hedges: set[asyncio.Future] = set()
+        last_error: Exception | None = None
+        tried = 0
+        try:
+            # 依次尝试候选；启用对冲时，主流迟迟不出首 token 就并行启动次选流
+            while winner is None and tried < len(order):
+                first = launch(order[tried])
+                tried += 1
+                pending = {first}
+                delay = (
+                    policy.delay(self.router.health(order[tried - 1]), kind="first_token")
+                    if policy.enabled else None
+                )
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not done and tried < len(order) and policy.try_acquire():
+                    hedge = launch(order[tried])
+                    hedges.add(hedge)
+                    pending.add(hedge)
+                    tried += 1
+                while winner is None:
+                    for task in done:
+                        error = task.exception()
+                        if error is None or isinstance(error, StopAsyncIteration):
+                            winner = task
+                            break
+                        last_error = error
+                    if winner is not None or not pending:
+                        break
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # 取消输掉（或调用方已放弃）的流，等取消生效后再关闭生成器
+            for task, iterator in streams.items():
+                if task is not winner:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    try:
+                        await iterator.aclose()
+                    except Exception:
+                        pass
+
+        if winner is None:
+            raise last_error or ValueError("没有可用的 LLM 提供商")
+
+        iterator = streams[winner]
+        if winner in hedges:
+            policy.record_win()
+        if isinstance(winner.exception(), StopAsyncIteration):
+            return  # 空流
+
+        # 已经输出了首块，之后的异常不再切换提供商
+        yield winner.result()
+        async for chunk in iterator:
+            yield chunk
+
+
+class WeightTable:
+    """提供商健康度表（线程安全）"""
+
+    def __init__(self, min_weight_ratio: float = 0.02, latency_floor: float = 0.05):
+        """
+        Args:
+            min_weight_ratio: 最小探测权重（相对最大权重），保证慢/故障后端仍有少量流量用于恢复
+            latency_floor: 延迟下限（秒），避免极小延迟放大权重
+        """
+        self.min_weight_ratio = min_weight_ratio
+        self.latency_floor = latency_floor
+        self._health: dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    def health(self, provider: str, model: str = "") -> ProviderHealth:
+        with self._lock:
+            item = self._health.get(provider)
+            if item is None:
+                item = self._health[provider] = ProviderHealth(provider=provider, model=model)
+            return item
+
+    def record(
+        self,
+        provider: str,
+        latency: float,
+        failed: bool,
+        kind: LatencyKind = "completion",
+        sample: bool = True,
+    ):
+        item = self.health(provider)
+        with self._lock:
+            if failed:
+                item.record_failure(latency, kind)
+            else:
+                item.record_success(latency, kind, sample)
+
+    def weights(self, providers: list[str]) -> dict[str, float]:
+        """归一化权重（未观测过延迟的提供商按已知最快处理，先给它机会）"""
+        now = time.time()
+        with self._lock:
+            known = [
+                self._health[p].ewma_latency for p in providers
+                if p in self._health and self._health[p].ewma_latency is not None
+            ]
+            default_latency = min(known) if known else 1.0
+
+            raw = {}
+            for p in providers:
+                item = self._health.get(p)
+                latency = item.ewma_latency if item and item.ewma_latency is not None else default_latency
+                error = item.error_rate(now) if item else 0.0
+                raw[p] = (1.0 / max(latency, self.latency_floor)) * (1.0 - error) ** 2
+
+        if not raw:
+            return {}
+        floor = max(raw.values()) * self.min_weight_ratio
+        raw = {p: max(w, floor) for p, w in raw.items()}
+        total = sum(raw.values()) or 1.0
+        return {p: w / total for p, w in raw.items()}
+
+    def order(self, providers: list[str]) -> list[str]:
+        """按权重随机选出首选，其余按权重从高到低作为失败时的后备"""
+        weights = self.weights(providers)
+        if not weights:
+            return []
+        names = list(weights)
+        first = random.choices(names, weights=[weights[n] for n in names])[0]
+        rest = sorted((n for n in names if n != first), key=lambda n: weights[n], reverse=True)
+        return [first, *rest]
+
+    def snapshot(self, providers: list[str]) -> dict:
+        """导出实时权重与健康度"""
+        weights = self.weights(providers)
+        now = time.time()
+        with self._lock:
+            return {
+                p: {
+                    "model": self._health[p].model if p in self._health else "",
+                    "weight": round(weights.get(p, 0.0), 4),
+                    "ewma_latency_ms": (
+                        round(self._health[p].ewma_latency * 1000, 1)
+                        if p in self._health and self._health[p].ewma_latency is not None else None
+                    ),
+                    "error_rate": round(self._health[p].error_rate(now), 4) if p in self._health else 0.0,
+                    "calls": self._health[p].calls if p in self._health else 0,
+                    "errors": self._health[p].errors if p in self._health else 0,
+                }
+                for p in providers
+            }
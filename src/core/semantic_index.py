@@ -0,0 +1,387 @@
+"""
+语义索引模块
+
+为响应缓存的语义层提供向量检索：
+1. 所有向量预先归一化，存放在一块连续的 NumPy 矩阵中
+2. 查询时一次矩阵-向量乘法得到全部余弦相似度，再取 argmax / top-k
+3. 删除的行进入空闲列表，新向量优先复用空闲行，保持矩阵紧凑
+
+两种检索模式：
+- exact：暴力检索，结果精确，适合几千到几万条
+- ivf：倒排文件（IVF）近似检索，只扫描最近的 nprobe 个聚类，适合十万级以上
+
+使用方式：
+```python
+from src.core.semantic_index import create_semantic_index
+
+index = create_semantic_index("ivf", nlist=256, nprobe=8)
+row = index.add(embedding, label=0)
+matches = index.search(query_embedding, k=1, label=0)  # [(row, score)]
+index.remove(row)
+```
+
+label 是可选的整数分区标签，检索时可只在同一分区内查找（如按缓存命名空间隔离）。
+"""
+
+from typing import Literal
+
+import numpy as np
+
+SemanticIndexType = Literal["exact", "ivf"]
+
+
+class ExactSemanticIndex:
+    """
+    精确语义索引（暴力检索）
+
+    每行存储一个 L2 归一化后的向量，行号在删除前保持稳定，
+    可作为外部条目的引用。
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        """
+        初始化索引
+
+        Args:
+            initial_capacity: 矩阵初始行数，写满后按 2 倍扩容
+        """
+        self.initial_capacity = max(1, initial_capacity)
+
+        self._matrix: np.ndarray | None = None  # shape: (capacity, dim)
+        self._valid: np.ndarray | None = None   # 每行是否有效
+        self._labels: np.ndarray | None = None  # 每行的分区标签
+        self._high_water = 0                    # 已使用过的最大行号 + 1
+        self._free_rows: list[int] = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def dim(self) -> int | None:
+        """向量维度（写入第一个向量后确定）"""
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        """转换为 float32 并做 L2 归一化（零向量保持为零）"""
+        arr = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(arr))
+        if norm > 0:
+            arr = arr / norm
+        return arr
+
+    def _ensure_capacity(self, dim: int):
+        """按需分配 / 扩容矩阵"""
+        if self._matrix is None:
+            self._matrix = np.zeros((self.initial_capacity, dim), dtype=np.float32)
+            self._valid = np.zeros(self.initial_capacity, dtype=bool)
+            self._labels = np.zeros(self.initial_capacity, dtype=np.int32)
+            return
+
+        if dim != self._matrix.shape[1]:
+            raise ValueError(f"向量维度不一致: 期望 {self._matrix.shape[1]}，实际 {dim}")
+
+        capacity = self._matrix.shape[0]
+        if self._high_water < capacity:
+            return
+
+        new_capacity = capacity * 2
+        matrix = np.zeros((new_capacity, dim), dtype=np.float32)
+        matrix[:capacity] = self._matrix
+        valid = np.zeros(new_capacity, dtype=bool)
+        valid[:capacity] = self._valid
+        labels = np.zeros(new_capacity, dtype=np.int32)
+        labels[:capacity] = self._labels
+        self._matrix = matrix
+        self._valid = valid
+        self._labels = labels
+
+    def add(self, vector, label: int = 0) -> int:
+        """
+        写入一个向量
+
+        Args:
+            vector: 原始向量（list 或 ndarray）
+            label: 分区标签
+
+        Returns:
+            分配到的行号
+        """
+        arr = self._normalize(vector)
+        self._ensure_capacity(arr.shape[0])
+
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = self._high_water
+            self._high_water += 1
+
+        self._matrix[row] = arr
+        self._valid[row] = True
+        self._labels[row] = label
+        self._count += 1
+        return row
+
+    def remove(self, row: int):
+        """删除一行，行号进入空闲列表等待复用"""
+        if self._valid is None or row >= self._high_water or not self._valid[row]:
+            return
+        self._valid[row] = False
+        self._matrix[row] = 0.0
+        self._free_rows.append(row)
+        self._count -= 1
+
+    def get_vector(self, row: int) -> np.ndarray | None:
+        """获取某行（归一化后的）向量"""
+        if self._valid is None or row >= self._high_water or not self._valid[row]:
+            return None
+        return self._matrix[row]
+
+    def search(self, vector, k: int = 1, label: int | None = None) -> list[tuple[int, float]]:
+        """
+        检索最相似的 k 个向量
+
+        Args:
+            vector: 查询向量
+            k: 返回数量
+            label: 只在该分区内检索，为 None 检索全部
+
+        Returns:
+            [(行号, 余弦相似度)]，按相似度降序
+        """
+        if self._count == 0:
+            return []
+
+        query = self._normalize(vector)
+        if query.shape[0] != self._matrix.shape[1]:
+            raise ValueError(f"向量维度不一致: 期望 {self._matrix.shape[1]}，实际 {query.shape[0]}")
+
+        n = self._high_water
+        mask = self._valid[:n]
+        if label is not None:
+            mask = mask & (self._labels[:n] == label)
+        scores = np.where(mask, self._matrix[:n] @ query, -np.inf)
+
+        k = min(k, int(mask.sum()))
+        if k == 0:
+            return []
+        if k == 1:
+            best = int(np.argmax(scores))
+            return [(best, float(scores[best]))]
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def clear(self):
+        """清空索引（保留已分配的矩阵）"""
+        if self._matrix is not None:
+            self._matrix[:self._high_water] = 0.0
+            self._valid[:self._high_water] = False
+        self._high_water = 0
+        self._free_rows.clear()
+        self._count = 0
+
+
+class IVFSemanticIndex(ExactSemanticIndex):
+    """
+    IVF 近似语义索引
+
+    用球面 k-means 把向量划分为 nlist 个聚类，每个聚类维护一个倒排列表。
+    查询时只扫描与查询最相近的 nprobe 个聚类。
+
+    - 插入：分配到最近的质心，追加到对应倒排列表，O(nlist + dim)
+    - 删除：与倒排列表末尾交换后弹出，O(1)
+    - 训练：条目数达到 nlist * train_factor 时首次训练，之后每增长
+      retrain_growth 倍重新训练一次（摊还）；训练前退化为精确检索
+    """
+
+    def __init__(
+        self,
+        nlist: int = 256,
+        nprobe: int = 8,
+        train_factor: int = 8,
+        retrain_growth: float = 4.0,
+        kmeans_iters: int = 10,
+        initial_capacity: int = 64,
+        seed: int = 0,
+    ):
+        """
+        初始化索引
+
+        Args:
+            nlist: 聚类（倒排列表）数量
+            nprobe: 查询时扫描的聚类数量，越大召回越高、越慢
+            train_factor: 首次训练所需的条目数 = nlist * train_factor
+            retrain_growth: 条目数相对上次训练增长多少倍时重新训练
+            kmeans_iters: k-means 迭代次数
+            initial_capacity: 矩阵初始行数
+            seed: 随机种子（保证训练结果可复现）
+        """
+        super().__init__(initial_capacity=initial_capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_factor = train_factor
+        self.retrain_growth = retrain_growth
+        self.kmeans_iters = kmeans_iters
+        self._rng = np.random.default_rng(seed)
+
+        self._centroids: np.ndarray | None = None
+        self._trained_count = 0
+        self._assign = np.full(self.initial_capacity, -1, dtype=np.int32)  # 行 -> 聚类
+        self._pos = np.zeros(self.initial_capacity, dtype=np.int64)        # 行 -> 列表内位置
+        self._lists: list[np.ndarray] = []
+        self._list_sizes: np.ndarray = np.zeros(0, dtype=np.int64)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _grow_row_arrays(self):
+        """行级辅助数组跟随矩阵扩容"""
+        capacity = self._matrix.shape[0]
+        if self._assign.shape[0] < capacity:
+            assign = np.full(capacity, -1, dtype=np.int32)
+            assign[:self._assign.shape[0]] = self._assign
+            pos = np.zeros(capacity, dtype=np.int64)
+            pos[:self._pos.shape[0]] = self._pos
+            self._assign, self._pos = assign, pos
+
+    def _list_append(self, cluster: int, row: int):
+        size = self._list_sizes[cluster]
+        bucket = self._lists[cluster]
+        if size == bucket.shape[0]:
+            grown = np.empty(max(8, size * 2), dtype=np.int64)
+            grown[:size] = bucket[:size]
+            self._lists[cluster] = bucket = grown
+        bucket[size] = row
+        self._pos[row] = size
+        self._assign[row] = cluster
+        self._list_sizes[cluster] = size + 1
+
+    def _list_remove(self, row: int):
+        cluster = self._assign[row]
+        if cluster < 0:
+            return
+        bucket = self._lists[cluster]
+        last = self._list_sizes[cluster] - 1
+        pos = self._pos[row]
+        moved = bucket[last]
+        bucket[pos] = moved
+        self._pos[moved] = pos
+        self._list_sizes[cluster] = last
+        self._assign[row] = -1
+
+    def _nearest_centroids(self, vectors: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+        """分块计算每个向量最近的质心，避免一次性分配 n * nlist 的矩阵"""
+        result = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start:start + chunk_size]
+            result[start:start + chunk_size] = np.argmax(block @ self._centroids.T, axis=1)
+        return result
+
+    def _train(self):
+        """在当前全部向量上训练质心并重建倒排列表"""
+        rows = np.flatnonzero(self._valid[:self._high_water])
+        data = self._matrix[rows]
+        nlist = min(self.nlist, rows.shape[0])
+
+        # 采样训练，控制 k-means 开销
+        sample_size = min(rows.shape[0], nlist * 64)
+        sample = data[self._rng.choice(rows.shape[0], sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            if empty.any():
+                # 空聚类用随机样本重新初始化
+                sums[empty] = sample[self._rng.choice(sample_size, int(empty.sum()))]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        self._centroids = centroids.astype(np.float32)
+        self._lists = [np.empty(8, dtype=np.int64) for _ in range(nlist)]
+        self._list_sizes = np.zeros(nlist, dtype=np.int64)
+        self._assign[:] = -1
+
+        for row, cluster in zip(rows, self._nearest_centroids(data)):
+            self._list_append(int(cluster), int(row))
+        self._trained_count = rows.shape[0]
+
+    def add(self, vector, label: int = 0) -> int:
+        row = super().add(vector, label)
+        self._grow_row_arrays()
+
+        if self.is_trained:
+            cluster = int(np.argmax(self._centroids @ self._matrix[row]))
+            self._list_append(cluster, row)
+            if self._count >= self._trained_count * self.retrain_growth:
+                self._train()
+        elif self._count >= self.nlist * self.train_factor:
+            self._train()
+        return row
+
+    def remove(self, row: int):
+        if self._valid is None or row >= self._high_water or not self._valid[row]:
+            return
+        if self.is_trained:
+            self._list_remove(row)
+        super().remove(row)
+
+    def search(self, vector, k: int = 1, label: int | None = None) -> list[tuple[int, float]]:
+        if not self.is_trained:
+            return super().search(vector, k, label)
+        if self._count == 0:
+            return []
+
+        query = self._normalize(vector)
+        nprobe = min(self.nprobe, self._centroids.shape[0])
+        centroid_scores = self._centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.concatenate([self._lists[c][:self._list_sizes[c]] for c in probes])
+        if label is not None:
+            candidates = candidates[self._labels[candidates] == label]
+        if candidates.shape[0] == 0:
+            return []
+
+        scores = self._matrix[candidates] @ query
+        k = min(k, candidates.shape[0])
+        if k == 1:
+            best = int(np.argmax(scores))
+            return [(int(candidates[best]), float(scores[best]))]
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def clear(self):
+        super().clear()
+        self._centroids = None
+        self._trained_count = 0
+        self._assign[:] = -1
+        self._lists = []
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+
+
+def create_semantic_index(kind: SemanticIndexType = "exact", **kwargs) -> ExactSemanticIndex:
+    """
+    创建语义索引
+
+    Args:
+        kind: "exact"（精确）或 "ivf"（近似）
+        **kwargs: 传给对应索引的参数
+
+    Returns:
+        语义索引实例
+    """
+    if kind == "exact":
+        return ExactSemanticIndex(**kwargs)
+    elif kind == "ivf":
+        return IVFSemanticIndex(**kwargs)
+    raise ValueError(f"不支持的语义索引类型: {kind}")
@@ -0,0 +1,153 @@
+"""
+请求合并模块 (Single-Flight)
+
+促销期间同一秒内常有大量相同问题（如“有什么优惠活动？”），
+缓存尚未写入前每个请求都会各自调用 LLM。Single-Flight 保证：
+1. 同一 key 同时只有一次真正的计算，其余请求等待并共享结果
+2. 流式场景下，后到的请求订阅同一条流，从第一个块开始回放并继续接收新块
+3. 计算在独立的 Task 中执行，发起者断开连接不会中断其他等待者
+
+使用方式：
+```python
+from src.core.single_flight import get_single_flight
+
+flight = get_single_flight()
+
+# 普通调用
+result = await flight.do(key, lambda: compute_answer(query))
+
+# 流式调用
+async for chunk in flight.stream(key, lambda: llm_token_stream(query)):
+    yield chunk
+```
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class _StreamCall:
+    """一条正在进行的共享流"""
+
+    def __init__(self):
+        self.chunks: list[Any] = []
+        self.done = False
+        self.error: Exception | None = None
+        self.condition = asyncio.Condition()
+        self.task: asyncio.Task | None = None
+
+    async def notify(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+
+class SingleFlight:
+    """请求合并器"""
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self._streams: dict[str, _StreamCall] = {}
+        self._stats = {
+            "calls": 0,       # 总调用次数
+            "executions": 0,  # 实际执行次数
+            "coalesced": 0,   # 被合并（共享结果）的次数
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入一次计算
+
+        Args:
+            key: 合并 key（相同 key 的并发请求共享一次计算）
+            fn: 返回 awaitable 的计算函数
+
+        Returns:
+            计算结果（异常会传播给所有等待者）
+        """
+        self._stats["calls"] += 1
+
+        task = self._calls.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            logger.debug(f"[SingleFlight] 合并请求: {key}")
+        else:
+            self._stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _t: self._calls.pop(key, None))
+
+        # shield：单个等待者被取消不影响共享的计算
+        return await asyncio.shield(task)
+
+    async def _pump(self, call: _StreamCall, source: AsyncIterator[Any]):
+        """驱动源流，把每个块广播给所有订阅者"""
+        try:
+            async for chunk in source:
+                call.chunks.append(chunk)
+                await call.notify()
+        except Exception as e:
+            call.error = e
+        finally:
+            call.done = True
+            await call.notify()
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        执行或订阅一条共享流
+
+        Args:
+            key: 合并 key
+            fn: 返回异步迭代器的函数（只有第一个请求会调用）
+
+        Yields:
+            流中的每个块（后到的订阅者先回放已产生的块）
+        """
+        self._stats["calls"] += 1
+
+        call = self._streams.get(key)
+        if call is not None:
+            self._stats["coalesced"] += 1
+            logger.debug(f"[SingleFlight] 合并流式请求: {key}")
+        else:
+            self._stats["executions"] += 1
+            call = _StreamCall()
+            self._streams[key] = call
+            call.task = asyncio.ensure_future(self._pump(call, fn()))
+            call.task.add_done_callback(lambda _t: self._streams.pop(key, None))
+
+        index = 0
+        while True:
+            while index < len(call.chunks):
+                yield call.chunks[index]
+                index += 1
+
+            if call.done:
+                if call.error is not None:
+                    raise call.error
+                return
+
+            async with call.condition:
+                await call.condition.wait_for(lambda: call.done or len(call.chunks) > index)
+
+    def get_stats(self) -> dict:
+        """获取合并统计"""
+        return {
+            **self._stats,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
+
+
+# ===== 全局实例 =====
+
+_single_flight: SingleFlight | None = None
+
+
+def get_single_flight() -> SingleFlight:
+    """获取全局请求合并器"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
@@ -1,5 +1,6 @@
 """LangGraph 工作流模块"""
 
 from .customer_service_graph import CustomerServiceGraph
+from .routing import EmbeddingRouter, FastRouter, RouteDecision
 
-__all__ = ["CustomerServiceGraph"]
+__all__ = ["CustomerServiceGraph", "EmbeddingRouter", "FastRouter", "RouteDecision"]
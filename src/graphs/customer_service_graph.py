@@ -3,22 +3,50 @@
 使用 LangGraph 构建 Supervisor 模式的多 Agent 协作系统
 """
 
-from typing import TypedDict, Literal, Annotated
+from collections import Counter
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TypedDict, Literal, Annotated, AsyncIterator, Awaitable, Callable
+import asyncio
+import hashlib
+import json
+import logging
 import operator
+import threading
 
+from langchain_core.callbacks import adispatch_custom_event
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END
 
+from src.config import settings
 from src.agents.chitchat_agent import get_llm
 from src.agents import ChitchatAgent, ProductAgent
 from src.agents.order_agent import OrderAgent
 from src.agents.aftersales_agent import AfterSalesAgent
+from src.agents.triage_agent import TriageAgent, TriageResult
+from src.core.adaptive_limiter import AdaptiveConcurrencyLimiter
+from src.core.bulkhead import BulkheadFullError, get_bulkhead
+from src.core.circuit_breaker import LLM_FALLBACK_MESSAGE
+from src.core.executor import run_sync, submit_sync
+from src.core.response_cache import ResponseCache, get_cache
+from src.graphs.routing import EmbeddingRouter, FastRouter, RouteDecision
 from src.rag import KnowledgeRetriever
 
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
 
 # 定义 Agent 类型
 AgentType = Literal["ProductAgent", "OrderAgent", "AfterSalesAgent", "ChitchatAgent"]
 
+# 工作流拓扑：standard（路由 + Agent 两跳）/ single_call（一次调用分诊并直接回答）
+GraphMode = Literal["standard", "single_call"]
+
+# 分诊已直接回答时的路由标记（结束工作流）
+ANSWERED = "answered"
+
 
 class AgentState(TypedDict):
     """Agent 状态定义"""
@@ -32,11 +60,60 @@ class AgentState(TypedDict):
     agent_response: str
     # 是否需要继续处理
     should_continue: bool
+    # 是否启用响应缓存
+    use_cache: bool
+    # 回复是否来自缓存
+    cached: bool
+    # 是否因并发超限 / 舱壁已满被降级（返回兜底回复）
+    shed: bool
+    # 路由期间投机启动的知识库检索（RAG Agent 使用，其他 Agent 丢弃）
+    prefetch: Future | None
+
+
+# 缓存命名空间
+ROUTE_CACHE_NAMESPACE = "route"
+ANSWER_CACHE_NAMESPACE = "answer"
+REQUEST_CACHE_NAMESPACE = "request"
+
+# 回复依赖实时数据（订单状态、物流）的 Agent 不缓存回复
+UNCACHEABLE_AGENTS = {"OrderAgent"}
+
+# 使用知识库检索结果的 Agent，以及投机预取的文档数（取各 Agent 所需的最大值）
+RAG_AGENTS = {"ProductAgent", "AfterSalesAgent"}
+PREFETCH_K = 3
+
+# 异步执行时 RAG Agent 拿到检索结果后派发的自定义事件（astream 转成 sources 事件）
+RETRIEVAL_EVENT = "retrieval"
+
+
+def document_sources(documents: list) -> list[dict]:
+    """检索结果的来源信息（文件名与分类）"""
+    return [
+        {
+            "source": doc.metadata.get("filename", ""),
+            "category": doc.metadata.get("category", ""),
+        }
+        for doc in documents
+    ]
+
+
+def history_fingerprint(chat_history: list[dict]) -> str:
+    """计算对话历史指纹（无历史时为固定值，便于无状态问题共享缓存）"""
+    if not chat_history:
+        return "0"
+    payload = json.dumps(
+        [(msg.get("role"), msg.get("content")) for msg in chat_history],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
 
 
 class SupervisorAgent:
     """
-    Supervisor Agent - 使用 LLM 进行智能意图识别和路由
+    Supervisor Agent - 分层意图识别和路由
+    
+    先用关键词 / 正则快速路由（微秒级），再用 embedding 对标注样例分类（毫秒级），
+    两者都没有把握时才调用 LLM 进行意图识别
     """
     
     ROUTING_PROMPT = """你是一个智能客服系统的路由器，需要根据用户的输入判断应该由哪个专业 Agent 来处理。
@@ -51,25 +128,116 @@ class SupervisorAgent:
 
 请只输出一个 Agent 名称（ProductAgent/OrderAgent/AfterSalesAgent/ChitchatAgent），不要输出其他内容。"""
 
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(
+        self,
+        fast_router: FastRouter | None = None,
+        threshold: float | None = None,
+        embedding_router: EmbeddingRouter | None = None,
+        margin: float | None = None,
+    ):
+        """
+        Args:
+            fast_router: 快速路由器，为 None 时按配置创建（settings.routing_fast_path_enabled）
+            threshold: 快速路由的置信度阈值，低于该值时调用 LLM
+            embedding_router: Embedding 路由器，为 None 时按配置创建（settings.routing_embedding_enabled）
+            margin: Embedding 路由的 top-2 分数差阈值，低于该值时调用 LLM
+        """
+        self._llm = None
+        if fast_router is None and settings.routing_fast_path_enabled:
+            fast_router = FastRouter()
+        self.fast_router = fast_router
+        self.threshold = settings.routing_fast_path_threshold if threshold is None else threshold
+        
+        if embedding_router is None and settings.routing_embedding_enabled:
+            exemplars = Path(settings.routing_embedding_exemplars)
+            embedding_router = EmbeddingRouter.from_file(
+                exemplars if exemplars.is_absolute() else PROJECT_ROOT / exemplars,
+                method=settings.routing_embedding_method,
+                k=settings.routing_embedding_k,
+            )
+        self.embedding_router = embedding_router
+        self.margin = settings.routing_embedding_margin if margin is None else margin
+        
+        # 路由来源计数：rule（快速路由）/ embedding / cache（路由缓存）/ llm
+        self._sources: Counter[str] = Counter()
+        self._lock = threading.Lock()
+    
+    @property
+    def llm(self):
+        """意图识别用的 LLM（懒加载：快速路由命中时不需要）"""
+        if self._llm is None:
+            self._llm = get_llm()
+        return self._llm
     
-    def route(self, user_input: str) -> AgentType:
+    def record_source(self, source: str):
+        """记录一次路由结果的来源"""
+        with self._lock:
+            self._sources[source] += 1
+    
+    def fast_route(self, user_input: str) -> RouteDecision | None:
+        """快速路由：置信度达到阈值时返回结果，否则返回 None"""
+        if self.fast_router is None:
+            return None
+        decision = self.fast_router.route(user_input)
+        if decision.agent is None or decision.confidence < self.threshold:
+            return None
+        self.record_source("rule")
+        return decision
+    
+    def embedding_route(self, user_input: str) -> RouteDecision | None:
+        """Embedding 路由：top-2 分数差达到阈值时返回结果，否则（或 embedding 调用失败）返回 None"""
+        if self.embedding_router is None:
+            return None
+        try:
+            decision = self.embedding_router.route(user_input)
+        except Exception as e:
+            logger.warning(f"Embedding 路由失败，回退到 LLM: {e}")
+            return None
+        if decision.agent is None or decision.confidence < self.margin:
+            return None
+        self.record_source("embedding")
+        return decision
+    
+    def route(self, user_input: str, fast_path: bool = True) -> AgentType:
         """
         根据用户输入路由到对应的 Agent
         
         Args:
             user_input: 用户输入
+            fast_path: 是否先尝试快速路由与 Embedding 路由
             
         Returns:
             Agent 名称
         """
+        if fast_path:
+            decision = self.fast_route(user_input) or self.embedding_route(user_input)
+            if decision is not None:
+                return decision.agent
+        
         # 使用 LLM 进行意图识别
+        self.record_source("llm")
         response = self.llm.invoke(
             self.ROUTING_PROMPT.format(user_input=user_input)
         )
+        return self._parse_agent(response.content)
+    
+    async def aroute(self, user_input: str, fast_path: bool = True) -> AgentType:
+        """异步版本的 route（同步的 embedding 调用放到有界线程池，LLM 调用使用 ainvoke）"""
+        if fast_path:
+            decision = self.fast_route(user_input) or await run_sync(self.embedding_route, user_input)
+            if decision is not None:
+                return decision.agent
         
-        agent_name = response.content.strip()
+        self.record_source("llm")
+        response = await self.llm.ainvoke(
+            self.ROUTING_PROMPT.format(user_input=user_input)
+        )
+        return self._parse_agent(response.content)
+    
+    @staticmethod
+    def _parse_agent(content: str) -> AgentType:
+        """解析 LLM 输出的 Agent 名称"""
+        agent_name = content.strip()
         
         # 验证返回的 Agent 名称
         valid_agents = ["ProductAgent", "OrderAgent", "AfterSalesAgent", "ChitchatAgent"]
@@ -80,21 +248,65 @@ class SupervisorAgent:
         
         # 默认返回 ChitchatAgent
         return "ChitchatAgent"
+    
+    def get_stats(self) -> dict:
+        """路由来源统计与节省的 LLM 调用比例"""
+        with self._lock:
+            sources = dict(self._sources)
+        total = sum(sources.values())
+        return {
+            "fast_path_enabled": self.fast_router is not None,
+            "threshold": self.threshold,
+            "embedding_enabled": self.embedding_router is not None,
+            "margin": self.margin,
+            "sources": sources,
+            "llm_calls_saved": round(1 - sources.get("llm", 0) / total, 4) if total else 0.0,
+        }
 
 
 class CustomerServiceGraph:
     """
     客服系统 Multi-Agent 工作流
     使用 LangGraph 实现 Supervisor 模式
+    
+    single_call 模式下 Supervisor 节点用一次 LLM 调用同时分诊并直接回答闲聊，
+    只有需要订单数据或知识库检索时才进入专业 Agent
     """
     
-    def __init__(self, retriever: KnowledgeRetriever):
+    def __init__(
+        self,
+        retriever: KnowledgeRetriever,
+        cache: ResponseCache | None = None,
+        limiter: AdaptiveConcurrencyLimiter | None = None,
+        mode: GraphMode | None = None,
+    ):
         """
         初始化客服系统工作流
         
         Args:
             retriever: 知识库检索器
+            cache: 响应缓存，为 None 使用全局缓存
+            limiter: Agent 执行的自适应并发限制器，为 None 时按配置创建
+            mode: 工作流拓扑，为 None 时使用 settings.graph_mode
         """
+        self.retriever = retriever
+        self.cache = cache or get_cache()
+        
+        if limiter is None and settings.agent_concurrency_enabled:
+            limiter = AdaptiveConcurrencyLimiter(
+                initial_limit=settings.agent_concurrency_initial,
+                min_limit=settings.agent_concurrency_min,
+                max_limit=settings.agent_concurrency_max,
+                algorithm=settings.agent_concurrency_algorithm,
+                tolerance=settings.agent_concurrency_tolerance,
+            )
+        self.limiter = limiter
+        
+        # 投机检索：路由调用 LLM / embedding 期间并行执行知识库检索
+        self.speculative_retrieval = settings.speculative_retrieval_enabled
+        self._prefetch_stats = {"started": 0, "used": 0, "dropped": 0, "failed": 0}
+        self._prefetch_lock = threading.Lock()
+        
         # 初始化各个 Agent
         self.supervisor = SupervisorAgent()
         self.chitchat_agent = ChitchatAgent()
@@ -102,6 +314,9 @@ class CustomerServiceGraph:
         self.order_agent = OrderAgent()
         self.aftersales_agent = AfterSalesAgent(retriever=retriever)
         
+        self.mode = mode or settings.graph_mode
+        self.triage_agent = TriageAgent() if self.mode == "single_call" else None
+        
         # 构建工作流图
         self.graph = self._build_graph()
     
@@ -111,12 +326,20 @@ class CustomerServiceGraph:
         # 创建状态图
         workflow = StateGraph(AgentState)
         
-        # 添加节点
-        workflow.add_node("supervisor", self._supervisor_node)
-        workflow.add_node("product_agent", self._product_agent_node)
-        workflow.add_node("order_agent", self._order_agent_node)
-        workflow.add_node("aftersales_agent", self._aftersales_agent_node)
-        workflow.add_node("chitchat_agent", self._chitchat_agent_node)
+        # 添加节点（同时提供同步与异步实现：invoke 走同步节点，ainvoke 走异步节点）
+        if self.mode == "single_call":
+            supervisor = (self._triage_node, self._atriage_node)
+        else:
+            supervisor = (self._supervisor_node, self._asupervisor_node)
+        nodes = {
+            "supervisor": supervisor,
+            "product_agent": (self._product_agent_node, self._aproduct_agent_node),
+            "order_agent": (self._order_agent_node, self._aorder_agent_node),
+            "aftersales_agent": (self._aftersales_agent_node, self._aaftersales_agent_node),
+            "chitchat_agent": (self._chitchat_agent_node, self._achitchat_agent_node),
+        }
+        for name, (func, afunc) in nodes.items():
+            workflow.add_node(name, RunnableLambda(func, afunc=afunc, name=name))
         
         # 设置入口点
         workflow.set_entry_point("supervisor")
@@ -130,6 +353,7 @@ class CustomerServiceGraph:
                 "OrderAgent": "order_agent",
                 "AfterSalesAgent": "aftersales_agent",
                 "ChitchatAgent": "chitchat_agent",
+                ANSWERED: END,
             }
         )
         
@@ -141,74 +365,537 @@ class CustomerServiceGraph:
         
         return workflow.compile()
     
+    def _answer_namespace(self, agent_name: str, state: AgentState) -> str:
+        """回复缓存命名空间：Agent + 对话历史指纹 + 知识库版本"""
+        return ":".join([
+            ANSWER_CACHE_NAMESPACE,
+            agent_name,
+            history_fingerprint(state["chat_history"]),
+            getattr(self.retriever, "version", settings.knowledge_base_version),
+        ])
+    
+    def request_key(self, user_input: str, chat_history: list[dict] | None = None) -> str:
+        """
+        整个请求的缓存 key（问题 + 对话历史 + 知识库版本）
+        
+        用于合并并发的相同请求：key 相同的请求必然得到相同的回复
+        """
+        namespace = ":".join([
+            REQUEST_CACHE_NAMESPACE,
+            history_fingerprint(chat_history or []),
+            getattr(self.retriever, "version", settings.knowledge_base_version),
+        ])
+        return self.cache.make_key(user_input, namespace=namespace)
+    
     def _supervisor_node(self, state: AgentState) -> AgentState:
-        """Supervisor 节点：进行意图识别和路由"""
-        agent_type = self.supervisor.route(state["user_input"])
+        """Supervisor 节点：快速路由 -> 路由缓存 -> Embedding 路由 -> LLM 意图识别（结果可缓存）"""
+        user_input = state["user_input"]
+        
+        decision = self.supervisor.fast_route(user_input)
+        if decision is not None:
+            agent_type = decision.agent
+        elif state["use_cache"]:
+            agent_type = self.cache.get(user_input, namespace=ROUTE_CACHE_NAMESPACE)
+            if agent_type is None:
+                state = self._start_prefetch(state)
+                agent_type = self._classify(user_input)
+                self.cache.get_or_set(
+                    user_input,
+                    agent_type,
+                    ttl=settings.cache_route_ttl,
+                    namespace=ROUTE_CACHE_NAMESPACE,
+                )
+            else:
+                self.supervisor.record_source("cache")
+        else:
+            state = self._start_prefetch(state)
+            agent_type = self._classify(user_input)
+        
+        return {**state, "current_agent": agent_type}
+    
+    def _classify(self, user_input: str) -> AgentType:
+        """规则没有把握时：先 Embedding 分类，margin 不足再调用 LLM"""
+        decision = self.supervisor.embedding_route(user_input)
+        if decision is not None:
+            return decision.agent
+        return self.supervisor.route(user_input, fast_path=False)
+    
+    async def _cache_call(self, func: Callable, *args, **kwargs):
+        """异步节点中访问缓存：可能访问 Redis L2 或调用 embedding 接口（同步 I/O），放到线程池执行"""
+        return await run_sync(func, *args, **kwargs)
+    
+    async def _asupervisor_node(self, state: AgentState) -> AgentState:
+        """异步 Supervisor 节点（与 _supervisor_node 相同的分层路由）"""
+        user_input = state["user_input"]
+        
+        decision = self.supervisor.fast_route(user_input)
+        if decision is not None:
+            agent_type = decision.agent
+        elif state["use_cache"]:
+            agent_type = await self._cache_call(self.cache.get, user_input, namespace=ROUTE_CACHE_NAMESPACE)
+            if agent_type is None:
+                state = self._start_prefetch(state)
+                agent_type = await self._aclassify(user_input)
+                await self._cache_call(
+                    self.cache.get_or_set,
+                    user_input,
+                    agent_type,
+                    ttl=settings.cache_route_ttl,
+                    namespace=ROUTE_CACHE_NAMESPACE,
+                )
+            else:
+                self.supervisor.record_source("cache")
+        else:
+            state = self._start_prefetch(state)
+            agent_type = await self._aclassify(user_input)
+        
         return {**state, "current_agent": agent_type}
     
-    def _route_to_agent(self, state: AgentState) -> AgentType:
-        """路由函数：返回下一个要执行的 Agent"""
+    async def _aclassify(self, user_input: str) -> AgentType:
+        """异步版本的 _classify"""
+        decision = await run_sync(self.supervisor.embedding_route, user_input)
+        if decision is not None:
+            return decision.agent
+        return await self.supervisor.aroute(user_input, fast_path=False)
+    
+    def _start_prefetch(self, state: AgentState) -> AgentState:
+        """
+        路由需要调用 embedding / LLM 时，在线程池中提前启动知识库检索
+        
+        检索与路由并行，RAG Agent 直接使用预取结果；快速路由、路由缓存命中时路由本身
+        几乎不耗时，没有可以隐藏的延迟，不做预取
+        """
+        if not self.speculative_retrieval or self.retriever is None:
+            return state
+        prefetch = submit_sync(self.retriever.search, state["user_input"], k=PREFETCH_K)
+        self._count_prefetch("started")
+        return {**state, "prefetch": prefetch}
+    
+    def _count_prefetch(self, key: str):
+        with self._prefetch_lock:
+            self._prefetch_stats[key] += 1
+    
+    def _drop_prefetch(self, state: AgentState):
+        """丢弃用不上的预取（尚未开始的直接取消，已在执行的忽略其结果）"""
+        prefetch = state.get("prefetch")
+        if prefetch is not None:
+            prefetch.cancel()
+            self._count_prefetch("dropped")
+    
+    def _prefetched_documents(self, state: AgentState, agent_name: AgentType) -> list | None:
+        """
+        取出预取的文档（非 RAG Agent 丢弃预取）
+        
+        最多等待 settings.speculative_retrieval_timeout 秒；预取失败或超时返回 None，由调用方重新检索
+        """
+        prefetch = self._claim_prefetch(state, agent_name)
+        if prefetch is None:
+            return None
+        try:
+            documents = prefetch.result(timeout=settings.speculative_retrieval_timeout)
+        except Exception as e:
+            return self._prefetch_failed(prefetch, e)
+        self._count_prefetch("used")
+        return documents
+    
+    async def _aprefetched_documents(self, state: AgentState, agent_name: AgentType) -> list | None:
+        """异步版本的 _prefetched_documents（等待预取不占用事件循环）"""
+        prefetch = self._claim_prefetch(state, agent_name)
+        if prefetch is None:
+            return None
+        try:
+            documents = await asyncio.wait_for(
+                asyncio.wrap_future(prefetch), timeout=settings.speculative_retrieval_timeout
+            )
+        except Exception as e:
+            return self._prefetch_failed(prefetch, e)
+        self._count_prefetch("used")
+        return documents
+    
+    def _claim_prefetch(self, state: AgentState, agent_name: AgentType) -> Future | None:
+        """RAG Agent 取走预取任务；其他 Agent 丢弃预取并返回 None"""
+        prefetch = state.get("prefetch")
+        if prefetch is not None and agent_name not in RAG_AGENTS:
+            self._drop_prefetch(state)
+            return None
+        return prefetch
+    
+    def _prefetch_failed(self, prefetch: Future, error: Exception) -> None:
+        """预取失败或超时：取消预取并计数，返回 None 由调用方重新检索"""
+        prefetch.cancel()
+        self._count_prefetch("failed")
+        logger.warning(f"预取检索失败或超时，重新检索: {error!r}")
+        return None
+    
+    def get_prefetch_stats(self) -> dict:
+        """投机检索统计：启动 / 被 RAG Agent 使用 / 被丢弃 / 失败或超时的次数"""
+        with self._prefetch_lock:
+            return {"enabled": self.speculative_retrieval, **self._prefetch_stats}
+    
+    def _triage_node(self, state: AgentState) -> AgentState:
+        """
+        single_call 模式的 Supervisor 节点
+        
+        快速路由 / 路由缓存 / Embedding 路由有把握时直接交给对应 Agent（与标准模式相同，只需一次调用）；
+        否则用一次分诊调用代替“LLM 路由 + Agent 回答”：闲聊直接得到回复，其余交给选出的 Agent
+        """
+        user_input = state["user_input"]
+        
+        decision = self.supervisor.fast_route(user_input)
+        if decision is None and state["use_cache"]:
+            agent_type = self._cached_route(state)
+            if agent_type is not None:
+                return {**state, "current_agent": agent_type}
+        if decision is None:
+            decision = self.supervisor.embedding_route(user_input)
+        if decision is not None:
+            return {**state, "current_agent": decision.agent}
+        
+        state = self._start_prefetch(state)
+        result = self.triage_agent.triage(user_input, state["chat_history"])
+        self._cache_triage(state, result)
+        return self._apply_triage(state, result)
+    
+    async def _atriage_node(self, state: AgentState) -> AgentState:
+        """异步版本的 _triage_node"""
+        user_input = state["user_input"]
+        
+        decision = self.supervisor.fast_route(user_input)
+        if decision is None and state["use_cache"]:
+            agent_type = await self._cache_call(self._cached_route, state)
+            if agent_type is not None:
+                return {**state, "current_agent": agent_type}
+        if decision is None:
+            decision = await run_sync(self.supervisor.embedding_route, user_input)
+        if decision is not None:
+            return {**state, "current_agent": decision.agent}
+        
+        state = self._start_prefetch(state)
+        result = await self.triage_agent.atriage(user_input, state["chat_history"])
+        await self._cache_call(self._cache_triage, state, result)
+        return self._apply_triage(state, result)
+    
+    def _cached_route(self, state: AgentState) -> AgentType | None:
+        """查询路由缓存（命中时计数）"""
+        agent_type = self.cache.get(state["user_input"], namespace=ROUTE_CACHE_NAMESPACE)
+        if agent_type is not None:
+            self.supervisor.record_source("cache")
+        return agent_type
+    
+    def _cache_triage(self, state: AgentState, result: TriageResult):
+        """
+        缓存分诊结果：路由写入路由缓存，直接回复写入对应 Agent 的回复缓存，
+        重复的问题之后走“路由缓存 -> Agent 回复缓存”，不再调用 LLM
+        """
+        if not state["use_cache"]:
+            return
+        self.cache.get_or_set(
+            state["user_input"],
+            result.agent,
+            ttl=settings.cache_route_ttl,
+            namespace=ROUTE_CACHE_NAMESPACE,
+        )
+        if result.answer and result.agent not in UNCACHEABLE_AGENTS:
+            self.cache.get_or_set(
+                state["user_input"],
+                result.answer,
+                ttl=settings.cache_answer_ttl,
+                namespace=self._answer_namespace(result.agent, state),
+            )
+    
+    def _apply_triage(self, state: AgentState, result: TriageResult) -> AgentState:
+        """分诊已直接回答时丢弃预取并结束，否则交给选出的 Agent"""
+        self.supervisor.record_source("single_call")
+        if result.answer is None:
+            return {**state, "current_agent": result.agent}
+        self._drop_prefetch(state)
+        return {**state, "current_agent": result.agent, "agent_response": result.answer}
+    
+    def _route_to_agent(self, state: AgentState) -> str:
+        """路由函数：返回下一个要执行的 Agent（分诊已直接回答时结束）"""
+        if state["agent_response"]:
+            return ANSWERED
         return state["current_agent"]
     
+    def _run_agent(
+        self,
+        state: AgentState,
+        agent_name: AgentType,
+        chat_fn: Callable[..., str],
+    ) -> AgentState:
+        """
+        执行 Agent，命中回复缓存时跳过 LLM 调用
+        
+        实际调用 LLM 前先进入该 Agent 的舱壁（各 Agent 并发互相隔离），再经过自适应并发限制；
+        舱壁等待超时或超出并发上限时不再排队，直接返回降级回复
+        """
+        cacheable = state["use_cache"] and agent_name not in UNCACHEABLE_AGENTS
+        namespace = self._answer_namespace(agent_name, state) if cacheable else ""
+        
+        if cacheable:
+            cached = self.cache.get(state["user_input"], namespace=namespace)
+            if cached is not None:
+                self._drop_prefetch(state)
+                return {**state, "agent_response": cached, "cached": True}
+        
+        try:
+            with get_bulkhead(agent_name).acquire_sync():
+                documents = self._prefetched_documents(state, agent_name)
+                response = self._call_agent(state, chat_fn, documents)
+        except BulkheadFullError:
+            self._drop_prefetch(state)
+            response = None
+        if response is None:
+            return {**state, "agent_response": LLM_FALLBACK_MESSAGE, "shed": True}
+        
+        if cacheable and response:
+            self.cache.get_or_set(
+                state["user_input"],
+                response,
+                ttl=settings.cache_answer_ttl,
+                namespace=namespace,
+            )
+        return {**state, "agent_response": response}
+    
+    def _call_agent(
+        self,
+        state: AgentState,
+        chat_fn: Callable[..., str],
+        documents: list | None = None,
+    ) -> str | None:
+        """在自适应并发限制内调用 Agent（documents 为预取的检索结果），超出上限返回 None"""
+        token = self.limiter.try_acquire() if self.limiter is not None else None
+        if self.limiter is not None and token is None:
+            return None
+        
+        extra = {"documents": documents} if documents is not None else {}
+        dropped = True
+        try:
+            response = chat_fn(
+                user_input=state["user_input"],
+                chat_history=state["chat_history"],
+                **extra,
+            )
+            dropped = False
+        finally:
+            # 调用失败按 dropped 归还名额
+            if token is not None:
+                self.limiter.release(token, dropped=dropped)
+        return response
+    
+    async def _arun_agent(
+        self,
+        state: AgentState,
+        agent_name: AgentType,
+        achat_fn: Callable[..., Awaitable[str]],
+    ) -> AgentState:
+        """异步版本的 _run_agent（舱壁异步等待，不占用线程）"""
+        cacheable = state["use_cache"] and agent_name not in UNCACHEABLE_AGENTS
+        namespace = self._answer_namespace(agent_name, state) if cacheable else ""
+        
+        if cacheable:
+            cached = await self._cache_call(self.cache.get, state["user_input"], namespace=namespace)
+            if cached is not None:
+                self._drop_prefetch(state)
+                return {**state, "agent_response": cached, "cached": True}
+        
+        try:
+            async with get_bulkhead(agent_name).acquire():
+                documents = await self._aretrieve(state, agent_name)
+                response = await self._acall_agent(state, achat_fn, documents)
+        except BulkheadFullError:
+            self._drop_prefetch(state)
+            response = None
+        if response is None:
+            return {**state, "agent_response": LLM_FALLBACK_MESSAGE, "shed": True}
+        
+        if cacheable and response:
+            await self._cache_call(
+                self.cache.get_or_set,
+                state["user_input"],
+                response,
+                ttl=settings.cache_answer_ttl,
+                namespace=namespace,
+            )
+        return {**state, "agent_response": response}
+    
+    async def _aretrieve(self, state: AgentState, agent_name: AgentType) -> list | None:
+        """
+        RAG Agent 的检索结果：优先使用预取，没有预取时现场检索
+        
+        拿到文档后派发 RETRIEVAL_EVENT，流式执行时客户端在 Agent 开始生成前就能看到引用来源
+        """
+        documents = await self._aprefetched_documents(state, agent_name)
+        if documents is None and agent_name in RAG_AGENTS and self.retriever is not None:
+            documents = await run_sync(self.retriever.search, state["user_input"], k=PREFETCH_K)
+        if documents is not None:
+            await adispatch_custom_event(RETRIEVAL_EVENT, document_sources(documents))
+        return documents
+    
+    async def _acall_agent(
+        self,
+        state: AgentState,
+        achat_fn: Callable[..., Awaitable[str]],
+        documents: list | None = None,
+    ) -> str | None:
+        """异步版本的 _call_agent"""
+        token = self.limiter.try_acquire() if self.limiter is not None else None
+        if self.limiter is not None and token is None:
+            return None
+        
+        extra = {"documents": documents} if documents is not None else {}
+        dropped = True
+        try:
+            response = await achat_fn(
+                user_input=state["user_input"],
+                chat_history=state["chat_history"],
+                **extra,
+            )
+            dropped = False
+        finally:
+            # 异常与取消（CancelledError 不是 Exception）都要归还名额，否则被取消的请求永久占用名额
+            if token is not None:
+                self.limiter.release(token, dropped=dropped)
+        return response
+    
     def _product_agent_node(self, state: AgentState) -> AgentState:
         """ProductAgent 节点"""
-        response = self.product_agent.chat(
-            user_input=state["user_input"],
-            chat_history=state["chat_history"],
-        )
-        return {**state, "agent_response": response}
+        return self._run_agent(state, "ProductAgent", self.product_agent.chat)
     
     def _order_agent_node(self, state: AgentState) -> AgentState:
         """OrderAgent 节点"""
-        response = self.order_agent.chat(
-            user_input=state["user_input"],
-            chat_history=state["chat_history"],
-        )
-        return {**state, "agent_response": response}
+        return self._run_agent(state, "OrderAgent", self.order_agent.chat)
     
     def _aftersales_agent_node(self, state: AgentState) -> AgentState:
         """AfterSalesAgent 节点"""
-        response = self.aftersales_agent.chat(
-            user_input=state["user_input"],
-            chat_history=state["chat_history"],
-        )
-        return {**state, "agent_response": response}
+        return self._run_agent(state, "AfterSalesAgent", self.aftersales_agent.chat)
     
     def _chitchat_agent_node(self, state: AgentState) -> AgentState:
         """ChitchatAgent 节点"""
-        response = self.chitchat_agent.chat(
-            user_input=state["user_input"],
-            chat_history=state["chat_history"],
-        )
-        return {**state, "agent_response": response}
+        return self._run_agent(state, "ChitchatAgent", self.chitchat_agent.chat)
+    
+    async def _aproduct_agent_node(self, state: AgentState) -> AgentState:
+        """ProductAgent 异步节点"""
+        return await self._arun_agent(state, "ProductAgent", self.product_agent.achat)
+    
+    async def _aorder_agent_node(self, state: AgentState) -> AgentState:
+        """OrderAgent 异步节点"""
+        return await self._arun_agent(state, "OrderAgent", self.order_agent.achat)
+    
+    async def _aaftersales_agent_node(self, state: AgentState) -> AgentState:
+        """AfterSalesAgent 异步节点"""
+        return await self._arun_agent(state, "AfterSalesAgent", self.aftersales_agent.achat)
+    
+    async def _achitchat_agent_node(self, state: AgentState) -> AgentState:
+        """ChitchatAgent 异步节点"""
+        return await self._arun_agent(state, "ChitchatAgent", self.chitchat_agent.achat)
     
-    def invoke(self, user_input: str, chat_history: list[dict] | None = None) -> dict:
+    def invoke(
+        self,
+        user_input: str,
+        chat_history: list[dict] | None = None,
+        use_cache: bool = True,
+        config: RunnableConfig | None = None,
+    ) -> dict:
         """
         执行工作流
         
         Args:
             user_input: 用户输入
             chat_history: 对话历史
+            use_cache: 是否使用路由/回复缓存
+            config: LangChain 运行配置（回调、标签等，传递给所有节点内的 LLM 调用）
             
         Returns:
-            包含回复和使用的 Agent 的字典
+            包含回复、使用的 Agent、是否命中缓存以及是否被降级的字典
         """
-        if chat_history is None:
-            chat_history = []
+        # 执行工作流
+        result = self.graph.invoke(self._initial_state(user_input, chat_history, use_cache), config=config)
+        return self._format_result(result)
+    
+    async def ainvoke(
+        self,
+        user_input: str,
+        chat_history: list[dict] | None = None,
+        use_cache: bool = True,
+        config: RunnableConfig | None = None,
+    ) -> dict:
+        """
+        异步执行工作流（LLM 调用全程异步，同步依赖在有界线程池中执行）
+        
+        参数与返回值同 invoke
+        """
+        result = await self.graph.ainvoke(self._initial_state(user_input, chat_history, use_cache), config=config)
+        return self._format_result(result)
+    
+    async def astream(
+        self,
+        user_input: str,
+        chat_history: list[dict] | None = None,
+        use_cache: bool = True,
+        config: RunnableConfig | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        流式执行工作流（基于 LangGraph astream_events），事件按产生顺序输出：
+        - {"type": "route", "agent": ...}：Supervisor 选定的 Agent
+        - {"type": "sources", "sources": [...]}：RAG Agent 使用的检索来源
+        - {"type": "chunk", "content": ...}：Agent 生成的回复 token
+        - {"type": "result", ...}：结束，其余字段同 invoke 的返回值
+        
+        路由 / 分诊调用本身的输出不作为 chunk；缓存命中、分诊直接回答、降级回复
+        没有逐 token 生成，在结束前整段作为一个 chunk 输出（缓存命中的 chunk 带 cached=True，
+        调用方可以自行分块回放）
         
-        # 初始状态
-        initial_state: AgentState = {
+        参数同 invoke
+        """
+        routed = streamed = False
+        async for event in self.graph.astream_events(
+            self._initial_state(user_input, chat_history, use_cache),
+            config=config,
+            version="v2",
+        ):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+            
+            if kind == "on_chat_model_stream" and node != "supervisor":
+                content = event["data"]["chunk"].content
+                if content:
+                    streamed = True
+                    yield {"type": "chunk", "content": content}
+            elif kind == "on_custom_event" and event["name"] == RETRIEVAL_EVENT:
+                yield {"type": "sources", "sources": event["data"]}
+            elif kind == "on_chain_end" and event["name"] == "supervisor" and not routed:
+                routed = True
+                yield {"type": "route", "agent": event["data"]["output"]["current_agent"]}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                result = self._format_result(event["data"]["output"])
+                if not streamed and result["message"]:
+                    chunk = {"type": "chunk", "content": result["message"]}
+                    if result["cached"]:
+                        chunk["cached"] = True
+                    yield chunk
+                yield {"type": "result", **result}
+    
+    @staticmethod
+    def _initial_state(user_input: str, chat_history: list[dict] | None, use_cache: bool) -> AgentState:
+        """初始状态"""
+        return {
             "user_input": user_input,
-            "chat_history": chat_history,
+            "chat_history": chat_history or [],
             "current_agent": "ChitchatAgent",
             "agent_response": "",
             "should_continue": True,
+            "use_cache": use_cache,
+            "cached": False,
+            "shed": False,
+            "prefetch": None,
         }
-        
-        # 执行工作流
-        result = self.graph.invoke(initial_state)
-        
+    
+    @staticmethod
+    def _format_result(result: AgentState) -> dict:
         return {
             "message": result["agent_response"],
             "agent_used": result["current_agent"],
+            "cached": result["cached"],
+            "shed": result["shed"],
         }
@@ -0,0 +1,262 @@
+"""
+快速路由模块
+
+SupervisorAgent 前面的规则路由层：订单号、“退货”“物流”“你好”这类意图明显的输入
+用预编译的关键词 / 正则匹配在微秒级给出 Agent 和置信度，只有不够确定时才调用 LLM。
+
+1. 所有关键词编译成一个正则（按长度降序的多模式匹配），一次扫描找出全部命中
+2. 每条规则带权重（单独命中时的置信度），同一 Agent 的多个命中按 noisy-OR 合并：
+   score = 1 - Π(1 - w)
+3. 置信度 = 最高分 × (1 - 次高分)：多个 Agent 同时命中（如“订单”和“退货”）时置信度下降
+
+规则没有把握时，EmbeddingRouter 用一次 query embedding 对标注样例做分类
+（各 Agent 的质心，或 kNN），置信度为前两名的相似度差（margin），
+margin 足够大时同样不调用 LLM。query 向量来自共享的 Embeddings，
+语义缓存与检索器随后复用同一个向量，不会重复计算。
+
+使用方式：
+```python
+from src.graphs.routing import EmbeddingRouter, FastRouter
+
+router = FastRouter()
+decision = router.route("订单 ORD20240001 物流到哪了？")
+decision.agent, decision.confidence  # ("OrderAgent", 0.99...)
+
+embedding_router = EmbeddingRouter.from_file("data/routing_exemplars.json")
+decision = embedding_router.route("包裹好几天没动了")
+decision.agent, decision.confidence  # ("OrderAgent", 0.12)，confidence 为 top-2 margin
+```
+"""
+
+import json
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# 关键词规则：Agent -> {关键词: 权重}（关键词按小写匹配）
+DEFAULT_KEYWORDS: dict[str, dict[str, float]] = {
+    "OrderAgent": {
+        "订单": 0.85, "物流": 0.9, "快递": 0.9, "发货": 0.85, "运单": 0.9,
+        "签收": 0.85, "到哪了": 0.7, "配送": 0.8,
+    },
+    "AfterSalesAgent": {
+        "退货": 0.95, "换货": 0.95, "退款": 0.9, "售后": 0.9, "维修": 0.9,
+        "保修": 0.85, "投诉": 0.95, "质量问题": 0.9, "坏了": 0.8, "能修": 0.85,
+        "七天无理由": 0.9,
+    },
+    "ProductAgent": {
+        "多少钱": 0.9, "价格": 0.85, "推荐": 0.8, "优惠": 0.85, "促销": 0.85,
+        "折扣": 0.85, "配置": 0.8, "参数": 0.8, "颜色": 0.8, "有货": 0.85,
+        "库存": 0.85, "分期": 0.8, "型号": 0.75, "活动": 0.5,
+        "iphone": 0.6, "ipad": 0.6, "macbook": 0.6, "华为": 0.6, "小米": 0.6,
+    },
+    "ChitchatAgent": {
+        "谢谢": 0.7, "天气": 0.7, "再见": 0.8, "拜拜": 0.8,
+    },
+}
+
+# 正则规则：(Agent, 模式, 权重)
+DEFAULT_PATTERNS: list[tuple[str, str, float]] = [
+    ("OrderAgent", r"ord\d{8}", 0.99),
+    # 整句只有问候语
+    ("ChitchatAgent", r"^(你好|您好|hi|hello|在吗|在不在|早上好|晚上好|谢谢|谢谢你|再见)[!！。.~～?？\s]*$", 0.95),
+]
+
+
+@dataclass
+class RouteDecision:
+    """一次路由结果"""
+    agent: str | None  # 没有任何命中时为 None
+    confidence: float
+    source: str = "rule"  # rule / embedding / llm / ...
+    matches: list[str] = field(default_factory=list)
+
+
+class FastRouter:
+    """关键词 / 正则快速路由器（无状态，线程安全）"""
+
+    def __init__(
+        self,
+        keywords: dict[str, dict[str, float]] | None = None,
+        patterns: list[tuple[str, str, float]] | None = None,
+    ):
+        """
+        Args:
+            keywords: Agent -> {关键词: 权重}，为 None 使用默认规则
+            patterns: (Agent, 正则, 权重) 列表，为 None 使用默认规则
+        """
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        patterns = DEFAULT_PATTERNS if patterns is None else patterns
+
+        self._keywords: dict[str, tuple[str, float]] = {}
+        for agent, words in keywords.items():
+            for word, weight in words.items():
+                self._keywords[word.lower()] = (agent, weight)
+        # 长关键词优先，保证“质量问题”不会被更短的前缀吃掉
+        alternation = "|".join(
+            re.escape(word) for word in sorted(self._keywords, key=len, reverse=True)
+        )
+        self._keyword_re = re.compile(alternation) if alternation else None
+        self._patterns = [(agent, re.compile(pattern), weight) for agent, pattern, weight in patterns]
+
+    def scores(self, text: str) -> tuple[dict[str, float], list[str]]:
+        """各 Agent 的命中分数（noisy-OR 合并）与命中的规则"""
+        text = text.strip().lower()
+        misses: dict[str, float] = {}
+        matches: list[str] = []
+
+        def hit(agent: str, weight: float, label: str):
+            misses[agent] = misses.get(agent, 1.0) * (1.0 - weight)
+            matches.append(label)
+
+        if self._keyword_re is not None:
+            for word in set(self._keyword_re.findall(text)):
+                agent, weight = self._keywords[word]
+                hit(agent, weight, word)
+        for agent, pattern, weight in self._patterns:
+            if pattern.search(text):
+                hit(agent, weight, pattern.pattern)
+
+        return {agent: 1.0 - miss for agent, miss in misses.items()}, matches
+
+    def route(self, text: str) -> RouteDecision:
+        """给出最可能的 Agent 与置信度"""
+        scores, matches = self.scores(text)
+        if not scores:
+            return RouteDecision(agent=None, confidence=0.0, matches=matches)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        agent, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        return RouteDecision(agent=agent, confidence=top * (1.0 - second), matches=matches)
+
+
+def load_exemplars(path: str | Path) -> dict[str, list[str]]:
+    """
+    读取标注样例：Agent -> [query, ...]
+
+    支持评测集格式（{"test_cases": [{"query": ..., "expected_agent": ...}]}）
+    与直接的 {Agent: [query, ...]} 映射。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "test_cases" not in data:
+        return {agent: list(queries) for agent, queries in data.items()}
+    exemplars: dict[str, list[str]] = defaultdict(list)
+    for case in data["test_cases"]:
+        exemplars[case["expected_agent"]].append(case["query"])
+    return dict(exemplars)
+
+
+class EmbeddingRouter:
+    """
+    Embedding 分类路由器（线程安全）
+
+    样例向量在首次使用时批量计算一次（embed_documents），之后每次路由只需一次
+    embed_query 和一次矩阵-向量乘法。
+    - centroid：与各 Agent 样例质心的余弦相似度
+    - knn：与各 Agent 最近 k 个样例相似度的均值
+    """
+
+    def __init__(
+        self,
+        exemplars: dict[str, list[str]],
+        embeddings: Embeddings | None = None,
+        method: Literal["centroid", "knn"] = "knn",
+        k: int = 3,
+    ):
+        """
+        Args:
+            exemplars: Agent -> 标注样例
+            embeddings: Embeddings 实例，为 None 使用共享实例（与语义缓存、检索器复用 query 向量）
+            method: 分类方式，"centroid" 或 "knn"
+            k: knn 时每个 Agent 取的近邻数
+        """
+        self.exemplars = {agent: list(queries) for agent, queries in exemplars.items() if queries}
+        self._embeddings = embeddings
+        self.method = method
+        self.k = max(1, k)
+
+        self._agents: list[str] = []
+        self._matrix: np.ndarray | None = None  # 归一化的样例（或质心）向量，每行一个
+        self._labels: np.ndarray | None = None  # 每行对应的 Agent 下标
+        self._texts: list[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kwargs) -> "EmbeddingRouter":
+        """从标注样例文件创建"""
+        return cls(load_exemplars(path), **kwargs)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            from src.rag.embeddings import get_shared_embeddings
+            self._embeddings = get_shared_embeddings()
+        return self._embeddings
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def _fit(self):
+        """计算样例向量（懒加载，只执行一次）"""
+        if self._matrix is not None:
+            return
+        with self._lock:
+            if self._matrix is not None:
+                return
+            agents = sorted(self.exemplars)
+            texts = [query for agent in agents for query in self.exemplars[agent]]
+            labels = np.array(
+                [i for i, agent in enumerate(agents) for _ in self.exemplars[agent]], dtype=np.int64
+            )
+            vectors = self._normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+
+            if self.method == "centroid":
+                centroids = np.stack([vectors[labels == i].mean(axis=0) for i in range(len(agents))])
+                vectors = self._normalize(centroids)
+                labels = np.arange(len(agents))
+                texts = agents
+
+            self._agents, self._texts, self._labels = agents, texts, labels
+            self._matrix = vectors
+
+    def scores(self, vector: list[float]) -> dict[str, float]:
+        """各 Agent 的相似度分数"""
+        self._fit()
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        similarities = self._matrix @ query
+        result: dict[str, float] = {}
+        for i, agent in enumerate(self._agents):
+            agent_sims = similarities[self._labels == i]
+            if self.method == "knn" and len(agent_sims) > self.k:
+                agent_sims = np.partition(agent_sims, -self.k)[-self.k:]
+            result[agent] = float(agent_sims.mean())
+        return result
+
+    def classify(self, vector: list[float]) -> RouteDecision:
+        """对已计算好的 query 向量分类，置信度为前两名的分数差"""
+        if not self.exemplars:
+            return RouteDecision(agent=None, confidence=0.0, source="embedding")
+        scores = self.scores(vector)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        agent, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        return RouteDecision(
+            agent=agent,
+            confidence=top - second,
+            source="embedding",
+            matches=[f"{name}={score:.3f}" for name, score in ranked],
+        )
+
+    def route(self, text: str) -> RouteDecision:
+        """计算 query 向量并分类"""
+        return self.classify(self.embeddings.embed_query(text))
@@ -1,11 +1,13 @@
 """RAG 模块"""
 
 from .document_loader import load_knowledge_base
-from .embeddings import get_embeddings
+from .embeddings import CachedEmbeddings, get_embeddings, get_shared_embeddings
 from .retriever import KnowledgeRetriever
 
 __all__ = [
     "load_knowledge_base",
     "get_embeddings",
+    "get_shared_embeddings",
+    "CachedEmbeddings",
     "KnowledgeRetriever",
 ]
@@ -1,5 +1,8 @@
 """Embeddings 模块 - 支持多种 Embedding 模型"""
 
+import threading
+from collections import OrderedDict
+
 from langchain_core.embeddings import Embeddings
 
 from src.config import settings
@@ -19,9 +22,122 @@ def get_embeddings() -> Embeddings:
             base_url=settings.openai_base_url,
             model="text-embedding-3-small",
         )
+    elif settings.llm_provider == "mock":
+        # 本地模拟：按文本哈希生成确定性向量，不发起网络请求
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=256)
     else:  # dashscope
         from langchain_community.embeddings import DashScopeEmbeddings
         return DashScopeEmbeddings(
             model="text-embedding-v3",
             dashscope_api_key=settings.dashscope_api_key,
         )
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    带 query 向量缓存的 Embeddings 包装（线程安全）
+
+    路由器、语义缓存、检索器共用同一个实例时，同一条用户输入在一次请求内
+    只调用一次 embedding 接口；并发计算同一条 query（如路由与投机检索同时进行）时
+    后到的线程等待先到的结果。文档向量（embed_documents）不缓存。
+    """
+
+    def __init__(self, embeddings: Embeddings, max_size: int = 1024):
+        """
+        Args:
+            embeddings: 实际的 Embeddings 实例
+            max_size: 最多缓存的 query 向量数（LRU 淘汰）
+        """
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._pending: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def _lookup(self, text: str) -> list[float] | None:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is None:
+                self._stats["misses"] += 1
+            else:
+                self._cache.move_to_end(text)
+                self._stats["hits"] += 1
+            return vector
+
+    def _remember(self, text: str, vector: list[float]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self._stats["hits"] += 1
+                return vector
+            pending = self._pending.get(text)
+            if pending is None:
+                pending = self._pending[text] = threading.Event()
+                self._stats["misses"] += 1
+                owner = True
+            else:
+                self._stats["coalesced"] += 1
+                owner = False
+
+        if not owner:
+            pending.wait()
+            with self._lock:
+                vector = self._cache.get(text)
+            # 先到的线程计算失败（或缓存已关闭）时自行计算
+            return vector if vector is not None else self.embeddings.embed_query(text)
+
+        try:
+            vector = self.embeddings.embed_query(text)
+            self._remember(text, vector)
+            return vector
+        finally:
+            with self._lock:
+                self._pending.pop(text, None)
+            pending.set()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        vector = self._lookup(text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._remember(text, vector)
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._cache), "max_size": self.max_size, **self._stats}
+
+
+# ===== 全局实例 =====
+
+_shared_embeddings: CachedEmbeddings | None = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_embeddings() -> CachedEmbeddings:
+    """获取进程内共享的 Embeddings（路由、语义缓存、检索复用同一个 query 向量）"""
+    global _shared_embeddings
+    if _shared_embeddings is None:
+        with _shared_lock:
+            if _shared_embeddings is None:
+                _shared_embeddings = CachedEmbeddings(
+                    get_embeddings(), max_size=settings.embedding_query_cache_size
+                )
+    return _shared_embeddings
@@ -1,13 +1,17 @@
 """向量检索器 - 使用 Chroma 进行向量检索"""
 
+import hashlib
+import threading
 from pathlib import Path
 
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
+from src.config import settings
+
 from .document_loader import load_knowledge_base
-from .embeddings import get_embeddings
+from .embeddings import get_shared_embeddings
 
 
 class KnowledgeRetriever:
@@ -27,18 +31,27 @@ class KnowledgeRetriever:
         """
         self.persist_directory = Path(persist_directory)
         self.collection_name = collection_name
-        self.embeddings = get_embeddings()
+        self.embeddings = get_shared_embeddings()
         self._vectorstore: Chroma | None = None
+        self._vectorstore_lock = threading.Lock()
+        self._version = settings.knowledge_base_version
+    
+    @property
+    def version(self) -> str:
+        """知识库版本（用于回复缓存失效）"""
+        return self._version
     
     @property
     def vectorstore(self) -> Chroma:
-        """获取向量存储实例"""
+        """获取向量存储实例（懒加载；并发首次访问时只创建一个客户端）"""
         if self._vectorstore is None:
-            self._vectorstore = Chroma(
-                collection_name=self.collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=str(self.persist_directory),
-            )
+            with self._vectorstore_lock:
+                if self._vectorstore is None:
+                    self._vectorstore = Chroma(
+                        collection_name=self.collection_name,
+                        embedding_function=self.embeddings,
+                        persist_directory=str(self.persist_directory),
+                    )
         return self._vectorstore
     
     def build_index(
@@ -76,6 +89,12 @@ class KnowledgeRetriever:
             persist_directory=str(self.persist_directory),
         )
         
+        # 重建索引后按内容更新版本，使旧的缓存回复失效
+        digest = hashlib.sha256()
+        for doc in documents:
+            digest.update(doc.page_content.encode())
+        self._version = f"{settings.knowledge_base_version}-{digest.hexdigest()[:8]}"
+        
         print(f"✅ 成功构建索引，共 {len(documents)} 个文档块")
         
         return len(documents)
@@ -0,0 +1,19 @@
+"""测试公共 fixture"""
+
+import pytest
+
+
+@pytest.fixture
+def llm_settings(monkeypatch):
+    """
+    固定 LLM 相关配置，测试结果不依赖本地 .env：
+    主提供商 dashscope、未配置任何 API Key、加权路由、关闭对冲
+    """
+    from src.config import settings
+    
+    monkeypatch.setattr(settings, "llm_provider", "dashscope")
+    monkeypatch.setattr(settings, "dashscope_api_key", "")
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    monkeypatch.setattr(settings, "llm_routing_mode", "weighted")
+    monkeypatch.setattr(settings, "llm_hedge_enabled", False)
+    return settings
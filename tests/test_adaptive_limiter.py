@@ -0,0 +1,41 @@
+"""自适应并发限制测试"""
+
+import pytest
+
+
+# ===== 自适应并发限制测试 =====
+
+class TestAdaptiveLimiter:
+    """自适应并发限制测试"""
+    
+    @staticmethod
+    def _round(limiter, rtt):
+        """占满当前上限，再按给定延迟全部完成"""
+        tokens = []
+        while (token := limiter.try_acquire()) is not None:
+            tokens.append(token)
+        for token in tokens:
+            limiter.release(token - rtt)
+        return len(tokens)
+    
+    @pytest.mark.parametrize("algorithm", ["gradient", "aimd"])
+    def test_limit_follows_latency(self, algorithm):
+        """延迟接近最小延迟时上限增长，延迟明显升高时收缩，失败时同样收缩"""
+        from src.core.adaptive_limiter import AdaptiveConcurrencyLimiter
+        
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, max_limit=100, algorithm=algorithm)
+        assert self._round(limiter, 0.1) == 10
+        grown = limiter.limit
+        assert grown > 10
+        assert limiter.get_stats()["shed"] == 1
+        
+        for _ in range(5):
+            self._round(limiter, 1.0)  # 10 倍于最小延迟：提供商开始排队
+        assert limiter.limit < grown / 2
+        assert limiter.get_stats()["min_rtt_ms"] == pytest.approx(100, abs=5)
+        
+        before = limiter.limit
+        token = limiter.try_acquire()
+        limiter.release(token, dropped=True)
+        assert limiter.limit <= before
+        assert limiter.limit >= 2
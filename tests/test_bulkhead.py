@@ -0,0 +1,64 @@
+"""舱壁隔离测试"""
+
+import asyncio
+
+
+# ===== 舱壁测试 =====
+
+class TestBulkhead:
+    """舱壁隔离测试"""
+    
+    def test_bulkhead_rejections_and_async_fallback(self):
+        """舱壁已满时拒绝单独计数（不计为失败），异步调用可以使用协程降级函数"""
+        from src.core.bulkhead import Bulkhead
+        from src.core.circuit_breaker import CircuitBreaker, CircuitState
+        
+        async def fallback(query):
+            await asyncio.sleep(0)
+            return f"fallback: {query}"
+        
+        breaker = CircuitBreaker(
+            failure_threshold=1,
+            fallback=fallback,
+            bulkhead=Bulkhead("rag", max_concurrent=1, max_wait=0.01),
+        )
+        
+        async def slow_search(query):
+            await asyncio.sleep(0.05)
+            return f"result: {query}"
+        
+        async def run():
+            return await asyncio.gather(
+                breaker.call_async(slow_search, "a"),
+                breaker.call_async(slow_search, "b"),
+            )
+        
+        assert asyncio.run(run()) == ["result: a", "fallback: b"]
+        stats = breaker.get_stats()
+        assert stats["bulkhead_rejected"] == 1
+        assert stats["failures"] == 0
+        assert stats["bulkhead"]["active"] == 0
+        assert breaker.state == CircuitState.CLOSED
+        
+        async def broken(query):
+            raise RuntimeError("down")
+        
+        assert asyncio.run(breaker.call_async(broken, "c")) == "fallback: c"
+        assert asyncio.run(breaker.call_async(slow_search, "d")) == "fallback: d"
+        assert breaker.get_stats()["rejected"] == 1
+    
+    def test_agent_limits_follow_provider_concurrency(self, monkeypatch):
+        """Agent 舱壁容量按主提供商的并发上限 × 份额计算，提供商不限并发时舱壁也不限"""
+        from src.config import settings
+        from src.core.bulkhead import bulkhead_limit
+        
+        monkeypatch.setattr(settings, "llm_provider", "dashscope")
+        monkeypatch.setattr(settings, "bulkhead_limits", {"OrderAgent": 5})
+        monkeypatch.setattr(settings, "dashscope_max_concurrency", 0)
+        assert bulkhead_limit("ProductAgent") == 0
+        
+        monkeypatch.setattr(settings, "dashscope_max_concurrency", 100)
+        assert bulkhead_limit("ProductAgent") == 40
+        assert bulkhead_limit("ChitchatAgent") == 20
+        assert bulkhead_limit("OrderAgent") == 5
+        assert bulkhead_limit("rag") == settings.bulkhead_default_limit
@@ -0,0 +1,100 @@
+"""缓存淘汰 / 准入策略测试"""
+
+
+# ===== 淘汰 / 准入策略测试 =====
+
+class TestCachePolicy:
+    """缓存淘汰 / 准入策略测试"""
+    
+    def test_lru_evicts_least_recently_used(self):
+        """缓存满时只淘汰最近最少使用的一条"""
+        from src.core.response_cache import ResponseCache
+        
+        cache = ResponseCache(max_size=3)
+        for q in ("q1", "q2", "q3"):
+            cache.set(q, q.upper())
+        cache.get("q1")
+        cache.set("q4", "Q4")
+        
+        assert cache.get("q2") is None
+        assert cache.get("q1") == "Q1"
+        assert cache.get("q3") == "Q3"
+        stats = cache.get_stats()
+        assert stats["size"] == 3
+        assert stats["evictions"] == 1
+    
+    def test_lfu_evicts_least_frequently_used(self):
+        """LFU 策略淘汰访问频次最低的条目"""
+        from src.core.response_cache import ResponseCache
+        
+        cache = ResponseCache(max_size=2, eviction_policy="lfu")
+        cache.set("hot", "H")
+        cache.set("cold", "C")
+        cache.get("hot")
+        cache.get("hot")
+        cache.get("cold")
+        cache.set("new", "N")
+        
+        assert cache.get("hot") == "H"
+        assert cache.get("cold") is None
+    
+    def test_tinylfu_rejects_one_hit_wonders(self):
+        """TinyLFU 拒绝频次低于淘汰候选的新条目"""
+        from src.core.response_cache import ResponseCache
+        
+        cache = ResponseCache(max_size=1, admission_policy="tinylfu")
+        cache.set("hot", "H")
+        for _ in range(3):
+            cache.get("hot")
+        cache.set("once", "O")
+        
+        assert cache.get("hot") == "H"
+        assert cache.get_stats()["admission_rejections"] == 1
+    
+    def test_lfu_finds_next_min_frequency_after_removal(self):
+        """删除最小频次桶的最后一个 key 后，淘汰候选落到下一个最小频次"""
+        from src.core.cache_policy import LFUPolicy
+        
+        policy = LFUPolicy()
+        for key, accesses in (("a", 0), ("b", 2), ("c", 5)):
+            policy.record_insert(key)
+            for _ in range(accesses):
+                policy.record_access(key)
+        
+        assert policy.victim() == "a"
+        policy.remove("a")
+        assert policy.victim() == "b"
+        policy.remove("b")
+        assert policy.victim() == "c"
+        policy.remove("c")
+        assert policy.victim() is None
+    
+    def test_wtinylfu_keeps_hot_keys_and_admits_new_popular_key(self):
+        """一次性查询冲刷不了热点，刚变热的 key 仍能进入缓存"""
+        from src.core.response_cache import ResponseCache
+        
+        cache = ResponseCache(max_size=50, admission_policy="tinylfu")
+        
+        def request(query: str):
+            # 与线上一致：先查缓存，未命中再回填
+            if cache.get(query) is None:
+                cache.set(query, query.upper())
+        
+        hot = [f"hot-{i}" for i in range(49)]
+        for query in hot:
+            for _ in range(5):
+                request(query)
+        
+        for i in range(50):
+            request(f"once-{i}")
+        assert all(cache.get(query) is not None for query in hot)
+        assert cache.get_stats()["admission_rejections"] > 0
+        
+        # 新 key 第一次回填就进入准入窗口，后续请求直接命中
+        request("trending")
+        assert cache.get("trending") == "TRENDING"
+        for _ in range(9):
+            request("trending")
+        for i in range(10):
+            request(f"later-{i}")
+        assert cache.get("trending") == "TRENDING"
@@ -0,0 +1,114 @@
+"""熔断器与重试测试"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+
+# ===== 熔断器滑动窗口测试 =====
+
+class TestSlidingWindowBreaker:
+    """滑动窗口熔断器测试"""
+    
+    def test_sliding_window_failure_and_slow_call_rates(self):
+        """按滑动窗口内的失败率 / 慢调用率熔断，半开试探成功后恢复，状态历史有上限"""
+        from src.core.circuit_breaker import CircuitBreaker, CircuitState
+        
+        breaker = CircuitBreaker(failure_threshold=4, window_size=4, failure_rate_threshold=0.5, recovery_timeout=0.05)
+        # 失败与成功交替：连续失败从未超过 1 次，但窗口失败率达到 50%
+        for failed in (True, False, True):
+            breaker.record_failure(RuntimeError("429")) if failed else breaker.record_success()
+        assert breaker._state == CircuitState.CLOSED  # 调用数未达到下限
+        breaker.record_success()
+        assert breaker._state == CircuitState.CLOSED  # 失败率 2/4，但成功调用不触发熔断判断
+        breaker.record_failure(RuntimeError("429"))  # 窗口滑出最早的失败，失败率仍为 2/4
+        assert breaker._state == CircuitState.OPEN
+        
+        assert not breaker.allow_request()
+        
+        # 半开：放行有限的试探请求，全部成功后恢复闭合并清空窗口
+        time.sleep(0.06)
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert [breaker.allow_request() for _ in range(4)] == [True, True, True, False]
+        for _ in range(3):
+            breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.get_stats()["window"]["calls"] == 0
+        
+        slow = CircuitBreaker(failure_threshold=2, slow_call_duration=1.0, slow_call_rate_threshold=1.0)
+        slow.record_success(duration=2.0)
+        slow.record_success(duration=3.0)
+        assert slow.state == CircuitState.OPEN
+        assert slow.get_stats()["window"]["slow_call_rate"] == 1.0
+        
+        flapping = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        for _ in range(200):
+            flapping.record_failure(RuntimeError("boom"))
+            flapping.allow_request()
+        assert len(flapping.stats.state_changes) <= 50
+
+
+# ===== 重试测试 =====
+
+class TestRetry:
+    """重试与重试预算测试"""
+    
+    def test_retry_classifies_errors_and_honours_retry_after(self):
+        """只重试临时性错误，Retry-After 优先于退避时间，退避带抖动且有上限"""
+        from src.core.circuit_breaker import with_retry
+        from src.core.retry_budget import RetryBudget, backoff_delay
+        
+        class ProviderError(Exception):
+            def __init__(self, status_code, retry_after=None):
+                super().__init__(f"HTTP {status_code}")
+                self.status_code = status_code
+                self.response = Mock(status_code=status_code, headers={"retry-after": retry_after} if retry_after else {})
+        
+        calls = []
+        
+        @with_retry(max_retries=3, retry_delay=0.001, budget=RetryBudget())
+        def flaky(errors):
+            calls.append(1)
+            if errors:
+                raise errors.pop(0)
+            return "ok"
+        
+        with patch("src.core.circuit_breaker.time.sleep") as sleep:
+            assert flaky([ProviderError(503), ProviderError(429, retry_after="2")]) == "ok"
+        assert len(calls) == 3
+        assert sleep.call_args_list[1].args[0] == 2.0
+        
+        calls.clear()
+        with pytest.raises(ProviderError):
+            flaky([ProviderError(401)])
+        assert len(calls) == 1
+        
+        delays = [backoff_delay(5, 1.0, 10.0, 1.0, "full") for _ in range(100)]
+        assert all(0 <= d <= 10.0 for d in delays) and len(set(delays)) > 1
+        assert 1.0 <= backoff_delay(1, 1.0, 10.0, 2.0, "decorrelated") <= 6.0
+    
+    def test_retry_budget_caps_retries_during_outage(self):
+        """故障期间重试数被限制在请求数的比例之内，超出部分计入 exhausted"""
+        from src.core.circuit_breaker import with_retry
+        from src.core.retry_budget import RetryBudget
+        
+        budget = RetryBudget(ratio=0.1, min_per_second=0, window=10)
+        calls = []
+        
+        @with_retry(max_retries=3, retry_delay=0, budget=budget)
+        async def outage():
+            calls.append(1)
+            raise TimeoutError("timeout")
+        
+        async def run():
+            for _ in range(100):
+                with pytest.raises(TimeoutError):
+                    await outage()
+        
+        asyncio.run(run())
+        stats = budget.get_stats()
+        assert stats["requests"] == 100
+        assert stats["retries"] <= 10
+        assert stats["exhausted"] >= 90
+        assert len(calls) == 100 + stats["retries"]
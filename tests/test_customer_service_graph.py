@@ -0,0 +1,289 @@
+"""客服工作流测试"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+
+# ===== 工作流缓存测试 =====
+
+class TestGraphCache:
+    """工作流路由/回复缓存测试"""
+    
+    @pytest.fixture
+    def graph(self, llm_settings):
+        """使用 Mock Agent 构建工作流（不调用真实 LLM）"""
+        from src.core.response_cache import ResponseCache
+        from src.graphs import customer_service_graph as csg
+        
+        supervisor = Mock()
+        supervisor.fast_route.return_value = None
+        supervisor.embedding_route.return_value = None
+        supervisor.route.side_effect = lambda q, fast_path=True: "OrderAgent" if "订单" in q else "AfterSalesAgent"
+        supervisor.aroute = AsyncMock(side_effect=supervisor.route.side_effect)
+        agents = {
+            name: Mock(**{"chat.side_effect": lambda user_input, chat_history, n=name, **_: f"{n}: {user_input}"})
+            for name in ("ChitchatAgent", "ProductAgent", "OrderAgent", "AfterSalesAgent")
+        }
+        for agent in agents.values():
+            agent.achat = AsyncMock(side_effect=agent.chat.side_effect)
+        
+        with patch.object(csg, "get_llm", return_value=Mock()), \
+             patch.object(csg, "SupervisorAgent", return_value=supervisor), \
+             patch.object(csg, "ChitchatAgent", return_value=agents["ChitchatAgent"]), \
+             patch.object(csg, "ProductAgent", return_value=agents["ProductAgent"]), \
+             patch.object(csg, "OrderAgent", return_value=agents["OrderAgent"]), \
+             patch.object(csg, "AfterSalesAgent", return_value=agents["AfterSalesAgent"]):
+            graph = csg.CustomerServiceGraph(
+                retriever=Mock(version="1", **{"search.return_value": []}), cache=ResponseCache(), mode="standard"
+            )
+        
+        graph._mocks = {"supervisor": supervisor, **agents}
+        return graph
+    
+    def test_repeat_faq_costs_no_llm_calls(self, graph):
+        """重复的无状态 FAQ 问题直接命中路由和回复缓存"""
+        first = graph.invoke("退货政策是什么")
+        second = graph.invoke("退货政策是什么")
+        
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["message"] == first["message"]
+        assert graph._mocks["supervisor"].route.call_count == 1
+        assert graph._mocks["AfterSalesAgent"].chat.call_count == 1
+    
+    def test_answer_cache_keyed_by_history_and_agent(self, graph):
+        """不同对话历史不共享回复；订单类回复不缓存"""
+        graph.invoke("退货政策是什么")
+        graph.invoke("退货政策是什么", chat_history=[{"role": "user", "content": "你好"}])
+        assert graph._mocks["AfterSalesAgent"].chat.call_count == 2
+        
+        graph.invoke("查订单 ORD20240001")
+        result = graph.invoke("查订单 ORD20240001")
+        assert result["cached"] is False
+        assert graph._mocks["OrderAgent"].chat.call_count == 2
+    
+    def test_cache_can_be_disabled(self, graph):
+        """use_cache=False（A/B 实验 disabled 组）时每次都调用 LLM"""
+        graph.invoke("退货政策是什么", use_cache=False)
+        graph.invoke("退货政策是什么", use_cache=False)
+        
+        assert graph._mocks["supervisor"].route.call_count == 2
+        assert graph._mocks["AfterSalesAgent"].chat.call_count == 2
+    
+    def test_ainvoke_overlaps_concurrent_conversations(self, graph):
+        """异步工作流与同步结果一致，LLM 等待期间不占用线程，并发会话的等待时间重叠"""
+        async def slow_chat(user_input, chat_history, **_):
+            await asyncio.sleep(0.2)
+            return f"AfterSalesAgent: {user_input}"
+        
+        graph._mocks["AfterSalesAgent"].achat = AsyncMock(side_effect=slow_chat)
+        
+        async def run():
+            return await asyncio.gather(*(
+                graph.ainvoke(f"退货问题 {i}", use_cache=False) for i in range(10)
+            ))
+        
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        assert time.perf_counter() - start < 1.0
+        assert results[3] == {
+            "message": "AfterSalesAgent: 退货问题 3",
+            "agent_used": "AfterSalesAgent",
+            "cached": False,
+            "shed": False,
+        }
+        assert graph._mocks["supervisor"].aroute.call_count == 10
+        assert graph._mocks["AfterSalesAgent"].chat.call_count == 0
+        
+        # 同步与异步路径共享路由 / 回复缓存
+        first = graph.invoke("退货政策是什么")
+        second = asyncio.run(graph.ainvoke("退货政策是什么"))
+        assert second["cached"] is True
+        assert second["message"] == first["message"]
+    
+    def test_retrieval_is_prefetched_while_routing(self, graph):
+        """LLM 路由期间并行检索，RAG Agent 使用预取结果，其他 Agent 丢弃预取"""
+        def slow_route(q, fast_path=True):
+            time.sleep(0.2)
+            return "OrderAgent" if "订单" in q else "AfterSalesAgent"
+        
+        def slow_search(q, k=3):
+            time.sleep(0.2)
+            return [f"doc:{q}"]
+        
+        graph._mocks["supervisor"].route.side_effect = slow_route
+        graph.retriever.search = Mock(side_effect=slow_search)
+        
+        start = time.perf_counter()
+        graph.invoke("退货政策是什么", use_cache=False)
+        assert time.perf_counter() - start < 0.35
+        assert graph._mocks["AfterSalesAgent"].chat.call_args.kwargs["documents"] == ["doc:退货政策是什么"]
+        
+        graph.invoke("查订单 ORD20240001", use_cache=False)
+        assert "documents" not in graph._mocks["OrderAgent"].chat.call_args.kwargs
+        
+        stats = graph.get_prefetch_stats()
+        assert (stats["started"], stats["used"], stats["dropped"]) == (2, 1, 1)
+    
+    def test_slow_prefetch_times_out_and_retrieves_again(self, graph, llm_settings, monkeypatch):
+        """预取迟迟不返回时按超时放弃，RAG Agent 重新检索，不会一直阻塞"""
+        from langchain_core.documents import Document
+        
+        monkeypatch.setattr(llm_settings, "speculative_retrieval_timeout", 0.05)
+        fresh = [Document(page_content="七天无理由退货", metadata={"filename": "aftersales.md"})]
+        calls = []
+        
+        def search(q, k=3):
+            calls.append(q)
+            if len(calls) % 2 == 1:  # 每次请求的第一次检索是预取
+                time.sleep(0.5)
+                return []
+            return fresh
+        
+        graph.retriever.search = Mock(side_effect=search)
+        
+        start = time.perf_counter()
+        asyncio.run(graph.ainvoke("退货政策是什么", use_cache=False))
+        assert time.perf_counter() - start < 0.4
+        assert graph._mocks["AfterSalesAgent"].achat.call_args.kwargs["documents"] == fresh
+        
+        graph.invoke("退货政策是什么", use_cache=False)
+        assert "documents" not in graph._mocks["AfterSalesAgent"].chat.call_args.kwargs
+        assert graph.get_prefetch_stats()["failed"] == 2
+    
+    def test_astream_emits_route_sources_and_agent_tokens(self, graph):
+        """流式执行：先推送路由与检索来源，再逐 token 推送 Agent 回复（路由调用的输出不推送）"""
+        from langchain_core.documents import Document
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        
+        router_llm = GenericFakeChatModel(messages=iter([AIMessage(content="AfterSalesAgent")]))
+        agent_llm = GenericFakeChatModel(messages=iter([AIMessage(content="签收后 七天内 可退货")]))
+        
+        async def aroute(q, fast_path=True):
+            return (await router_llm.ainvoke(q)).content
+        
+        async def achat(user_input, chat_history, documents=None):
+            return (await agent_llm.ainvoke(user_input)).content
+        
+        graph._mocks["supervisor"].aroute = AsyncMock(side_effect=aroute)
+        graph._mocks["AfterSalesAgent"].achat = AsyncMock(side_effect=achat)
+        graph.retriever.search = Mock(return_value=[
+            Document(page_content="七天无理由退货", metadata={"filename": "aftersales.md", "category": "售后"}),
+        ])
+        
+        async def collect():
+            return [event async for event in graph.astream("退货政策是什么")]
+        
+        events = asyncio.run(collect())
+        assert events[0] == {"type": "route", "agent": "AfterSalesAgent"}
+        assert events[1] == {"type": "sources", "sources": [{"source": "aftersales.md", "category": "售后"}]}
+        chunks = [e["content"] for e in events if e["type"] == "chunk"]
+        assert len(chunks) > 1 and "".join(chunks) == "签收后 七天内 可退货"
+        assert events[-1]["type"] == "result" and events[-1]["cached"] is False
+        
+        # 缓存命中的回复整段作为一个 chunk 推送
+        replayed = asyncio.run(collect())
+        assert [e["type"] for e in replayed] == ["route", "chunk", "result"]
+        assert replayed[1]["content"] == "签收后 七天内 可退货"
+        assert replayed[1]["cached"] is True
+        assert replayed[-1]["cached"] is True
+    
+    def test_single_call_mode_answers_cheap_intents_in_one_call(self, graph):
+        """single_call 模式：分诊调用直接回答闲聊，需要检索的问题才进入专业 Agent"""
+        from src.agents.triage_agent import TriageAgent, TriageResult
+        
+        parsed = TriageAgent.parse('```json\n{"agent": "ChitchatAgent", "answer": "您好！"}\n```')
+        assert (parsed.agent, parsed.answer) == ("ChitchatAgent", "您好！")
+        assert TriageAgent.parse('{"agent": "OrderAgent", "answer": "已发货"}').answer is None
+        # 售后以知识库为准：分诊的直接回答没有检索依据，丢弃后交给 AfterSalesAgent
+        assert TriageAgent.parse('{"agent": "AfterSalesAgent", "answer": "七天无理由"}').answer is None
+        assert TriageAgent.parse("ProductAgent") == TriageResult("ProductAgent", None)
+        
+        graph.mode = "single_call"
+        graph.triage_agent = Mock(**{"triage.side_effect": lambda q, h: (
+            TriageResult("ChitchatAgent", "我来写一首小诗～") if "诗" in q else TriageResult("AfterSalesAgent", None)
+        )})
+        graph.graph = graph._build_graph()
+        
+        first = graph.invoke("帮我写首诗")
+        second = graph.invoke("帮我写首诗")
+        assert first == {"message": "我来写一首小诗～", "agent_used": "ChitchatAgent", "cached": False, "shed": False}
+        assert second["cached"] is True
+        
+        result = graph.invoke("退货政策是什么")
+        assert result["message"] == "AfterSalesAgent: 退货政策是什么"
+        assert graph.triage_agent.triage.call_count == 2
+        assert graph._mocks["supervisor"].route.call_count == 0
+        assert graph._mocks["ChitchatAgent"].chat.call_count == 0
+    
+    def test_agent_overload_is_shed_with_fallback(self, graph):
+        """在途 Agent 调用达到自适应上限时直接返回降级回复，不调用 LLM、不写缓存"""
+        from src.core.adaptive_limiter import AdaptiveConcurrencyLimiter
+        from src.core.circuit_breaker import LLM_FALLBACK_MESSAGE
+        
+        graph.limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1)
+        busy = graph.limiter.try_acquire()
+        
+        result = graph.invoke("退货政策是什么")
+        assert result["shed"] is True
+        assert result["message"] == LLM_FALLBACK_MESSAGE
+        assert graph._mocks["AfterSalesAgent"].chat.call_count == 0
+        
+        graph.limiter.release(busy)
+        result = graph.invoke("退货政策是什么")
+        assert result["shed"] is False
+        assert result["cached"] is False
+        assert graph.limiter.get_stats()["shed"] == 1
+    
+    def test_cancelled_runs_release_limiter_slots(self, graph):
+        """被取消的 ainvoke / astream（客户端断开）归还并发名额，之后的请求不会被降级"""
+        from src.core.adaptive_limiter import AdaptiveConcurrencyLimiter
+        
+        graph.limiter = AdaptiveConcurrencyLimiter(initial_limit=3, min_limit=3)
+        answer = graph._mocks["AfterSalesAgent"].achat.side_effect
+        
+        async def hang(**_):
+            await asyncio.sleep(10)
+        
+        async def consume(stream):
+            async for _ in stream:
+                pass
+        
+        async def cancel_all(run):
+            tasks = [asyncio.create_task(run()) for _ in range(3)]
+            async with asyncio.timeout(1):
+                while graph.limiter.in_flight < 3:
+                    await asyncio.sleep(0.01)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return graph.limiter.in_flight
+        
+        graph._mocks["AfterSalesAgent"].achat = AsyncMock(side_effect=hang)
+        assert asyncio.run(cancel_all(lambda: graph.ainvoke("退货政策是什么", use_cache=False))) == 0
+        assert asyncio.run(cancel_all(lambda: consume(graph.astream("退货政策是什么", use_cache=False)))) == 0
+        
+        graph._mocks["AfterSalesAgent"].achat = AsyncMock(side_effect=answer)
+        assert asyncio.run(graph.ainvoke("退货政策是什么", use_cache=False))["shed"] is False
+    
+    def test_agent_bulkheads_are_isolated(self, graph):
+        """某个 Agent 的舱壁占满时只降级该 Agent，其他 Agent 照常处理"""
+        from src.core.bulkhead import Bulkhead
+        from src.graphs import customer_service_graph as csg
+        
+        bulkheads = {
+            "AfterSalesAgent": Bulkhead("AfterSalesAgent", max_concurrent=1, max_wait=0.01),
+            "OrderAgent": Bulkhead("OrderAgent", max_concurrent=1, max_wait=0.01),
+        }
+        with patch.object(csg, "get_bulkhead", side_effect=bulkheads.get), \
+             bulkheads["AfterSalesAgent"].acquire_sync():
+            saturated = graph.invoke("退货政策是什么")
+            other = graph.invoke("查订单 ORD20240001")
+        
+        assert saturated["shed"] is True
+        assert other["shed"] is False
+        assert other["message"] == "OrderAgent: 查订单 ORD20240001"
+        assert bulkheads["AfterSalesAgent"].get_stats()["rejected"] == 1
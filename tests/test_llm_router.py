@@ -0,0 +1,96 @@
+"""LLM 路由器测试"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+
+# ===== LLM 路由器测试 =====
+
+@pytest.mark.usefixtures("llm_settings")
+class TestLLMRouter:
+    """LLM 路由器测试"""
+    
+    def test_clients_are_reused_and_closed(self):
+        """同一提供商只创建一次客户端，共享连接池，关闭后释放"""
+        from src.core.llm_router import LLMRouter, ModelConfig
+
+        router = LLMRouter()
+        router.models["openai"] = ModelConfig(
+            provider="openai", model="gpt-4o-mini", api_key="sk-test", base_url="http://127.0.0.1:9/v1",
+        )
+
+        llm = router.get_llm("openai")
+        assert router.get_llm("openai") is llm
+        assert router.get_status()["clients"] == ["openai"]
+        assert router._http_client is not None
+
+        asyncio.run(router.aclose())
+        assert router._http_client is None
+        assert router.get_status()["clients"] == []
+    
+    def test_mock_mode_never_routes_to_real_providers(self, llm_settings, monkeypatch):
+        """LLM_PROVIDER=mock 时即使配置了真实提供商的 API Key 也只使用 mock"""
+        from src.core.llm_router import LLMRouter
+        
+        monkeypatch.setattr(llm_settings, "llm_provider", "mock")
+        monkeypatch.setattr(llm_settings, "dashscope_api_key", "sk-test")
+        monkeypatch.setattr(llm_settings, "openai_api_key", "sk-test")
+        
+        router = LLMRouter()
+        assert router.available_providers == ["mock"]
+        assert all(router.route_order() == ["mock"] for _ in range(20))
+        assert router.get_fallback() is None
+        with pytest.raises(ValueError):
+            router.get_llm("dashscope")
+    
+    def test_weighted_routing_fails_over_and_recovers(self):
+        """加权路由：失败的提供商自动切走、权重下降，错误率衰减后自动恢复"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from src.core.llm_router import LLMRouter, ModelConfig
+
+        router = LLMRouter()
+        router.routing_mode = "weighted"
+        for name in ("dashscope", "openai"):
+            router.models[name] = ModelConfig(provider=name, model=name, api_key="key")
+        broken = Mock(**{"_generate.side_effect": RuntimeError("429")})
+        router._clients = {"dashscope": broken, "openai": FakeListChatModel(responses=["ok"])}
+
+        llm = router.get_llm()
+        # 固定首选 dashscope，验证失败后切换到 openai
+        with patch("src.core.routed_llm.random.choices", side_effect=lambda names, weights: [names[0]]):
+            for _ in range(5):
+                assert llm.invoke("你好").content == "ok"
+
+        weights = router.get_status()["weights"]
+        assert weights["dashscope"]["errors"] >= 1
+        assert weights["dashscope"]["weight"] < weights["openai"]["weight"]
+
+        with patch("src.core.routed_llm.time.time", return_value=time.time() + 600):
+            recovered = router.get_weights()
+        assert recovered["dashscope"]["error_rate"] < 0.01
+    
+    def test_provider_breakers_are_isolated(self):
+        """一个提供商熔断后只摘除它，流量全部转到其他提供商且不再调用故障提供商"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from src.core.circuit_breaker import CircuitState
+        from src.core.llm_router import LLMRouter, ModelConfig
+
+        router = LLMRouter()
+        router.routing_mode = "weighted"
+        for name in ("dashscope", "openai"):
+            router.models[name] = ModelConfig(provider=name, model=name, api_key="key")
+        broken = Mock(**{"_generate.side_effect": RuntimeError("503")})
+        router._clients = {"dashscope": broken, "openai": FakeListChatModel(responses=["ok"])}
+
+        llm = router.get_llm()
+        with patch("src.core.routed_llm.random.choices", side_effect=lambda names, weights: [names[0]]):
+            for _ in range(20):
+                assert llm.invoke("你好").content == "ok"
+
+        assert router.breaker("dashscope").state == CircuitState.OPEN
+        assert router.breaker("openai").state == CircuitState.CLOSED
+        assert broken._generate.call_count == router.breaker("dashscope").failure_threshold
+        assert router.route_order() == ["openai"]
+        assert router.get_status()["circuit_breakers"]["dashscope"]["state"] == "open"
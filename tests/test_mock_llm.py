@@ -0,0 +1,65 @@
+"""Mock LLM 测试"""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+
+# ===== Mock LLM 测试 =====
+
+class TestMockLLM:
+    """本地 Mock LLM 测试"""
+
+    def test_routing_and_templated_answers_are_deterministic(self):
+        """识别路由提示词返回 Agent 名称，其余输入按模板生成且同一输入结果相同"""
+        from src.core.mock_llm import MockChatModel
+        from src.graphs.customer_service_graph import SupervisorAgent
+
+        llm = MockChatModel(latency_ms=0, tokens_per_second=0)
+        expected = {
+            "我的订单到哪了": "OrderAgent",
+            "我想退货": "AfterSalesAgent",
+            "iPhone 15 Pro 多少钱？": "ProductAgent",
+            "你好": "ChitchatAgent",
+        }
+        for query, agent in expected.items():
+            assert llm.invoke(SupervisorAgent.ROUTING_PROMPT.format(user_input=query)).content == agent
+
+        answer = llm.invoke("会员有什么权益？").content
+        assert "会员有什么权益？" in answer
+        assert llm.invoke("会员有什么权益？").content == answer
+
+    def test_latency_streaming_and_failures(self):
+        """首 token 延迟与输出速度可配置，失败率按种子可复现"""
+        from src.core.mock_llm import MockChatModel, MockLLMError
+
+        llm = MockChatModel(latency_ms=50, latency_sigma=0, tokens_per_second=400, chunk_size=4)
+
+        async def stream():
+            start = time.perf_counter()
+            first_token = None
+            chunks = []
+            async for chunk in llm.astream("你好"):
+                first_token = first_token or time.perf_counter() - start
+                chunks.append(chunk.content)
+            return first_token, time.perf_counter() - start, chunks
+
+        first_token, total, chunks = asyncio.run(stream())
+        assert 0.045 <= first_token < 0.1
+        assert len(chunks) > 1
+        assert total >= 0.05 + (len(chunks) - 1) * 0.01 * 0.8  # 事件循环定时器可能略微提前
+        assert "".join(chunks) == llm.invoke("你好").content
+
+        def failures(seed):
+            flaky = MockChatModel(latency_ms=0, tokens_per_second=0, failure_rate=0.3, seed=seed)
+            outcomes = []
+            for _ in range(50):
+                try:
+                    flaky.invoke("你好")
+                    outcomes.append(False)
+                except MockLLMError:
+                    outcomes.append(True)
+            return outcomes
+
+        assert failures(7) == failures(7)
+        assert 5 <= sum(failures(7)) <= 25
@@ -0,0 +1,23 @@
+"""商品咨询 Agent 测试"""
+
+import asyncio
+from unittest.mock import patch
+
+
+# ===== 商品咨询 Agent 测试 =====
+
+class TestProductAgent:
+    """商品咨询 Agent 测试"""
+    
+    def test_no_retriever_answers_without_context(self):
+        """没有检索器时同步 / 异步调用都按“未找到相关信息”回答，而不是抛出 AttributeError"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from src.agents.product_agent import ProductAgent
+        
+        llm = FakeListChatModel(responses=["暂无该商品信息，建议联系人工客服"])
+        with patch("src.agents.product_agent.get_llm", return_value=llm):
+            agent = ProductAgent(retriever=None)
+        
+        assert asyncio.run(agent.achat("iPhone 15 多少钱")) == "暂无该商品信息，建议联系人工客服"
+        assert agent.chat("iPhone 15 多少钱") == "暂无该商品信息，建议联系人工客服"
+        assert agent.search_knowledge("iPhone 15") == []
@@ -0,0 +1,93 @@
+"""限流器测试"""
+
+import pytest
+import asyncio
+
+
+# ===== 限流器测试 =====
+
+class TestRateLimiter:
+    """限流器测试"""
+    
+    def test_token_bucket_queues_then_rejects(self):
+        """令牌用完后按欠账排队，预计等待超过上限时拒绝且不扣减"""
+        from src.core.rate_limiter import TokenBucket
+        
+        bucket = TokenBucket(rate_per_minute=600, burst_seconds=0.1)  # 10 个/秒，容量 1
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == pytest.approx(0.1, abs=0.02)
+        assert bucket.reserve(1, max_wait=0.15) is None
+        assert bucket.reserve(1) == pytest.approx(0.2, abs=0.02)
+    
+    def test_concurrency_limit_queues_and_reports_wait(self):
+        """超过并发上限的请求排队等待（同步线程与协程共用队列），等待时间计入指标"""
+        import threading
+        from src.core.rate_limiter import ProviderLimiter, RateLimitExceeded
+        
+        limiter = ProviderLimiter("test", max_concurrency=1, max_wait=1.0)
+        
+        async def hold(seconds):
+            async with limiter.acquire(tokens=100):
+                await asyncio.sleep(seconds)
+        
+        def hold_sync():
+            with limiter.acquire_sync():
+                pass
+        
+        async def run():
+            thread = threading.Thread(target=hold_sync)
+            first = asyncio.create_task(hold(0.05))
+            await asyncio.sleep(0.01)
+            thread.start()
+            await asyncio.gather(first, hold(0))
+            await asyncio.to_thread(thread.join)
+        
+        asyncio.run(run())
+        stats = limiter.get_stats()
+        assert stats["requests"] == 3
+        assert stats["queued"] == 2
+        assert stats["queue_wait_ms"]["max"] >= 30
+        assert stats["in_flight"] == 0
+        
+        strict = ProviderLimiter("strict", max_concurrency=1, max_wait=0.01)
+        
+        async def overflow():
+            async with strict.acquire():
+                async with strict.acquire():
+                    pass
+        
+        with pytest.raises(RateLimitExceeded):
+            asyncio.run(overflow())
+        assert strict.get_stats()["rejected"] == 1
+        assert strict.get_stats()["in_flight"] == 0
+    
+    def test_reservation_refunded_when_call_never_starts(self):
+        """并发名额被拒绝或排队时被取消，预约的 RPM / TPM 令牌归还"""
+        from src.core.rate_limiter import ProviderLimiter, RateLimitExceeded
+        
+        limiter = ProviderLimiter("test", rpm=60, tpm=6000, max_concurrency=1, max_wait=0.05)
+        
+        async def rejected():
+            async with limiter.acquire(tokens=100):
+                with pytest.raises(RateLimitExceeded):
+                    async with limiter.acquire(tokens=800):
+                        pass
+        
+        asyncio.run(rejected())
+        assert limiter.get_stats()["rejected"] == 1
+        assert limiter.token_bucket.reserve(900) == 0
+        
+        queued = ProviderLimiter("queued", tpm=600, max_wait=5.0)  # 10 token/秒，容量 100
+        
+        async def cancelled():
+            async with queued.acquire(tokens=100):
+                pass
+            waiter = asyncio.create_task(queued.acquire(tokens=20).__aenter__())
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        
+        asyncio.run(cancelled())
+        assert queued.token_bucket.reserve(1) < 0.2
+        assert queued.get_stats()["in_flight"] == 0
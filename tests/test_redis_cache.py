@@ -0,0 +1,82 @@
+"""Redis L2 缓存测试"""
+
+import threading
+import time
+from unittest.mock import patch
+
+
+# ===== Redis L2 缓存测试 =====
+
+class TestRedisCacheTier:
+    """Redis L2 缓存测试"""
+    
+    def test_l2_shared_across_workers(self):
+        """两个进程内缓存共享 Redis L2，命中按层级统计"""
+        from src.core.response_cache import ResponseCache
+        from src.core.redis_cache import RedisCacheTier, LocalRedis
+        
+        redis_client = LocalRedis()
+        worker_a = ResponseCache(l2=RedisCacheTier(redis_client))
+        worker_b = ResponseCache(l2=RedisCacheTier(redis_client))
+        
+        worker_a.set("有什么优惠活动？", "满 300 减 50" * 100, ttl=60)
+        assert worker_b.get("有什么优惠活动？") == "满 300 减 50" * 100
+        assert worker_b.get("有什么优惠活动？") == "满 300 减 50" * 100
+        
+        stats = worker_b.get_stats()
+        assert stats["l2_hits"] == 1
+        assert stats["l1_hits"] == 1
+        assert 0 < redis_client.pttl("response_cache:" + worker_a._get_hash("有什么优惠活动？")) <= 60_000
+    
+    def test_l2_get_or_set_keeps_first_writer(self):
+        """get_or_set 只让第一个写入生效"""
+        from src.core.redis_cache import RedisCacheTier, LocalRedis
+        
+        tier = RedisCacheTier(LocalRedis())
+        assert tier.get_or_set("k", {"answer": "A"}, ttl=60) == {"answer": "A"}
+        assert tier.get_or_set("k", {"answer": "B"}, ttl=60) == {"answer": "A"}
+    
+    def test_cache_fill_keeps_first_worker_answer(self):
+        """两个 worker 同时回填同一个问题：L2 保留先写入的回复，两边 L1 一致"""
+        from src.core.response_cache import ResponseCache
+        from src.core.redis_cache import RedisCacheTier, LocalRedis
+        
+        redis_client = LocalRedis()
+        worker_a = ResponseCache(l2=RedisCacheTier(redis_client))
+        worker_b = ResponseCache(l2=RedisCacheTier(redis_client))
+        
+        assert worker_a.get_or_set("退货政策是什么", "A") == "A"
+        assert worker_b.get_or_set("退货政策是什么", "B") == "A"
+        assert worker_b.get("退货政策是什么") == "A"
+        assert worker_b.get_stats()["l1_hits"] == 1
+    
+    def test_slow_l2_does_not_block_l1_hits(self):
+        """L2 网络往返在锁外进行：Redis 变慢时其他线程的 L1 命中不受影响"""
+        from src.core.response_cache import ResponseCache
+        from src.core.redis_cache import RedisCacheTier, LocalRedis
+        
+        class SlowRedis(LocalRedis):
+            def pipeline(self, transaction=True):
+                time.sleep(0.3)
+                return super().pipeline(transaction)
+        
+        cache = ResponseCache(l2=RedisCacheTier(SlowRedis()))
+        cache.set("热门问题", "H")
+        miss = threading.Thread(target=cache.get, args=("冷门问题",))
+        miss.start()
+        time.sleep(0.05)
+        
+        start = time.perf_counter()
+        assert cache.get("热门问题") == "H"
+        assert time.perf_counter() - start < 0.1
+        miss.join()
+    
+    def test_redis_client_has_timeouts(self):
+        """Redis 客户端设置连接与读写超时，Redis 卡住时按超时降级"""
+        from src.core.redis_cache import create_redis_tier
+        
+        with patch("redis.from_url") as from_url:
+            create_redis_tier("redis://localhost:6379", timeout=0.2)
+        kwargs = from_url.call_args.kwargs
+        assert kwargs["socket_timeout"] == 0.2
+        assert kwargs["socket_connect_timeout"] == 0.2
@@ -0,0 +1,124 @@
+"""响应缓存测试"""
+
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+
+# ===== 响应缓存测试 =====
+
+class TestResponseCache:
+    """响应缓存测试"""
+    
+    def test_semantic_hit_and_row_reuse(self):
+        """语义命中走向量矩阵，失效后行号被复用"""
+        from src.core.response_cache import ResponseCache
+        
+        vectors = {
+            "退货政策是什么": [1.0, 0.0, 0.0],
+            "退货政策是啥": [0.99, 0.05, 0.0],
+            "物流多久到": [0.0, 1.0, 0.0],
+        }
+        cache = ResponseCache(enable_semantic=True, similarity_threshold=0.95)
+        cache._embeddings = Mock(embed_query=lambda q: vectors[q])
+        
+        cache.set("退货政策是什么", "七天无理由")
+        assert cache.get("退货政策是啥") == "七天无理由"
+        assert cache.get_stats()["semantic_hits"] == 1
+        
+        cache.invalidate("退货政策是什么")
+        assert cache.get_stats()["semantic_size"] == 0
+        cache.set("物流多久到", "3-5 天")
+        assert cache._semantic_index._high_water == 1
+    
+    def test_expired_entries_are_popped_lazily(self):
+        """过期条目在下次读写时按到期顺序弹出，未到期条目不受影响"""
+        from src.core.response_cache import ResponseCache
+        
+        cache = ResponseCache()
+        cache.set("short", "S", ttl=10)
+        cache.set("long", "L", ttl=1000)
+        
+        with patch("src.core.response_cache.time.time", return_value=time.time() + 60):
+            assert cache.get("short") is None
+            assert cache.get("long") == "L"
+        
+        stats = cache.get_stats()
+        assert stats["expirations"] == 1
+        assert stats["size"] == 1
+    
+    def test_background_sweeper(self):
+        """后台清理任务可以启动并停止"""
+        from src.core.response_cache import ResponseCache
+        
+        async def run():
+            cache = ResponseCache()
+            cache.set("q", "r", ttl=0.01)
+            cache.start_sweeper(interval=0.02)
+            await asyncio.sleep(0.1)
+            await cache.stop_sweeper()
+            return cache.get_stats()
+        
+        stats = asyncio.run(run())
+        assert stats["size"] == 0
+        assert stats["expirations"] == 1
+    
+    def test_normalized_variants_hit_exact(self):
+        """写法不同的同一问题在规范化后精确命中，并按规则归因"""
+        from src.core.response_cache import ResponseCache
+        from src.core.query_normalizer import QueryNormalizer
+
+        cache = ResponseCache()
+        cache.set("iPhone 15 Pro 多少钱？", "7999 元")
+        assert cache.get("iphone15pro多少钱?") == "7999 元"
+        assert cache.get("请问 ｉＰｈｏｎｅ15 Pro 多少钱呢") == "7999 元"
+        assert cache.get("呢子大衣多少钱") is None
+
+        stats = cache.get_stats()["normalization"]
+        assert stats["normalized_hits"] == 2
+        assert stats["rules"]["whitespace"]["hits"] == 2
+        assert stats["rules"]["stopwords"]["hits"] == 1
+
+        strict = ResponseCache(normalizer=QueryNormalizer(rules=["lowercase"]))
+        strict.set("iPhone 15 Pro 多少钱？", "7999 元")
+        assert strict.get("iphone15pro多少钱?") is None
+    
+    def test_normalization_keeps_numeric_separators(self):
+        """数字 / 字母之间的小数点、区间符号等保留：不同的价格或区间问题不共享缓存 key"""
+        from src.core.response_cache import ResponseCache
+        
+        cache = ResponseCache()
+        pairs = [
+            ("1.5万的电脑有吗", "15万的电脑有吗"),
+            ("运费是10-20元吗", "运费是1020元吗"),
+            ("价格是1,999吗", "价格是1999吗"),
+            ("9:30 发货吗", "930 发货吗"),
+            ("尺码 1 2 有货吗", "尺码12有货吗"),
+        ]
+        for a, b in pairs:
+            assert cache._get_hash(a) != cache._get_hash(b), (a, b)
+        
+        # 句末标点、中英文之间的空白仍然去除
+        assert cache._get_hash("1.5万的电脑有吗？") == cache._get_hash("1.5万 的电脑有吗")
+        assert cache._get_hash("运费是10-20元吗!") == cache._get_hash("运费是 10-20 元")
+    
+    def test_snapshot_roundtrip_skips_expired(self, tmp_path):
+        """快照恢复精确与语义条目（含向量），跳过已过期记录"""
+        from src.core.response_cache import ResponseCache
+
+        vectors = {"退货政策是什么": [1.0, 0.0, 0.0], "退货政策是啥": [0.99, 0.05, 0.0]}
+        cache = ResponseCache(enable_semantic=True)
+        cache._embeddings = Mock(embed_query=lambda q: vectors[q])
+        cache.set("退货政策是什么", {"answer": "七天无理由"}, namespace="answer")
+        cache.set("短期", "S", ttl=10)
+        assert cache.save_snapshot(tmp_path / "cache") == 2
+
+        warm = ResponseCache(enable_semantic=True)
+        warm._embeddings = Mock(embed_query=lambda q: vectors[q])
+        with patch("src.core.response_cache.time.time", return_value=time.time() + 60):
+            assert warm.load_snapshot(tmp_path / "cache") == 1
+
+        assert warm.get("短期") is None
+        assert warm.get("退货政策是啥", namespace="answer") == {"answer": "七天无理由"}
+        assert warm.get_stats()["semantic_hits"] == 1
+        assert ResponseCache().load_snapshot(tmp_path / "missing") == 0
@@ -0,0 +1,133 @@
+"""加权路由模型与对冲请求测试"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import patch
+
+
+# ===== 对冲请求测试 =====
+
+@pytest.mark.usefixtures("llm_settings")
+class TestHedging:
+    """对冲请求测试"""
+    
+    def test_hedged_requests_take_the_faster_provider(self):
+        """主提供商卡住时对冲到次选提供商，invoke / ainvoke / astream 都生效，受每分钟预算限制"""
+        from langchain_core.language_models.chat_models import BaseChatModel
+        from langchain_core.messages import AIMessage, AIMessageChunk
+        from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+        from src.core.llm_router import LLMRouter, ModelConfig
+        from src.core.routed_llm import HedgePolicy
+
+        class DelayedChatModel(BaseChatModel):
+            delay: float
+            text: str
+
+            @property
+            def _llm_type(self):
+                return "delayed"
+
+            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+                time.sleep(self.delay)
+                return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+
+            async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+                await asyncio.sleep(self.delay)
+                return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+
+            async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+                await asyncio.sleep(self.delay)
+                for ch in self.text:
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=ch))
+
+        router = LLMRouter()
+        router.routing_mode = "weighted"
+        router.hedging = HedgePolicy(enabled=True, max_per_minute=3, default_delay=0.05)
+        for name in ("dashscope", "openai"):
+            router.models[name] = ModelConfig(provider=name, model=name, api_key="key")
+        router._clients = {
+            "dashscope": DelayedChatModel(delay=0.5, text="slow"),
+            "openai": DelayedChatModel(delay=0.0, text="fast"),
+        }
+        llm = router.get_llm()
+
+        async def stream():
+            return "".join([chunk.content async for chunk in llm.astream("你好")])
+
+        with patch("src.core.routed_llm.random.choices", side_effect=lambda names, weights: [names[0]]):
+            assert llm.invoke("你好").content == "fast"
+            assert asyncio.run(llm.ainvoke("你好")).content == "fast"
+            assert asyncio.run(stream()) == "fast"
+            # 预算用完后不再对冲，只能等主提供商
+            assert asyncio.run(llm.ainvoke("你好")).content == "slow"
+
+        # 流式调用只记录首 token 延迟；被对冲取消的流不进入样本
+        assert len(router.health("openai").first_token_samples) == 1
+        assert len(router.health("dashscope").first_token_samples) == 0
+        
+        stats = router.get_status()["hedging"]
+        assert stats["fired"] == 3
+        assert stats["won"] == 3
+        assert stats["budget_exhausted"] == 1
+        router.close()
+    
+    def test_hedge_delay_uses_latency_of_the_same_call_type(self):
+        """完整耗时与首 token 延迟分开统计，对冲等待按调用类型取分位数；被取消的调用不进入样本"""
+        from src.core.routed_llm import HedgePolicy, ProviderHealth
+        
+        health = ProviderHealth(provider="dashscope", model="qwen")
+        for _ in range(20):
+            health.record_success(2.0)
+            health.record_success(0.2, kind="first_token")
+        health.record_success(0.05, sample=False)
+        
+        policy = HedgePolicy(enabled=True, min_samples=20, min_delay=0.01)
+        assert policy.delay(health) == 2.0
+        assert policy.delay(health, kind="first_token") == 0.2
+        assert len(health.completion_samples) == 20
+        assert health.calls == 41
+    
+    def test_open_breaker_does_not_consume_rate_budget(self):
+        """熔断中的提供商直接拒绝，不消耗 RPM / TPM 预约；限流拒绝时归还半开试探许可"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from src.core.circuit_breaker import CircuitState
+        from src.core.llm_router import LLMRouter, ModelConfig
+        from src.core.rate_limiter import ProviderLimiter
+        
+        router = LLMRouter()
+        router.routing_mode = "weighted"
+        router.models["dashscope"] = ModelConfig(provider="dashscope", model="qwen", api_key="key")
+        router._clients = {"dashscope": FakeListChatModel(responses=["ok"])}
+        limiter = router._limiters["dashscope"] = ProviderLimiter(
+            "dashscope", rpm=60, tpm=60_000, max_concurrency=1, max_wait=0.01
+        )
+        breaker = router.breaker("dashscope")
+        breaker._transition_to(CircuitState.OPEN)
+        
+        llm = router.get_llm()
+        
+        async def astream():
+            return [chunk async for chunk in llm.astream("你好")]
+        
+        for call in (
+            lambda: llm.invoke("你好"),
+            lambda: asyncio.run(llm.ainvoke("你好")),
+            lambda: list(llm.stream("你好")),
+            lambda: asyncio.run(astream()),
+        ):
+            with pytest.raises(Exception):
+                call()
+        
+        assert limiter.request_bucket._tokens == pytest.approx(limiter.request_bucket.capacity)
+        assert limiter.token_bucket._tokens == pytest.approx(limiter.token_bucket.capacity)
+        assert limiter.get_stats()["requests"] == 0
+        
+        # 半开状态放行了试探请求、却被限流拒绝：归还许可，下一次仍可以试探
+        breaker.half_open_max_calls = 1
+        breaker._transition_to(CircuitState.HALF_OPEN)
+        limiter.request_bucket._tokens = -100
+        with pytest.raises(Exception):
+            llm.invoke("你好")
+        limiter.request_bucket._tokens = limiter.request_bucket.capacity
+        assert llm.invoke("你好").content == "ok"
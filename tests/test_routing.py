@@ -0,0 +1,89 @@
+"""快速路由测试"""
+
+from unittest.mock import Mock, patch
+
+
+# ===== 快速路由测试 =====
+
+class TestFastRouter:
+    """关键词 / 正则快速路由测试"""
+    
+    def test_obvious_intents_are_routed_confidently(self):
+        """订单号、退货、问候等明显意图直接给出高置信度结果，冲突或无命中时置信度低"""
+        from src.graphs.routing import FastRouter
+        
+        router = FastRouter()
+        expected = {
+            "ORD20240001 到哪了": "OrderAgent",
+            "我想退货": "AfterSalesAgent",
+            "iPhone 15 Pro 多少钱？": "ProductAgent",
+            "你好！": "ChitchatAgent",
+        }
+        for query, agent in expected.items():
+            decision = router.route(query)
+            assert decision.agent == agent
+            assert decision.confidence >= 0.8
+        
+        assert router.route("我的订单要退货").confidence < 0.8
+        assert router.route("帮我写首诗").agent is None
+    
+    def test_supervisor_calls_llm_only_when_unsure(self):
+        """置信度足够时不调用 LLM，路由来源分别计数"""
+        from src.graphs import customer_service_graph as csg
+        
+        llm = Mock(**{"invoke.return_value": Mock(content="ChitchatAgent")})
+        with patch.object(csg, "get_llm", return_value=llm):
+            supervisor = csg.SupervisorAgent()
+            assert supervisor.route("订单 ORD20240001 物流到哪了？") == "OrderAgent"
+            assert supervisor.route("帮我写首诗") == "ChitchatAgent"
+        assert llm.invoke.call_count == 1
+        
+        stats = supervisor.get_stats()
+        assert stats["sources"] == {"rule": 1, "llm": 1}
+        assert stats["llm_calls_saved"] == 0.5
+    
+    def test_embedding_router_reuses_query_vector(self):
+        """规则没把握时按样例向量分类，margin 不足才调用 LLM；同一 query 只计算一次向量"""
+        from langchain_core.embeddings import Embeddings
+        from src.graphs import customer_service_graph as csg
+        from src.graphs.routing import EmbeddingRouter
+        from src.rag.embeddings import CachedEmbeddings
+        
+        class TopicEmbeddings(Embeddings):
+            """按主题词计数的向量（测试用）"""
+            vocab = ["包裹", "尺码", "耳机", "笑话"]
+            calls = 0
+            
+            def embed_query(self, text):
+                TopicEmbeddings.calls += 1
+                return [float(text.count(word)) for word in self.vocab] + [0.1]
+            
+            def embed_documents(self, texts):
+                return [self.embed_query(text) for text in texts]
+        
+        embeddings = CachedEmbeddings(TopicEmbeddings())
+        exemplars = {
+            "OrderAgent": ["包裹还没到", "包裹在哪"],
+            "AfterSalesAgent": ["尺码不合适", "尺码偏小"],
+            "ProductAgent": ["耳机怎么样", "耳机降噪"],
+            "ChitchatAgent": ["讲个笑话"],
+        }
+        for method in ("knn", "centroid"):
+            router = EmbeddingRouter(exemplars, embeddings=embeddings, method=method, k=2)
+            decision = router.route("我的包裹呢")
+            assert decision.agent == "OrderAgent"
+            assert decision.source == "embedding"
+            assert decision.confidence > 0.5
+            assert router.route("随便聊聊").confidence < 0.05
+        
+        calls = TopicEmbeddings.calls
+        embeddings.embed_query("我的包裹呢")  # 语义缓存 / 检索器复用同一个向量
+        assert TopicEmbeddings.calls == calls
+        
+        llm = Mock(**{"invoke.return_value": Mock(content="ChitchatAgent")})
+        with patch.object(csg, "get_llm", return_value=llm):
+            supervisor = csg.SupervisorAgent(embedding_router=router, margin=0.05)
+            assert supervisor.route("尺码好像不太对") == "AfterSalesAgent"
+            assert supervisor.route("随便聊聊") == "ChitchatAgent"
+        assert llm.invoke.call_count == 1
+        assert supervisor.get_stats()["sources"] == {"embedding": 1, "llm": 1}
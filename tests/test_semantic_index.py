@@ -0,0 +1,60 @@
+"""语义索引测试"""
+
+import pytest
+
+
+# ===== 语义索引测试 =====
+
+class TestSemanticIndex:
+    """语义索引测试"""
+    
+    def test_search_matches_bruteforce(self):
+        """矩阵检索结果应与逐条余弦相似度一致"""
+        import numpy as np
+        from src.core.semantic_index import ExactSemanticIndex
+        
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(200, 16))
+        index = ExactSemanticIndex(initial_capacity=8)
+        rows = [index.add(v) for v in vectors]
+        
+        query = rng.normal(size=16)
+        sims = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        
+        row, score = index.search(query, k=1)[0]
+        assert row == rows[int(np.argmax(sims))]
+        assert score == pytest.approx(float(np.max(sims)), abs=1e-5)
+        
+        top3 = [r for r, _ in index.search(query, k=3)]
+        assert top3 == [rows[i] for i in np.argsort(-sims)[:3]]
+    
+    def test_removed_rows_are_skipped(self):
+        """删除的行不应出现在检索结果中"""
+        from src.core.semantic_index import ExactSemanticIndex
+        
+        index = ExactSemanticIndex()
+        a = index.add([1.0, 0.0])
+        index.add([0.0, 1.0])
+        index.remove(a)
+        
+        assert len(index) == 1
+        assert index.search([1.0, 0.0], k=1)[0][0] != a
+    
+    def test_ivf_incremental_insert_and_delete(self):
+        """IVF 索引训练后支持增量插入/删除，并能找回近邻"""
+        import numpy as np
+        from src.core.semantic_index import IVFSemanticIndex
+        
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(8, 16))
+        vectors = centers[rng.integers(0, 8, size=400)] + 0.05 * rng.normal(size=(400, 16))
+        
+        index = IVFSemanticIndex(nlist=8, nprobe=2, train_factor=8)
+        rows = [index.add(v) for v in vectors]
+        assert index.is_trained
+        
+        assert index.search(vectors[123], k=1)[0][0] == rows[123]
+        
+        index.remove(rows[123])
+        assert index.search(vectors[123], k=1)[0][0] != rows[123]
+        assert len(index) == 399
@@ -0,0 +1,54 @@
+"""请求合并测试"""
+
+import asyncio
+
+
+# ===== 请求合并测试 =====
+
+class TestSingleFlight:
+    """Single-Flight 请求合并测试"""
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """并发的相同 key 只执行一次"""
+        from src.core.single_flight import SingleFlight
+        
+        flight = SingleFlight()
+        executions = 0
+        
+        async def compute():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.05)
+            return "满 300 减 50"
+        
+        async def run():
+            return await asyncio.gather(*[flight.do("promo", compute) for _ in range(10)])
+        
+        results = asyncio.run(run())
+        assert results == ["满 300 减 50"] * 10
+        assert executions == 1
+        assert flight.get_stats()["coalesced"] == 9
+        assert flight.get_stats()["in_flight"] == 0
+    
+    def test_stream_subscribers_receive_all_chunks(self):
+        """后加入的订阅者先回放已有块，再接收后续块"""
+        from src.core.single_flight import SingleFlight
+        
+        flight = SingleFlight()
+        
+        async def tokens():
+            for token in ["满", "300", "减", "50"]:
+                await asyncio.sleep(0.01)
+                yield token
+        
+        async def consume(delay):
+            await asyncio.sleep(delay)
+            return [c async for c in flight.stream("promo", tokens)]
+        
+        async def run():
+            return await asyncio.gather(consume(0), consume(0.025))
+        
+        first, second = asyncio.run(run())
+        assert first == second == ["满", "300", "减", "50"]
+        assert flight.get_stats()["executions"] == 1
+        assert flight.get_stats()["coalesced"] == 1
@@ -0,0 +1,88 @@
+"""流式响应测试"""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+
+# ===== 流式响应测试 =====
+
+class TestStreamReplay:
+    """流式回复缓存回放测试"""
+    
+    def _collect(self, message, session_id):
+        from src.api.stream import generate_stream_response
+        import json as _json
+        
+        async def run():
+            return [
+                _json.loads(line[len("data: "):])
+                async for line in generate_stream_response(message, session_id, [])
+            ]
+        return asyncio.run(run())
+    
+    def test_second_request_replays_from_cache(self):
+        """第二次相同问题直接回放缓存，done 事件标记 cached"""
+        from langchain_core.messages import AIMessageChunk
+        from src.core.response_cache import ResponseCache
+        
+        async def astream(messages):
+            for token in ["七天", "无理由", "退货"]:
+                yield AIMessageChunk(content=token)
+        
+        llm = Mock(astream=astream)
+        with patch("src.api.stream.get_cache", return_value=ResponseCache()), \
+             patch("src.api.stream.get_llm", return_value=llm) as get_llm:
+            first = self._collect("退货政策是什么", "s1")
+            second = self._collect("退货政策是什么", "s2")
+        
+        assert get_llm.call_count == 1
+        assert first[-1]["cached"] is False
+        assert second[-1]["cached"] is True
+        replayed = "".join(e["content"] for e in second if e["type"] == "chunk")
+        assert replayed == "七天无理由退货"
+    
+    def _collect_graph(self, graph, message, session_id):
+        from src.api.stream import generate_graph_stream_response
+        import json as _json
+        
+        async def run():
+            return [
+                _json.loads(line[len("data: "):])
+                async for line in generate_graph_stream_response(graph, message, session_id, [])
+            ]
+        return asyncio.run(run())
+    
+    def test_graph_cache_hit_is_replayed_in_chunks(self):
+        """graph 模式的缓存命中按配置的块大小回放，并记录 llm_provider 实验结果"""
+        from src.config import settings
+        
+        async def astream(message, chat_history=None, use_cache=True):
+            yield {"type": "route", "agent": "AfterSalesAgent"}
+            yield {"type": "chunk", "content": "七天无理由退货", "cached": True}
+            yield {"type": "result", "message": "七天无理由退货", "agent_used": "AfterSalesAgent",
+                   "cached": True, "shed": False}
+        
+        graph = Mock(astream=astream)
+        ab_manager = Mock(**{"get_variant.return_value": "disabled"})
+        with patch("src.api.stream.get_ab_manager", return_value=ab_manager), \
+             patch.object(settings, "stream_replay_chunk_size", 2), \
+             patch.object(settings, "stream_replay_interval", 0):
+            events = self._collect_graph(graph, "退货政策是什么", "s1")
+        
+        chunks = [e["content"] for e in events if e["type"] == "chunk"]
+        assert chunks == ["七天", "无理", "由退", "货"]
+        assert events[-1]["type"] == "done" and events[-1]["cached"] is True
+        recorded = [c.args[0] for c in ab_manager.record_result.call_args_list]
+        assert recorded == ["llm_provider", "cache_enabled"]
+    
+    def test_graph_stream_without_result_reports_error(self):
+        """工作流没有产生 result 事件时返回明确的错误，而不是 TypeError"""
+        async def astream(message, chat_history=None, use_cache=True):
+            yield {"type": "route", "agent": "ChitchatAgent"}
+        
+        ab_manager = Mock(**{"get_variant.return_value": "disabled"})
+        with patch("src.api.stream.get_ab_manager", return_value=ab_manager):
+            events = self._collect_graph(Mock(astream=astream), "你好", "s2")
+        
+        assert events[-1] == {"type": "error", "message": "工作流未返回结果"}
+        ab_manager.record_result.assert_not_called()